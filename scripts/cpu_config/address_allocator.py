@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right
+
+# CONFIG_PARAMETERS that select how AUTO modules are placed, with their options (the first is the default).
+# Address_Allocation: PACKED places modules on the next free word, NATURAL on a boundary of their own power-of-two size.
+# Address_Packing: FIRST_FIT places modules in config order at the lowest free address, BEST_FIT places the largest
+# modules first, each into the smallest free hole it fits in.
+allocation_options = {
+    "Address_Allocation": ["PACKED", "NATURAL"],
+    "Address_Packing":    ["FIRST_FIT", "BEST_FIT"],
+}
+
+def align_up(address, alignment):
+    return (address + alignment - 1) & ~(alignment - 1)
+
+def allocation_option(name, value):
+    """Returns the chosen option of an allocation CONFIG_PARAMETERS entry (the default when value is None)."""
+    options = allocation_options[name]
+    if value is None:
+        return options[0]
+    option = str(value).strip().upper()
+    if option not in options:
+        raise ValueError(f"Invalid {name} '{value}'. Options are: {', '.join(options)}")
+    return option
+
+def natural_size(size):
+    """The smallest power of two that holds size bytes (0 for an empty range)."""
+    return 1 << (size - 1).bit_length() if size > 0 else 0
+
+def decode_block(start, end_exclusive):
+    """Returns (block_start, block_size) of the smallest naturally aligned power-of-two block that holds [start, end_exclusive)."""
+    size = max(1, natural_size(end_exclusive - start))
+    while (start & ~(size - 1)) + size < end_exclusive:
+        size <<= 1
+    return start & ~(size - 1), size
+
+def decode_mask_match(start, end, address_width, reg_width_bytes=4):
+    """
+    Returns the (mask, match) pair that selects the module with bounds [start, end]: (address & mask) == match.
+    The mask covers the smallest naturally aligned block holding the module, so it is exact for NATURAL allocations.
+    """
+    block_start, block_size = decode_block(start, end + reg_width_bytes)
+    mask = ((1 << address_width) - 1) & ~(block_size - 1)
+    return mask, block_start & mask
+
+class AddressIntervals:
+    """
+    The used part of an address space, kept as sorted, disjoint [start, end] intervals. Ranges are given by their first and last
+    aligned address, so ranges that overlap or leave less than one alignment step between them are merged.
+    Overlap checks are a binary search and first_fit jumps straight to the intervals around its start address.
+
+    A range whose end is below its start (a submodule with no registers of its own is recorded as [start, start - alignment])
+    uses no addresses, but a later allocation may not start before and reach past its start. These are kept separately.
+    """
+    def __init__(self, alignment=4):
+        self.alignment = alignment
+        self.starts = []
+        self.ends = []
+        self.inverted_starts = []
+        self.inverted_ends = []
+
+    def add(self, start, end):
+        if end < start:
+            i = bisect_right(self.inverted_starts, start)
+            self.inverted_starts.insert(i, start)
+            self.inverted_ends.insert(i, end)
+            return
+        # Merge with every interval that overlaps or touches [start, end]
+        first = bisect_left(self.ends, start - self.alignment)
+        last = bisect_right(self.starts, end + self.alignment)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    def overlaps(self, start, end):
+        """Returns True if [start, end] shares an address with a used interval."""
+        i = bisect_right(self.starts, end) - 1
+        return i >= 0 and self.ends[i] >= start
+
+    def free_holes(self, start, end):
+        """Returns (address, size) of every unused gap from start up to and including the word at end, in address order."""
+        holes = []
+        address = start
+        limit = end + self.alignment
+        for i in range(bisect_left(self.ends, start), len(self.starts)):
+            if self.starts[i] >= limit:
+                break
+            if self.starts[i] > address:
+                holes.append((address, self.starts[i] - address))
+            address = max(address, self.ends[i] + self.alignment)
+        if address < limit:
+            holes.append((address, limit - address))
+        return holes
+
+    def best_fit(self, size, start_from=0x0000, alignment=4):
+        """
+        Returns the aligned address at or above start_from in the smallest gap between used intervals that holds size bytes
+        (the lowest one on a tie). Falls back to first_fit when no gap is large enough. Ignores inverted ranges.
+        """
+        best = None
+        for i in range(bisect_left(self.ends, start_from), len(self.starts)):
+            gap_start = max(self.ends[i - 1] + self.alignment, start_from) if i > 0 else start_from
+            address = align_up(gap_start, alignment)
+            if address + size <= self.starts[i] and (best is None or self.starts[i] - gap_start < best[0]):
+                best = (self.starts[i] - gap_start, address)
+        return best[1] if best else self.first_fit(size, start_from, alignment)
+
+    def first_fit(self, size, start_from=0x0000, alignment=4):
+        """Returns the lowest aligned address at or above start_from where size bytes fit."""
+        address = align_up(start_from, alignment)
+        while True:
+            last_address = address + size - 1
+            i = bisect_left(self.ends, address)
+            if i < len(self.starts) and self.starts[i] <= last_address:
+                address = align_up(self.ends[i] + 1, alignment)
+                continue
+            blocked = False
+            j = bisect_right(self.inverted_starts, address)
+            while j < len(self.inverted_starts) and self.inverted_starts[j] <= last_address:
+                if self.inverted_ends[j] >= address:
+                    address = align_up(self.inverted_ends[j] + 1, alignment)
+                    blocked = True
+                    break
+                j += 1
+            if not blocked:
+                return address
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import resource
+import tempfile
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpu_config_parser import read_config, parse_config, load_config, submodule_identifier
+from cpu_config_helpers import resolve_all_expressions, compute_config_submodules
+from registers import assign_auto_addresses
+
+def build_submodule_tree(tree_name, num_nodes=1000):
+    """
+    Returns the USER_MODULES lines of one SUBMODULE tree with num_nodes modules of one register each.
+    Node i is a child of node (i-1)//2, so 1000 nodes are 10 levels deep.
+    """
+    children = {index: [] for index in range(num_nodes)}
+    for index in range(1, num_nodes):
+        children[(index - 1) // 2].append(index)
+
+    # Every submodule gets its own SUBMODULE: line, one indent below its parent
+    lines = [f"    {tree_name}_node0_e : TRUE : AUTO : 1"]
+    pending = [(child, 1) for child in reversed(children[0])]
+    while pending:
+        index, level = pending.pop()
+        indent = " " * 8 * level
+        lines.append(f"{indent}SUBMODULE:")
+        lines.append(f"{indent}    {tree_name}_node{index}_e : TRUE : AUTO : 1")
+        pending.extend((child, level + 1) for child in reversed(children[index]))
+    return lines
+
+def build_register_lines(indent, regs_per_module, fields_per_reg):
+    """Returns the lines of regs_per_module RegN entries with fields_per_reg fields each, indented by indent spaces."""
+    pad = " " * indent
+    lines = []
+    for reg_index in range(regs_per_module):
+        lines.append(f"{pad}Reg{reg_index} :")
+        lines.append(f"{pad}    Name : Register {reg_index}")
+        lines.append(f"{pad}    Description : Synthetic register {reg_index}")
+        lines.append(f"{pad}    Permissions : Read/Write")
+        for field_index in range(fields_per_reg):
+            lines.append(f"{pad}    Field{field_index} :")
+            lines.append(f"{pad}        Name : Field {field_index}")
+            lines.append(f"{pad}        Bounds : [{field_index}*FieldWidth+1:{field_index}*FieldWidth]")
+    return lines
+
+def build_include_file(include_index, regs_per_module=16, fields_per_reg=4):
+    """Returns the content of a Module_Include file whose metadata block describes its registers and fields."""
+    lines = ["/*@ModuleMetadataBegin", f"Description : Synthetic included module {include_index}"]
+    lines.extend(build_register_lines(0, regs_per_module, fields_per_reg))
+    lines.append("@ModuleMetadataEnd*/")
+    lines.append(f"module included_module{include_index} ();")
+    lines.append("endmodule")
+    return "\n".join(lines) + "\n"
+
+def build_synthetic_config(num_modules=200, regs_per_module=16, fields_per_reg=4, num_trees=1, tree_nodes=1000, depth=0, repeat=0, includes=0):
+    """
+    Builds a large cpu_config.txt body with AUTO inferred modules, registers and fields, plus deep SUBMODULE trees.
+    Every module gets a chain of depth nested SUBMODULE levels with its own registers and, with repeat > 0, Repeat : repeat.
+    With includes > 0 the modules take their registers from include file included_module<module % includes>.sv in
+    ../include instead (see write_synthetic_cpu_folders).
+    """
+    lines = []
+    if includes:
+        lines.append("CONFIG_PARAMETERS:")
+        lines.append("    INC : ../include")
+        lines.append("")
+    lines.append("BUILTIN_PARAMETERS:")
+    lines.append("    FPGAClkSpeed              : 40000000")
+    lines.append("    BaudRateCPU               : 230400")
+    lines.append("    address_width             : 32")
+    lines.append("    data_width                : 32")
+    lines.append("    RAM_Size                  : 'h2000")
+    lines.append("    VersionStringSize         : 64")
+    lines.append("")
+    lines.append("USER_PARAMETERS:")
+    lines.append("    FieldWidth : 2")
+    lines.append("")
+    lines.append("BUILTIN_MODULES:")
+    lines.append("    ram_e            : TRUE : {0, RAM_Size}")
+    lines.append("    version_string_e : TRUE : {'h8000, 'h8000+(VersionStringSize-1)*4}")
+    lines.append("")
+    lines.append("USER_MODULES:")
+    for module_index in range(num_modules):
+        lines.append(f"    module{module_index}_e : TRUE : AUTO")
+        lines.append(f"        Name : Module {module_index}")
+        lines.append(f"        Description : Synthetic module {module_index}")
+        if repeat:
+            lines.append(f"        Repeat : {repeat}")
+        if includes:
+            lines.append(f"        Module_Include : {{INC}}/included_module{module_index % includes}.sv")
+        else:
+            lines.extend(build_register_lines(8, regs_per_module, fields_per_reg))
+        for level in range(1, depth + 1):
+            lines.append(f"{' ' * 8 * level}SUBMODULE:")
+            lines.append(f"{' ' * (8 * level + 4)}level{level}_e : TRUE : AUTO")
+            lines.extend(build_register_lines(8 * level + 8, regs_per_module, fields_per_reg))
+    for tree_index in range(num_trees):
+        lines.extend(build_submodule_tree(f"tree{tree_index}", tree_nodes))
+    return "\n".join(lines) + "\n"
+
+def write_synthetic_cpu_folders(directory_path, num_cpus=1, num_modules=200, regs_per_module=16, fields_per_reg=4, num_trees=1,
+                                tree_nodes=1000, depth=0, repeat=0, includes=0):
+    """
+    Writes num_cpus CPU folders cpu0, cpu1, ... holding the same build_synthetic_config config into directory_path,
+    and its include files into directory_path/include. Returns the config file paths.
+    """
+    os.makedirs(os.path.join(directory_path, "include"), exist_ok=True)
+    for include_index in range(includes):
+        with open(os.path.join(directory_path, "include", f"included_module{include_index}.sv"), "w") as f:
+            f.write(build_include_file(include_index, regs_per_module, fields_per_reg))
+    config_text = build_synthetic_config(num_modules, regs_per_module, fields_per_reg, num_trees, tree_nodes, depth, repeat, includes)
+    config_paths = []
+    for cpu_index in range(num_cpus):
+        os.makedirs(os.path.join(directory_path, f"cpu{cpu_index}"), exist_ok=True)
+        config_paths.append(os.path.join(directory_path, f"cpu{cpu_index}", "cpu_config.txt"))
+        with open(config_paths[-1], "w") as f:
+            f.write(config_text)
+    return config_paths
+
+# Each stage is (setup, function): setup(config_path) builds the untimed input and function(input) is measured
+benchmark_stages = {
+    "read_config"               : (lambda config_path: config_path, read_config),
+    "parse_config"              : (lambda config_path: config_path, parse_config),
+    "resolve_all_expressions"   : (read_config, resolve_all_expressions),
+    "compute_config_submodules" : (read_config, lambda config_data: compute_config_submodules(config_data, submodule_identifier)),
+    "assign_auto_addresses"     : (load_config, lambda loaded: assign_auto_addresses({"cpu": loaded[0]}, {"cpu": loaded[1]}))
+}
+
+def max_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+def measure_stage(stage, config_path):
+    """Runs one stage once and returns (wall time, peak RSS before it ran, peak RSS after it ran)."""
+    setup, function = benchmark_stages[stage]
+    stage_input = setup(config_path)
+    rss_before = max_rss_bytes()
+    start = time.perf_counter()
+    function(stage_input)
+    elapsed = time.perf_counter() - start
+    return elapsed, rss_before, max_rss_bytes()
+
+def benchmark_stage(stage, config_path, iterations):
+    """
+    Returns the best wall time of a stage over the given iterations and the largest peak RSS growth it caused.
+    Every iteration runs in a fresh forked process so the peak RSS of one run does not hide the next.
+    """
+    best = None
+    peak_rss = 0
+    peak_growth = 0
+    for _ in range(iterations):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as executor:
+            elapsed, rss_before, rss_after = executor.submit(measure_stage, stage, config_path).result()
+        best = elapsed if best is None else min(best, elapsed)
+        peak_rss = max(peak_rss, rss_after)
+        peak_growth = max(peak_growth, rss_after - rss_before)
+    return best, peak_rss, peak_growth
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the cpu_config parser on a large synthetic config")
+    parser.add_argument("--modules", type=int, default=200, help="Number of USER_MODULES entries")
+    parser.add_argument("--registers", type=int, default=16, help="Registers per module")
+    parser.add_argument("--fields", type=int, default=4, help="Fields per register")
+    parser.add_argument("--trees", type=int, default=1, help="Number of SUBMODULE trees")
+    parser.add_argument("--tree-nodes", type=int, default=1000, help="Modules per SUBMODULE tree (a binary tree, 1000 nodes are 10 levels deep)")
+    parser.add_argument("--depth", type=int, default=0, help="Nested SUBMODULE levels below each module")
+    parser.add_argument("--repeat", type=int, default=0, help="Repeat count of each module (0 for no Repeat)")
+    parser.add_argument("--includes", type=int, default=0, help="Module_Include files shared round-robin by the modules (0 for inline registers)")
+    parser.add_argument("--iterations", type=int, default=5, help="Number of timed runs (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_path, = write_synthetic_cpu_folders(temp_dir, 1, args.modules, args.registers, args.fields, args.trees, args.tree_nodes,
+                                                   args.depth, args.repeat, args.includes)
+        with open(config_path, "r") as f:
+            line_count = sum(1 for _ in f)
+
+        for stage in benchmark_stages:
+            best, peak_rss, peak_growth = benchmark_stage(stage, config_path, args.iterations)
+            print(f"{stage}: {line_count} lines, best of {args.iterations}: {best*1000:.1f} ms ({line_count/best:,.0f} lines/s), "
+                  f"peak RSS {peak_rss/2**20:.1f} MiB (+{peak_growth/2**20:.1f} MiB while running)")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import gc
+import os
+import math
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpu_config_parser import process_configs
+from registers import assign_auto_addresses
+from register_map import build_register_maps
+from output_files import capture_outputs
+from cpu_config_generator import config_file_names, reference_system_path, export_specs, spec_export_tasks
+from benchmark_cpu_config import write_synthetic_cpu_folders
+
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_generator_baseline.json")
+baseline_version = 1
+
+# Differences below this are timer noise, not regressions
+noise_floor_seconds = 0.01
+
+# Every header option, so every exporter is timed. verilog-muxes/verilog-regs render all CPUs in one call.
+benchmark_headers = ["new-c", "new-python", "zig", "verilog-muxes", "verilog-regs"]
+
+def timed(times, stage, function, *args, **kwargs):
+    """Runs function(*args, **kwargs), adds its wall time to times[stage] and returns its result. Like timeit, the garbage collector is paused meanwhile."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        times[stage] = times.get(stage, 0.0) + time.perf_counter() - start
+    finally:
+        gc.enable()
+    return result
+
+def time_generator_stages(directory_path):
+    """
+    Runs the generator once on the CPU folders in directory_path and returns {stage: wall time} of process_configs,
+    assign_auto_addresses, build_register_maps and every exporter (all CPUs). Outputs are rendered in memory, not written.
+    """
+    times = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        parsed_configs, submodule_reg_map = timed(times, "process_configs", process_configs, directory_path, config_file_names)
+        timed(times, "assign_auto_addresses", assign_auto_addresses, parsed_configs, submodule_reg_map)
+        register_maps = timed(times, "build_register_maps", build_register_maps, parsed_configs, submodule_reg_map)
+        with capture_outputs():
+            for spec in export_specs(benchmark_headers, directory_path, directory_path, os.path.exists(reference_system_path)):
+                output_paths = {name: os.path.join(directory_path, name, f"{name}{spec.file_suffix}") for name in register_maps}
+                for label, cpu_names, function, kwargs, _ in spec_export_tasks(spec, register_maps, output_paths):
+                    timed(times, spec.exporter.__name__, function, **kwargs)
+    return times
+
+def benchmark_sizes(directory_paths, iterations):
+    """
+    Returns {size: best {stage: wall time}} over iterations runs on each of directory_paths ({size: path}).
+    Every run is in a fresh forked process so no state carries over, and each iteration runs every size in turn
+    so a machine that slows down during the benchmark skews all sizes alike.
+    """
+    best = {size: {} for size in directory_paths}
+    for _ in range(iterations):
+        for size, directory_path in directory_paths.items():
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as executor:
+                times = executor.submit(time_generator_stages, directory_path).result()
+            for stage, elapsed in times.items():
+                best[size][stage] = min(best[size].get(stage, elapsed), elapsed)
+    return best
+
+def stage_growth(results):
+    """Returns {stage: wall time at the largest size / wall time at the smallest} of {size: {stage: wall time}}."""
+    sizes = sorted(results, key=int)
+    return {stage: max(results[sizes[-1]][stage], noise_floor_seconds) / max(results[sizes[0]][stage], noise_floor_seconds)
+            for stage in results[sizes[0]]}
+
+def stage_exponents(results):
+    """
+    Returns {stage: k} where the wall time of the stage grows as (module count)^k from the smallest to the largest size:
+    about 1 for a stage that scales linearly, 2 for a quadratic one and 0 for one that does not depend on the modules.
+    """
+    sizes = sorted(results, key=int)
+    size_ratio = math.log(int(sizes[-1]) / int(sizes[0]))
+    return {stage: math.log(growth) / size_ratio for stage, growth in stage_growth(results).items()}
+
+def machine_info():
+    """Returns what the absolute timings of a baseline depend on besides the generator: the machine and the Python build."""
+    return {"platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(), "python": f"{platform.python_implementation()} {platform.python_version()}"}
+
+def compare_to_baseline(baseline, results, tolerance, growth_tolerance, absolute=False):
+    """
+    Returns a message for every stage whose scaling exponent (see stage_exponents) exceeds the baseline's by more than
+    growth_tolerance. The exponent does not depend on the machine, so any baseline can be used. With absolute, stages
+    more than tolerance (a fraction) and noise_floor_seconds slower than the baseline at some size are reported too.
+    """
+    regressions = []
+    if absolute:
+        for size, times in results.items():
+            for stage, elapsed in times.items():
+                baseline_time = baseline["results"].get(size, {}).get(stage)
+                if baseline_time is not None and elapsed > max(baseline_time * (1 + tolerance), baseline_time + noise_floor_seconds):
+                    regressions.append(f"{stage} at {size} modules: {elapsed*1000:.1f} ms, baseline {baseline_time*1000:.1f} ms")
+    if len(results) > 1:
+        baseline_exponents = stage_exponents(baseline["results"])
+        for stage, exponent in stage_exponents(results).items():
+            if stage in baseline_exponents and exponent > baseline_exponents[stage] + growth_tolerance:
+                regressions.append(f"{stage} grows as modules^{exponent:.2f} from {min(results, key=int)} to {max(results, key=int)} modules, "
+                                   f"baseline modules^{baseline_exponents[stage]:.2f}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark how generate_cpu_instance.py scales on synthetic CPU folders")
+    parser.add_argument("--cpus", type=int, default=2, help="Number of CPU folders")
+    parser.add_argument("--modules", type=int, nargs="+", default=[25, 100], help="USER_MODULES entries per CPU; one run per value")
+    parser.add_argument("--registers", type=int, default=8, help="Registers per module and submodule")
+    parser.add_argument("--fields", type=int, default=2, help="Fields per register")
+    parser.add_argument("--trees", type=int, default=0, help="Number of SUBMODULE trees besides the modules")
+    parser.add_argument("--tree-nodes", type=int, default=100, help="Modules per SUBMODULE tree (a binary tree)")
+    parser.add_argument("--depth", type=int, default=2, help="Nested SUBMODULE levels below each module")
+    parser.add_argument("--repeat", type=int, default=2, help="Repeat count of each module (0 for no Repeat)")
+    parser.add_argument("--includes", type=int, default=4, help="Module_Include files shared round-robin by the modules (0 for inline registers)")
+    parser.add_argument("--iterations", type=int, default=5, help="Number of timed runs per size (best is reported)")
+    parser.add_argument("--baseline", default=default_baseline_path, help="Baseline file to compare against or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline instead of comparing")
+    parser.add_argument("--growth-tolerance", type=float, default=0.5, help="Allowed increase of the exponent each stage grows with (see --modules)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline with --absolute, as a fraction")
+    parser.add_argument("--absolute", action="store_true", help="Also compare the timings themselves, if the baseline was recorded on this machine")
+    args = parser.parse_args()
+
+    parameters = {"num_cpus": args.cpus, "regs_per_module": args.registers, "fields_per_reg": args.fields, "num_trees": args.trees,
+                  "tree_nodes": args.tree_nodes, "depth": args.depth, "repeat": args.repeat, "includes": args.includes}
+    if not os.path.exists(reference_system_path):
+        print(f"Warning: {reference_system_path} not found, the SystemVerilog exporters are not timed")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory_paths = {}
+        for modules in sorted(set(args.modules)):
+            directory_paths[str(modules)] = os.path.join(temp_dir, f"modules{modules}")
+            write_synthetic_cpu_folders(directory_paths[str(modules)], num_modules=modules, **parameters)
+        results = benchmark_sizes(directory_paths, args.iterations)
+    for modules, times in results.items():
+        for stage, elapsed in times.items():
+            print(f"{modules} modules x {args.cpus} CPUs, {stage}: best of {args.iterations}: {elapsed*1000:.1f} ms")
+    if len(results) > 1:
+        exponents = stage_exponents(results)
+        for stage, growth in stage_growth(results).items():
+            print(f"{stage}: {growth:.1f}x from {min(args.modules)} to {max(args.modules)} modules (modules^{exponents[stage]:.2f})")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(json.dumps({"format": baseline_version, "parameters": parameters, "machine": machine_info(), "results": results}, indent=1) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("format") != baseline_version or baseline["parameters"] != parameters or set(baseline["results"]) != set(results):
+            print(f"Warning: {args.baseline} was recorded with other parameters, not comparing")
+        else:
+            absolute = args.absolute
+            if absolute and baseline.get("machine") != machine_info():
+                print(f"Warning: {args.baseline} was recorded on another machine, only comparing how the stages grow")
+                absolute = False
+            if len(results) < 2 and not absolute:
+                print("Warning: growth needs at least two --modules values, nothing to compare")
+            regressions = compare_to_baseline(baseline, results, args.tolerance, args.growth_tolerance, absolute)
+            for regression in regressions:
+                print(f"Regression: {regression}")
+            print(f"{len(regressions)} regressions against {args.baseline}")
+            sys.exit(1 if regressions else 0)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_cpu_config import write_synthetic_cpu_folders
+from combine_gen_cpu_deps import compiled_bundle_path
+
+generator_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generate_cpu_instance.py")
+
+def time_command(command, cwd, iterations, cold=False):
+    """
+    Returns the wall times of running command iterations times. With cold=True the compiled bundle is deleted
+    before every run, so each run pays for combining and compiling the generator as every run did before the bundle was cached.
+    """
+    times = []
+    for _ in range(iterations):
+        if cold and os.path.exists(compiled_bundle_path()):
+            os.remove(compiled_bundle_path())
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+def report(name, times):
+    times = sorted(times)
+    print(f"{name}: best {times[0]*1000:.0f} ms, median {times[len(times)//2]*1000:.0f} ms over {len(times)} runs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the start-up time of generate_cpu_instance.py")
+    parser.add_argument("--iterations", type=int, default=10, help="Number of timed runs per case")
+    parser.add_argument("--modules", type=int, default=20, help="USER_MODULES entries of the config used for the no-op run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # A no-op run: every output of the config is already up to date, so the run only parses and checks the manifest
+        write_synthetic_cpu_folders(temp_dir, 1, args.modules, 4, 2, 1, 15)
+        reference_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ref_fpga_sys_lite.sv")
+        if not os.path.exists(reference_file):
+            print(f"Warning: {reference_file} not found, the no-op run will fail")
+        help_command = [sys.executable, generator_script, "--help"]
+        noop_command = [sys.executable, generator_script, "--configs-path", temp_dir, "--gen-headers", "new-c", "new-python"]
+        subprocess.run(noop_command, cwd=temp_dir, stdout=subprocess.DEVNULL, check=True)
+
+        report("--help, rebuilding the bundle", time_command(help_command, temp_dir, args.iterations, cold=True))
+        report("--help, compiled bundle", time_command(help_command, temp_dir, args.iterations))
+        report("no-op run, rebuilding the bundle", time_command(noop_command, temp_dir, args.iterations, cold=True))
+        report("no-op run, compiled bundle", time_command(noop_command, temp_dir, args.iterations))
@@ -0,0 +1,102 @@
+import os
+import json
+
+from config_cache import file_digest
+from output_files import write_outputs_manifest
+
+build_manifest_file_name = ".cpu_config_manifest.json"
+build_manifest_version = 1
+
+class BuildManifest:
+    """
+    Records, for every generated output, the digests of the input files it was built from,
+    the generator options used and the generator fingerprint.
+    Outputs whose record still matches are skipped on the next run.
+    save() also writes outputs.manifest.json with the digest of every output for downstream tools.
+    """
+    def __init__(self, directory_path, fingerprint, rebuild_all=False, explain=False):
+        self.directory_path = directory_path
+        self.manifest_path = os.path.join(directory_path, build_manifest_file_name)
+        self.fingerprint = fingerprint
+        self.rebuild_all = rebuild_all
+        self.explain = explain
+        self.input_digests = {}
+        self.pending = {}
+        self.outputs = {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("format") == build_manifest_version:
+                self.outputs = manifest.get("outputs", {})
+        except (OSError, ValueError):
+            pass
+
+    def output_key(self, output_path):
+        return os.path.relpath(output_path, self.directory_path)
+
+    def input_digest(self, path):
+        if path not in self.input_digests:
+            self.input_digests[path] = file_digest(path)
+        return self.input_digests[path]
+
+    def check(self, output_path, input_paths, options):
+        """Returns why output_path has to be rebuilt, or None if it is up to date."""
+        inputs = {path: self.input_digest(path) for path in sorted(input_paths)}
+        key = self.output_key(output_path)
+        self.pending[key] = {"inputs": inputs, "options": options, "fingerprint": self.fingerprint}
+        previous = self.outputs.get(key)
+
+        if self.rebuild_all:
+            return "full rebuild requested"
+        if previous is None:
+            return "no record of a previous build"
+        output_digest = file_digest(output_path)
+        if output_digest != previous.get("output"):
+            return "output file is missing" if output_digest is None else "output file was modified after it was generated"
+        if previous.get("fingerprint") != self.fingerprint:
+            return "generator code changed"
+        if previous.get("options") != options:
+            changed = sorted(name for name in set(options) | set(previous.get("options", {}))
+                             if options.get(name) != previous.get("options", {}).get(name))
+            return f"options changed: {', '.join(changed)}"
+        previous_inputs = previous.get("inputs", {})
+        for path in sorted(set(inputs) | set(previous_inputs)):
+            if path not in previous_inputs:
+                return f"new input: {path}"
+            if path not in inputs:
+                return f"input no longer used: {path}"
+            if inputs[path] != previous_inputs[path]:
+                return f"input {'created' if previous_inputs[path] is None else 'deleted' if inputs[path] is None else 'changed'}: {path}"
+        return None
+
+    def stale_outputs(self, outputs, together=False):
+        """
+        Takes {name: (output_path, input_paths, options)} and returns the names that need rebuilding.
+        With together=True every output is rebuilt as soon as one of them is out of date.
+        """
+        reasons = {name: self.check(*output) for name, output in outputs.items()}
+        if together and any(reasons.values()):
+            reasons = {name: reason or "rebuilt together with the other CPUs' outputs" for name, reason in reasons.items()}
+        if self.explain:
+            for name, (output_path, _, _) in outputs.items():
+                print(f"{self.output_key(output_path)}: {'rebuilding, ' + reasons[name] if reasons[name] else 'up to date, skipped'}")
+        return [name for name in outputs if reasons[name]]
+
+    def record(self, output_paths):
+        """Records output_paths as rebuilt from the inputs and options given to check(). Outputs an exporter chose not to write are recorded as absent."""
+        for output_path in output_paths:
+            key = self.output_key(output_path)
+            self.outputs[key] = dict(self.pending[key], output=file_digest(output_path))
+
+    def record_move(self, output_path, new_path):
+        """Moves the record of output_path to new_path after the recorded output was moved there."""
+        record = self.outputs.pop(self.output_key(output_path), None)
+        if record is not None:
+            self.outputs[self.output_key(new_path)] = dict(record, output=file_digest(new_path))
+
+    def save(self):
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"format": build_manifest_version, "outputs": self.outputs}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+        write_outputs_manifest(self.directory_path, {key: output["output"] for key, output in self.outputs.items() if output.get("output")})
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import difflib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpu_config_parser import read_config, compute_config_submodules, submodule_identifier
+
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+parity_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_parity")
+golden_directory = os.path.join(parity_directory, "golden")
+
+# Configs whose parse is pinned by a golden dump: {name: config path relative to the repo root}
+parity_configs = {
+    "sim_cpu"  : "sim/cpu_sim/cpu_config.txt",
+    "cpu_test" : "scripts/cpu_config/parser_parity/configs/cpu_test/cpu_config.txt", # docs/getting_started.md
+    "cpu_a"    : "scripts/cpu_config/parser_parity/configs/cpu_a/cpu_config.txt",
+    "cpu_b"    : "scripts/cpu_config/parser_parity/configs/cpu_b/cpu_config.cfg",
+}
+
+def portable(value):
+    """Returns value as plain JSON data (tuples become lists) with paths inside the repo made relative to <repo>."""
+    if isinstance(value, dict):
+        return {str(key): portable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [portable(item) for item in value]
+    if isinstance(value, str) and value.startswith(repo_root + os.sep):
+        return "<repo>/" + os.path.relpath(value, repo_root).replace(os.sep, "/")
+    return value
+
+def parse_dump(config_path):
+    """
+    Returns the JSON dump of one config as the parser sees it: the config_data read_config returns and
+    the resolved config and submodule map compute_config_submodules makes of it.
+    """
+    # read_config is dumped before resolving, as compute_config_submodules resolves the dictionary in place
+    read_dump = portable(read_config(config_path))
+    parsed_config, submodule_map = compute_config_submodules(read_config(config_path), submodule_identifier)
+    dump = {"read_config": read_dump, "parse_config": {"config": portable(parsed_config), "submodule_map": portable(submodule_map)}}
+    return json.dumps(dump, indent=1) + "\n"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the cpu_config parser still parses the parity configs into their golden dumps")
+    parser.add_argument("--update", action="store_true", help="Rewrite the golden dumps from the current parser")
+    args = parser.parse_args()
+
+    mismatches = 0
+    for name, config_path in parity_configs.items():
+        golden_path = os.path.join(golden_directory, f"{name}.json")
+        dump = parse_dump(os.path.join(repo_root, config_path))
+        if args.update:
+            os.makedirs(golden_directory, exist_ok=True)
+            with open(golden_path, "w") as f:
+                f.write(dump)
+            print(f"{name}: golden dump saved to {golden_path}")
+            continue
+        with open(golden_path, "r") as f:
+            golden = f.read()
+        if dump == golden:
+            print(f"{name}: OK")
+        else:
+            mismatches += 1
+            print(f"{name}: differs from {golden_path}")
+            sys.stdout.writelines(difflib.unified_diff(golden.splitlines(True), dump.splitlines(True), "golden", "current"))
+
+    if not args.update:
+        print(f"{len(parity_configs) - mismatches} of {len(parity_configs)} configs match their golden dumps")
+        sys.exit(1 if mismatches else 0)
@@ -1,37 +1,68 @@
 #!/usr/bin/env python3
 import os
+import sys
 import stat
+import struct
+import marshal
+import hashlib
+import argparse
+import importlib.util
+
+# Modules concatenated into the generator, main_gen_cpu_instance.py last
+modules = [
+    "sv_expression.py",
+    "generator_profile.py",
+    "cpu_config_helpers.py",
+    "register_model.py",
+    "address_allocator.py",
+    "config_cache.py",
+    "output_files.py",
+    "build_manifest.py",
+    "cpu_config_parser.py",
+    "registers.py",
+    "register_map.py",
+    "verilog.py",
+    "config_watch.py",
+    "cpu_config_generator.py",
+    "config_sweep.py",
+    "main_gen_cpu_instance.py"
+]
+# Header exporters. The compiled bundle keeps each one as its own code object that only runs when its output is requested.
+exporter_modules = [
+    "headers/c_headers.py",
+    "headers/python_headers.py",
+    "headers/verilog_headers.py",
+    "headers/zig_headers.py",
+]
+
+# Bumped whenever the layout of the compiled bundle changes
+bundle_format_version = 1
+
+def module_lines(current_directory, filename):
+    """Returns the lines of one module with the imports of other generator modules removed."""
+    local_modules = [os.path.splitext(m)[0].split("/")[-1] for m in modules + exporter_modules]
+    output_lines = []
+    with open(f"{current_directory}/{filename}", "r") as f:
+        for line in f:
+            if any(
+                line.strip().startswith(f"from {mod} ") or
+                line.strip().startswith(f"import {mod}")
+                for mod in local_modules
+            ):
+                continue
+            output_lines.append(line)
+    output_lines.append("\n")
+    return output_lines
 
 def generate_script(write_to_file=True):
     current_directory = os.path.dirname(os.path.abspath(__file__))
-    modules = [
-        "cpu_config_helpers.py",
-        "cpu_config_parser.py",
-        "headers/c_headers.py",
-        "headers/python_headers.py",
-        "headers/verilog_headers.py",
-        "headers/zig_headers.py",
-        "registers.py", 
-        "verilog.py", 
-        "main_gen_cpu_instance.py"
-    ]
     output_file = f"{current_directory}/../../generate_cpu_instance.py"
-    local_modules = [os.path.splitext(m)[0].split("/")[-1] for m in modules]
-    local_modules.append([".".join(os.path.splitext(m)[0].split("/")) for m in modules])
 
     output_lines = ["#!/usr/bin/env python3\n"]
 
-    for filename in modules:
-        with open(f"{current_directory}/{filename}", "r") as f:
-            for line in f:
-                if any(
-                    line.strip().startswith(f"from {mod} ") or 
-                    line.strip().startswith(f"import {mod}")
-                    for mod in local_modules
-                ):
-                    continue
-                output_lines.append(line)
-            output_lines.append("\n")
+    # The standalone script defines the exporters up front, before the main module runs
+    for filename in modules[:-1] + exporter_modules + modules[-1:]:
+        output_lines.extend(module_lines(current_directory, filename))
 
     if write_to_file:
         with open(output_file, "w") as out:
@@ -40,6 +71,75 @@ def generate_script(write_to_file=True):
     else:
         return "".join(output_lines)
 
+def exporter_module_name(filename):
+    return ".".join(os.path.splitext(filename)[0].split("/"))
+
+def compiled_bundle_path():
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_directory, "__pycache__", f"generate_cpu_instance.{sys.implementation.cache_tag}.bundle")
+
+def bundle_source_key():
+    """Hashes the size and modification time of every bundled file (and of this one), the same check Python uses for .pyc files."""
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for filename in modules + exporter_modules + [os.path.basename(__file__)]:
+        file_stat = os.stat(os.path.join(current_directory, filename))
+        digest.update(f"{filename}\0{file_stat.st_size}\0{file_stat.st_mtime_ns}\0".encode())
+    return digest.digest()
+
+def compile_bundle():
+    """Returns (code, exporter_code): the code object of the generator and {module name: code object} of every header exporter."""
+    current_directory = os.path.dirname(os.path.abspath(__file__))
+    source = "".join(["#!/usr/bin/env python3\n"] + [line for filename in modules for line in module_lines(current_directory, filename)])
+    exporter_code = {
+        exporter_module_name(filename): compile("".join(module_lines(current_directory, filename)), "<string>", "exec")
+        for filename in exporter_modules
+    }
+    return compile(source, "<string>", "exec"), exporter_code
+
+def bundle_header(source_key):
+    return importlib.util.MAGIC_NUMBER + struct.pack("<I", bundle_format_version) + source_key
+
+def write_compiled_bundle(path, source_key, code, exporter_code):
+    """
+    Writes the compiled bundle: Python's bytecode magic number, the bundle format version and the source key,
+    followed by the marshalled code objects. A bundle whose header does not match is rebuilt.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(bundle_header(source_key))
+        f.write(marshal.dumps((code, exporter_code)))
+    os.replace(temp_path, path)
+
+def load_compiled_bundle():
+    """
+    Returns (code, exporter_code) from the compiled bundle, rebuilding it first if a generator source file changed.
+    If the bundle cannot be written (e.g. a read-only install) the freshly compiled code is used without caching it.
+    """
+    path = compiled_bundle_path()
+    source_key = bundle_source_key()
+    header = bundle_header(source_key)
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(header)) == header:
+                return marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    code, exporter_code = compile_bundle()
+    try:
+        write_compiled_bundle(path, source_key, code, exporter_code)
+    except OSError:
+        pass
+    return code, exporter_code
 
 if __name__ == "__main__":
-    generate_script()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Combine the cpu_config generator modules")
+    parser.add_argument("--compiled", action='store_true', help="Write the compiled bundle loaded by generate_cpu_instance.py instead of a standalone script")
+    args = parser.parse_args()
+    if args.compiled:
+        write_compiled_bundle(compiled_bundle_path(), bundle_source_key(), *compile_bundle())
+        print(f"Compiled bundle saved to: {compiled_bundle_path()}")
+    else:
+        generate_script()
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import types
+import hashlib
+import importlib
+import importlib.util
+
+from cpu_config_helpers import submodule_reg_add_map_tuple
+
+cache_dir_env_var = "CPU_CONFIG_CACHE_DIR"
+cache_format_version = 1
+
+def resolve_cache_dir(cache_dir=None, no_cache=False):
+    """Returns the config cache directory from the --cache-dir option or the environment, or None when disabled."""
+    if no_cache:
+        return None
+    return cache_dir or os.environ.get(cache_dir_env_var) or None
+
+def file_digest(path):
+    """Returns the sha256 of a file's contents or None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def hash_code_object(code, digest):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            hash_code_object(const, digest)
+        elif isinstance(const, frozenset):
+            digest.update(repr(sorted(repr(c) for c in const)).encode())
+        else:
+            digest.update(repr(const).encode())
+
+def generator_fingerprint(namespace, module_code=None):
+    """
+    Hashes the code of every function and class method in namespace (the generator's globals), plus the
+    {name: code object} of modules in module_code that are not loaded yet (None entries are skipped).
+    Cache entries written by a different generator version or Python version never match.
+    """
+    digest = hashlib.sha256(f"{cache_format_version}:{sys.version}".encode())
+    for name in sorted(namespace):
+        obj = namespace[name]
+        if isinstance(obj, types.FunctionType):
+            digest.update(name.encode())
+            hash_code_object(obj.__code__, digest)
+        elif isinstance(obj, type):
+            for attr_name, attr in sorted(vars(obj).items()):
+                if isinstance(attr, types.FunctionType):
+                    digest.update(f"{name}.{attr_name}".encode())
+                    hash_code_object(attr.__code__, digest)
+    for name, code in sorted((module_code or {}).items()):
+        if code is not None:
+            digest.update(name.encode())
+            hash_code_object(code, digest)
+    return digest.hexdigest()
+
+def generator_sources_fingerprint():
+    """
+    Returns the fingerprint config cache entries are keyed on: the sources of every generator module listed in
+    combine_gen_cpu_deps.modules, so editing any of them invalidates the cache whether the generator runs from the
+    bundle or is imported module by module. A standalone combined script, where the combiner cannot be found,
+    holds every module in its own globals, so those are fingerprinted instead.
+    """
+    if importlib.util.find_spec("combine_gen_cpu_deps") is None:
+        return generator_fingerprint(globals())
+    combiner = importlib.import_module("combine_gen_cpu_deps")
+    generator_directory = os.path.dirname(os.path.abspath(combiner.__file__))
+    digest = hashlib.sha256(f"{cache_format_version}:{sys.version}".encode())
+    for filename in combiner.modules:
+        digest.update(f"{filename}\0{file_digest(os.path.join(generator_directory, filename))}\0".encode())
+    return digest.hexdigest()
+
+def cache_key(fingerprint, dependency_digests):
+    digest = hashlib.sha256(fingerprint.encode())
+    for path, path_digest in sorted(dependency_digests.items()):
+        digest.update(f"{path}\0{path_digest}\0".encode())
+    return digest.hexdigest()
+
+def cache_entry_path(cache_dir, config_path):
+    name = hashlib.sha256(os.path.abspath(config_path).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}.json")
+
+def load_cached_config(cache_dir, config_path, fingerprint):
+    """Returns (parsed_config, submodule_reg_map, dependencies) if the cached entry for config_path is still valid, otherwise None."""
+    try:
+        with open(cache_entry_path(cache_dir, config_path), "r") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if entry.get("format") != cache_format_version or entry.get("config_path") != os.path.abspath(config_path):
+        return None
+    # Every dependency (config file, included files and probed include candidates) must hash the same
+    dependency_digests = {path: file_digest(path) for path in entry.get("dependencies", {})}
+    if dependency_digests != entry["dependencies"] or entry.get("key") != cache_key(fingerprint, dependency_digests):
+        return None
+
+    submodule_reg_map = [submodule_reg_add_map_tuple(*values) for values in entry["submodule_reg_map"]]
+    dependencies = {path: path_digest is not None for path, path_digest in dependency_digests.items()}
+    return entry["parsed_config"], submodule_reg_map, dependencies
+
+def store_cached_config(cache_dir, config_path, fingerprint, dependencies, parsed_config, submodule_reg_map):
+    """Writes the resolved config for config_path. dependencies maps every probed or read path to whether it existed."""
+    dependency_digests = {os.path.abspath(config_path): file_digest(config_path)}
+    for path, existed in dependencies.items():
+        dependency_digests[path] = file_digest(path) if existed else None
+
+    entry = {
+        "format"            : cache_format_version,
+        "config_path"       : os.path.abspath(config_path),
+        "key"               : cache_key(fingerprint, dependency_digests),
+        "dependencies"      : dependency_digests,
+        "parsed_config"     : parsed_config,
+        "submodule_reg_map" : [list(submodule) for submodule in submodule_reg_map]
+    }
+
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_path = cache_entry_path(cache_dir, config_path)
+    temp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(entry, f)
+    os.replace(temp_path, entry_path)
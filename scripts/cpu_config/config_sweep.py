@@ -0,0 +1,192 @@
+import os
+import io
+import copy
+import json
+import itertools
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from cpu_config_parser import read_config, find_config_paths, submodule_identifier
+from cpu_config_helpers import IncludeFileCache, compute_config_submodules
+from register_model import cpu_config_from_dict
+from registers import assign_auto_addresses
+from address_allocator import allocation_options
+from cpu_config_generator import render_outputs, check_output_options
+from output_files import write_output_file
+
+sweep_report_file_name = "sweep_report.json"
+sweep_report_version = 1
+
+# Overrides the Repeat count of every module (or submodule) with the given name: <module>.Repeat=<count>
+repeat_override_suffix = ".Repeat"
+
+def parameter_override(text):
+    """Parses a -P NAME=VALUE[,VALUE...] argument into (name, [values])."""
+    name, separator, values = text.partition("=")
+    values = [value.strip() for value in values.split(",")]
+    if not separator or not name.strip() or not all(values):
+        raise ValueError(f"Expected NAME=VALUE[,VALUE...], got '{text}'")
+    return name.strip(), values
+
+def read_sweep_file(path):
+    """
+    Reads a sweep file with one 'NAME : VALUE, VALUE, ...' line per swept parameter (# starts a comment).
+    Returns [(name, [values])] in file order.
+    """
+    axes = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            text = line.split("#", 1)[0].strip()
+            if not text:
+                continue
+            name, separator, values = text.partition(":")
+            values = [value.strip() for value in values.split(",")]
+            if not separator or not name.strip() or not all(values):
+                raise SyntaxError("Expected 'NAME : VALUE, VALUE, ...'", (path, line_number, None, line.rstrip("\n")))
+            axes.append((name.strip(), values))
+    return axes
+
+def sweep_variants(axes):
+    """Returns {name: value} for every combination of the values of axes ([(name, [values])]), the last axis changing fastest."""
+    names = [name for name, _ in axes]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Parameter '{duplicates[0]}' is swept more than once")
+    return [dict(zip(names, values)) for values in itertools.product(*(values for _, values in axes))]
+
+def override_targets(config_data, name):
+    """
+    Returns the entries of an unresolved config that an override of name sets: the BUILTIN/USER parameter called name,
+    or for <module>.Repeat every module whose own name (the last part of a submodule's name) is module.
+    """
+    if name.endswith(repeat_override_suffix):
+        module_name = name[:-len(repeat_override_suffix)]
+        return [module_data for section in ["BUILTIN_MODULES", "USER_MODULES"] for module, module_data in config_data.get(section, {}).items()
+                if isinstance(module_data, dict) and module.split(submodule_identifier)[-1] == module_name]
+    return [config_data[section][name] for section in ["BUILTIN_PARAMETERS", "USER_PARAMETERS"] if name in config_data.get(section, {})]
+
+def apply_parameter_overrides(config_data, overrides):
+    """
+    Applies {name: value} overrides to an unresolved config (as returned by read_config) in place. Values are expressions,
+    as in the config file. The allocation options of CONFIG_PARAMETERS (see allocation_options) can be overridden as well.
+    """
+    for name, value in overrides.items():
+        if value.startswith("{") and value.endswith("}"):
+            value = value[1:-1].strip()
+        if name in allocation_options:
+            config_data.setdefault("CONFIG_PARAMETERS", {})[name] = {"value": value}
+        elif name.endswith(repeat_override_suffix):
+            for module_data in override_targets(config_data, name):
+                module_data.setdefault("repeat", {"expand_regs": "FALSE"})["value"] = value
+        else:
+            for parameter_data in override_targets(config_data, name):
+                parameter_data["value"] = value
+
+def read_unresolved_configs(directory_path, config_file_names):
+    """Reads the config of every CPU folder in directory_path once, without resolving it, and returns {cpu_name: config dict}."""
+    include_cache = IncludeFileCache()
+    unresolved_configs = {}
+    for folder, config_path in find_config_paths(directory_path, config_file_names).items():
+        try:
+            unresolved_configs[folder] = read_config(config_path, include_cache)
+        except Exception as e:
+            if hasattr(e, "add_note"):
+                e.add_note(f"While processing CPU folder '{folder}': {config_path}")
+            raise
+    if not unresolved_configs:
+        raise FileNotFoundError("No Config Files Found")
+    return unresolved_configs
+
+def resolve_variant(unresolved_configs, overrides):
+    """
+    Resolves a copy of the unresolved configs with overrides applied, expands their Repeat and submodule trees and assigns addresses.
+    Returns (parsed_configs, submodule_reg_map, usage) with usage as filled in by assign_auto_addresses.
+    """
+    parsed_configs = {}
+    submodule_reg_map = {}
+    for cpu_name, config_data in unresolved_configs.items():
+        try:
+            config_data = copy.deepcopy(config_data)
+            apply_parameter_overrides(config_data, overrides)
+            parsed_config, submodule_reg_map[cpu_name] = compute_config_submodules(config_data, submodule_identifier)
+            parsed_configs[cpu_name] = cpu_config_from_dict(parsed_config)
+        except Exception as e:
+            if hasattr(e, "add_note"):
+                e.add_note(f"While processing CPU folder '{cpu_name}'")
+            raise
+    usage = {}
+    assign_auto_addresses(parsed_configs, submodule_reg_map, usage_report=usage)
+    return parsed_configs, submodule_reg_map, usage
+
+# (unresolved configs, variants, output options) of the current run_sweep call, inherited by its forked workers
+pending_sweep = None
+
+def run_sweep_variant(index):
+    """
+    Resolves, allocates and renders variant index of pending_sweep in memory.
+    Returns (outputs, usage, printed, error): outputs as returned by render_outputs, what the variant printed
+    and, if it failed, its error as text (outputs and usage are empty then).
+    """
+    unresolved_configs, variants, absolute_path, headers, registers, systemverilog = pending_sweep
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        try:
+            parsed_configs, submodule_reg_map, usage = resolve_variant(unresolved_configs, variants[index])
+            outputs = render_outputs(parsed_configs, submodule_reg_map, absolute_path, headers, registers, systemverilog)
+        except Exception as e:
+            error = "\n".join([f"{type(e).__name__}: {e}"] + getattr(e, "__notes__", []))
+            return {}, {}, printed.getvalue(), error
+    return outputs, usage, printed.getvalue(), None
+
+def print_variant_report(variant_name, overrides, printed, usage, error):
+    """Prints the overrides of a variant, what it printed and the address map usage of every section of its CPUs (see allocation_usage)."""
+    print(f"{variant_name}: {', '.join(f'{name}={value}' for name, value in overrides.items())}")
+    print(printed, end="")
+    if error:
+        print(f"    Failed: {error}")
+        return
+    for cpu_name, cpu_usage in usage.items():
+        for section, section_usage in cpu_usage.items():
+            print(f"    {cpu_name} {section}: 0x{section_usage['low']:X}-0x{section_usage['high']:X}, "
+                  f"0x{section_usage['used']:X} bytes of registers ({section_usage['utilization']:.1f}% utilization), "
+                  f"largest free hole 0x{section_usage['largest_hole']:X} bytes, {section_usage['fragmentation']:.1f}% fragmentation")
+
+def run_sweep(directory_path, config_file_names, axes, sweep_directory, headers=None, registers=None, systemverilog=True, jobs=1):
+    """
+    Generates one variant per combination of the parameter values in axes ([(name, [values])]) into sweep_directory/variant_<n>.
+    The configs are read once; each variant only re-runs expression resolution, allocation and export, in forked worker
+    processes with jobs > 1. The address map usage of every variant is printed and saved to sweep_report.json together
+    with its overrides. A failing variant is reported and the others still run. Returns the number of failed variants.
+    """
+    global pending_sweep
+    check_output_options(headers, registers)
+    variants = sweep_variants(axes)
+    unresolved_configs = read_unresolved_configs(directory_path, config_file_names)
+    for name, _ in axes:
+        if name not in allocation_options and not any(override_targets(config_data, name) for config_data in unresolved_configs.values()):
+            raise ValueError(f"Parameter '{name}' is not defined by any CPU config")
+
+    variant_names = [f"variant_{index + 1:0{len(str(len(variants)))}d}" for index in range(len(variants))]
+    pending_sweep = (unresolved_configs, variants, directory_path, headers, registers, systemverilog)
+    report = []
+    try:
+        with contextlib.ExitStack() as stack:
+            if jobs > 1 and len(variants) > 1 and "fork" in multiprocessing.get_all_start_methods():
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")))
+                results = executor.map(run_sweep_variant, range(len(variants)))
+            else:
+                results = map(run_sweep_variant, range(len(variants)))
+            # Results come in variant order, so the output reads the same as a serial run
+            for variant_name, overrides, (outputs, usage, printed, error) in zip(variant_names, variants, results):
+                for path, content in outputs.items():
+                    write_output_file(os.path.join(sweep_directory, variant_name, path), content)
+                print_variant_report(variant_name, overrides, printed, usage, error)
+                report.append({"name": variant_name, "overrides": overrides, "error": error, "usage": usage})
+    finally:
+        pending_sweep = None
+
+    write_output_file(os.path.join(sweep_directory, sweep_report_file_name),
+                      json.dumps({"format": sweep_report_version, "variants": report}, indent=1) + "\n")
+    failed_variants = sum(1 for variant in report if variant["error"])
+    print(f"Generated {len(variants) - failed_variants} of {len(variants)} variants into {sweep_directory}")
+    return failed_variants
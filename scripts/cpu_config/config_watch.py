@@ -0,0 +1,98 @@
+import os
+import time
+
+from cpu_config_helpers import IncludeFileCache
+from cpu_config_parser import find_config_paths, load_config
+from config_cache import generator_sources_fingerprint
+from registers import assign_auto_addresses
+
+watch_poll_interval = 0.1
+
+def snapshot_files(paths):
+    """Returns {path: (mtime_ns, size)} for every path, with None for paths that do not exist."""
+    snapshot = {}
+    for path in paths:
+        try:
+            file_stat = os.stat(path)
+            snapshot[path] = (file_stat.st_mtime_ns, file_stat.st_size)
+        except OSError:
+            snapshot[path] = None
+    return snapshot
+
+def watched_paths(dependencies, extra_paths):
+    """Every config, included or probed file of every CPU folder plus extra_paths."""
+    paths = set(extra_paths)
+    for folder_dependencies in dependencies.values():
+        paths.update(folder_dependencies)
+    return paths
+
+def watch_configs(directory_path, config_file_names, parsed_configs, submodule_reg_map, dependencies, regenerate,
+                  extra_paths=[], cache_dir=None, poll_interval=watch_poll_interval):
+    """
+    Keeps the resolved configs resident and polls their config and Module_Include files until interrupted.
+    On a change only the affected CPU folders are parsed and allocated again, then regenerate(parsed_configs, submodule_reg_map, dependencies) is called.
+    parsed_configs, submodule_reg_map and dependencies are the (already allocated) results of process_configs and are updated in place.
+    """
+    include_cache = IncludeFileCache()
+    fingerprint = generator_sources_fingerprint() if cache_dir else None
+    config_paths = find_config_paths(directory_path, config_file_names)
+    snapshot = snapshot_files(watched_paths(dependencies, extra_paths))
+    failed_folders = set()
+    print(f"Watching {len(snapshot)} files for {len(config_paths)} CPU folders in {directory_path} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(poll_interval)
+            current_config_paths = find_config_paths(directory_path, config_file_names)
+            current_snapshot = snapshot_files(snapshot)
+            changed_paths = {path for path in snapshot if current_snapshot[path] != snapshot[path]}
+            if not changed_paths and current_config_paths == config_paths:
+                continue
+
+            start_time = time.perf_counter()
+            changed_folders = [
+                folder for folder, config_path in current_config_paths.items()
+                if folder in failed_folders or config_paths.get(folder) != config_path or changed_paths & dependencies.get(folder, {}).keys()
+            ]
+            for folder in set(dependencies) - set(current_config_paths):
+                dependencies.pop(folder)
+            config_paths = current_config_paths
+            include_cache.forget_probes() # Include candidates may have been created or removed
+
+            try:
+                reloaded = {}
+                for folder in changed_folders:
+                    try:
+                        reloaded[folder] = load_config(config_paths[folder], include_cache, cache_dir, fingerprint)
+                        assign_auto_addresses({folder: reloaded[folder][0]}, {folder: reloaded[folder][1]})
+                    except Exception as e:
+                        if hasattr(e, "add_note"):
+                            e.add_note(f"While processing CPU folder '{folder}': {config_paths[folder]}")
+                        raise
+
+                # Rebuild in folder order so outputs match a full run
+                updated_configs = {}
+                updated_submodule_reg_map = {}
+                for folder in config_paths:
+                    if folder in reloaded:
+                        updated_configs[folder], updated_submodule_reg_map[folder], dependencies[folder] = reloaded[folder]
+                    else:
+                        updated_configs[folder], updated_submodule_reg_map[folder] = parsed_configs[folder], submodule_reg_map[folder]
+                parsed_configs.clear()
+                parsed_configs.update(updated_configs)
+                submodule_reg_map.clear()
+                submodule_reg_map.update(updated_submodule_reg_map)
+
+                regenerate(parsed_configs, submodule_reg_map, dependencies)
+                failed_folders = set()
+                print(f"Regenerated after changes to {', '.join(changed_folders) or 'shared files'} in {(time.perf_counter() - start_time)*1000:.0f} ms")
+            except Exception as e:
+                # Keep the last good model and retry the failed folders after the next change
+                failed_folders.update(changed_folders)
+                print(f"Error: {type(e).__name__}: {e}")
+                for note in getattr(e, "__notes__", []):
+                    print(note)
+
+            snapshot = snapshot_files(watched_paths(dependencies, extra_paths))
+    except KeyboardInterrupt:
+        print("Stopped watching")
@@ -0,0 +1,234 @@
+import os
+import io
+import contextlib
+import importlib
+import importlib.util
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from cpu_config_parser import *
+from verilog import *
+from registers import *
+from register_map import build_register_maps
+from output_files import capture_outputs
+from generator_profile import profile_phase, profiled_call, merge_worker_phases, record_config_counts
+
+config_file_names = ["cpu_config.txt", "cpu_config.cfg"]
+
+reference_system_file = "ref_fpga_sys_lite.sv"
+reference_system_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), reference_system_file)
+
+# Header exporters are only loaded once an output needs them: {function name: module}.
+# The compiled bundle passes their code objects in as bundled_exporters: {module: code object}.
+header_exporters = {
+    "export_c_headers"       : "headers.c_headers",
+    "export_python_headers"  : "headers.python_headers",
+    "export_zig_headers"     : "headers.zig_headers",
+    "export_verilog_headers" : "headers.verilog_headers",
+}
+bundled_exporters = globals().get("bundled_exporters", {})
+
+def header_exporter_code(function_name):
+    """Returns the code of the module defining a header exporter without running it, or None if the exporter is already defined here."""
+    if function_name in globals():
+        return None
+    module_name = header_exporters[function_name]
+    if module_name in bundled_exporters:
+        return bundled_exporters[module_name]
+    return importlib.util.find_spec(module_name).loader.get_code(module_name)
+
+def load_header_exporter(function_name):
+    """Returns a header exporter, loading its module on first use. Bundled exporters run in the generator's own namespace."""
+    if function_name not in globals():
+        module_name = header_exporters[function_name]
+        if module_name in bundled_exporters:
+            exec(bundled_exporters[module_name], globals())
+        else:
+            globals()[function_name] = getattr(importlib.import_module(module_name), function_name)
+    return globals()[function_name]
+
+# --gen-headers options and the exporter flag each one sets. The C and Python headers are written for any selection.
+header_flags = {
+    "new-python"    : "new_python_header",
+    "new-c"         : "new_c_header",
+    "zig"           : "zig_header",
+    "verilog-muxes" : "verilog_muxes",
+    "verilog-regs"  : "verilog_regs",
+    "strip-verilog" : "strip_verilog", #Strips prefix of generated packages and modules
+}
+
+def header_options(gen_headers):
+    """Returns {flag: bool} of the header_flags selected by the --gen-headers options in gen_headers. Unknown options are ignored."""
+    options = {flag: False for flag in header_flags.values()}
+    for header in gen_headers or []:
+        if header in header_flags:
+            options[header_flags[header]] = True
+    return options
+
+# One kind of per-CPU output: <cpu_name>/<cpu_name><file_suffix>, written by exporter(register_maps, **options).
+# manifest_options are recorded in the build manifest and extra_inputs are the files it depends on besides the configs.
+# together outputs are rendered for every CPU by one exporter call.
+export_spec = namedtuple("export_spec", ["label", "file_suffix", "exporter", "options", "manifest_options", "extra_inputs", "together"])
+
+def export_specs(gen_headers, directory_path, base_directory, systemverilog=True):
+    """
+    Returns the export_spec of every output selected by the --gen-headers options in gen_headers, followed by the
+    SystemVerilog package and top if systemverilog is set. Header exporters are loaded here, only when selected.
+    """
+    flags = header_options(gen_headers)
+    header_arguments = {"directory_path": directory_path, "reg_width_bytes": 4, "user_modules_only": False}
+    specs = []
+    if gen_headers:
+        specs.append(export_spec("C header", "_registers.h", load_header_exporter("export_c_headers"),
+                                 {**header_arguments, "new_c_header": flags["new_c_header"]}, {"new_c_header": flags["new_c_header"]}, [], False))
+        specs.append(export_spec("Python header", "_registers.py", load_header_exporter("export_python_headers"),
+                                 {**header_arguments, "new_python_header": flags["new_python_header"]}, {"new_python_header": flags["new_python_header"]}, [], False))
+        if flags["zig_header"]:
+            specs.append(export_spec("Zig header", "_registers.zig", load_header_exporter("export_zig_headers"), header_arguments, {}, [], False))
+        if flags["verilog_muxes"] or flags["verilog_regs"]:
+            # Package de-duplication carries over between CPUs, so the mux files are always rebuilt as a set by one call
+            mux_options = {flag: flags[flag] for flag in ["verilog_muxes", "verilog_regs", "strip_verilog"]}
+            specs.append(export_spec("Verilog mux headers", "_muxes.sv", load_header_exporter("export_verilog_headers"),
+                                     {**header_arguments, **mux_options}, mux_options, [], True))
+    if systemverilog:
+        specs.append(export_spec("SystemVerilog package", "_package.sv", save_systemverilog_files, {"base_directory": base_directory}, {}, [], False))
+        specs.append(export_spec("SystemVerilog top", "_fpga_sys_lite.sv", update_cpu_modules_file,
+                                 {"base_directory": base_directory, "reference_file": reference_system_file}, {}, [reference_system_path], False))
+    return specs
+
+def spec_export_tasks(spec, register_maps, output_paths):
+    """Returns the run_export_tasks tasks that write the output_paths ({cpu_name: output_path}) of an export_spec."""
+    if spec.together:
+        if not output_paths:
+            return []
+        return [(spec.label, list(output_paths), spec.exporter, {"register_maps": register_maps, **spec.options}, list(output_paths.values()))]
+    return [(spec.label, [cpu_name], spec.exporter, {"register_maps": {cpu_name: register_maps[cpu_name]}, **spec.options}, [output_path])
+            for cpu_name, output_path in output_paths.items()]
+
+# Exporter tasks of the current run_export_tasks call, inherited by its forked workers
+pending_export_tasks = []
+
+def run_export_task(index):
+    """Runs pending_export_tasks[index] in a worker process and returns (what it printed, its profiled phases)."""
+    label, cpu_names, function, kwargs, output_paths = pending_export_tasks[index]
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        _, worker_phases = profiled_call(f"export/{label}", export_profile_cpu(cpu_names), function, **kwargs)
+    return output.getvalue(), worker_phases
+
+def export_profile_cpu(cpu_names):
+    """Returns the CPU an export task is profiled under: its only CPU, or None for a task rendering several CPUs together."""
+    return cpu_names[0] if len(cpu_names) == 1 else None
+
+def run_export_tasks(tasks, jobs=1):
+    """
+    Runs exporter tasks given as (label, cpu_names, function, kwargs, output_paths). Every task writes its own files.
+    With jobs > 1 the tasks run in forked worker processes and what each printed is shown in task order, as in a serial run.
+    A failing task is reported with its exporter and CPUs. In parallel every task still runs and, if several fail,
+    the first error is raised with the others listed in its notes.
+    """
+    global pending_export_tasks
+
+    def export_context(label, cpu_names):
+        return f"While writing the {label} of CPU {', '.join(repr(cpu_name) for cpu_name in cpu_names)}"
+
+    def add_export_context(error, context):
+        if hasattr(error, "add_note"):
+            error.add_note(context)
+
+    if jobs > 1 and len(tasks) > 1 and "fork" in multiprocessing.get_all_start_methods():
+        pending_export_tasks = tasks
+        errors = []
+        try:
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+                futures = [executor.submit(run_export_task, index) for index in range(len(tasks))]
+                for (label, cpu_names, *_), future in zip(tasks, futures):
+                    try:
+                        printed, worker_phases = future.result()
+                        merge_worker_phases(worker_phases)
+                        print(printed, end="")
+                    except Exception as e:
+                        errors.append((e, export_context(label, cpu_names)))
+        finally:
+            pending_export_tasks = []
+        if errors:
+            error, context = errors[0]
+            add_export_context(error, context)
+            for other_error, other_context in errors[1:]:
+                add_export_context(error, f"{other_context} also failed: {type(other_error).__name__}: {other_error}")
+            raise error
+    else:
+        for label, cpu_names, function, kwargs, output_paths in tasks:
+            try:
+                with profile_phase(f"export/{label}", export_profile_cpu(cpu_names)):
+                    function(**kwargs)
+            except Exception as e:
+                add_export_context(e, export_context(label, cpu_names))
+                raise
+
+def load_configs(directory_path, cache_dir=None, jobs=1, dependencies=None, config_text=None, cpu_name="cpu"):
+    """
+    Parses the config of every CPU folder in directory_path and assigns the AUTO addresses, one CPU at a time.
+    Returns ({cpu_name: CpuConfig}, {cpu_name: submodule map}); dependencies is filled as by process_configs.
+    With config_text only that text is parsed, as the config of CPU folder cpu_name in directory_path.
+    """
+    if dependencies is None:
+        dependencies = {}
+    if config_text is None:
+        if not any(check_config_files(directory_path, config_file_names).values()):
+            raise FileNotFoundError("No Config Files Found")
+        parsed_configs, submodule_reg_map = process_configs(directory_path, config_file_names, cache_dir, jobs, dependencies)
+    else:
+        config_path = os.path.join(directory_path, cpu_name, config_file_names[0])
+        try:
+            cpu_config, submodule_map, dependencies[cpu_name] = load_config(config_path, text=config_text)
+        except Exception as e:
+            if hasattr(e, "add_note"):
+                e.add_note(f"While processing CPU folder '{cpu_name}': {config_path}")
+            raise
+        parsed_configs, submodule_reg_map = {cpu_name: cpu_config}, {cpu_name: submodule_map}
+    for name, cpu_config in parsed_configs.items():
+        with profile_phase("allocate", name):
+            assign_auto_addresses({name: cpu_config}, {name: submodule_reg_map[name]})
+        record_config_counts(name, cpu_config)
+    return parsed_configs, submodule_reg_map
+
+def generate(configs_path=".", headers=None, config_text=None, cpu_name="cpu", registers=None, systemverilog=True, cache_dir=None, jobs=1):
+    """
+    Runs the generator in memory and returns {path: content} of every generated file, with paths relative to configs_path
+    (e.g. "cpu/cpu_registers.h"). Nothing is written to disk.
+
+    configs_path is a folder of CPU folders, as for --configs-path. With config_text that text is used instead, as the config
+    of CPU folder cpu_name in configs_path (Module_Include paths resolve from there). headers takes --gen-headers options,
+    registers "all" or "user" adds cpu_registers.txt as --save-all-registers or --save-user-registers do, and
+    systemverilog=False leaves out the SystemVerilog package and top. jobs > 1 parses the CPU folders in forked processes.
+
+    Every call parses into its own models and captures its files per thread, so calls can run concurrently.
+    """
+    check_output_options(headers, registers)
+    absolute_path = os.path.abspath(configs_path)
+    parsed_configs, submodule_reg_map = load_configs(absolute_path, cache_dir, jobs, config_text=config_text, cpu_name=cpu_name)
+    return render_outputs(parsed_configs, submodule_reg_map, absolute_path, headers, registers, systemverilog)
+
+def check_output_options(headers, registers):
+    """Raises a ValueError for unknown --gen-headers options in headers or a registers value other than None, "all" or "user"."""
+    unknown_headers = [header for header in headers or [] if header not in header_flags]
+    if unknown_headers:
+        raise ValueError(f"Invalid header option '{unknown_headers[0]}'. Options are: {', '.join(header_flags)}")
+    if registers not in [None, "all", "user"]:
+        raise ValueError(f"Invalid registers '{registers}'. Options are: all, user")
+
+def render_outputs(parsed_configs, submodule_reg_map, absolute_path, headers=None, registers=None, systemverilog=True):
+    """Renders the outputs of allocated configs in memory (see generate) and returns {path relative to absolute_path: content}."""
+    register_maps = build_register_maps(parsed_configs, submodule_reg_map)
+
+    export_tasks = []
+    for spec in export_specs(headers, absolute_path, absolute_path, systemverilog):
+        output_paths = {name: os.path.join(absolute_path, name, f"{name}{spec.file_suffix}") for name in register_maps}
+        export_tasks.extend(spec_export_tasks(spec, register_maps, output_paths))
+
+    with capture_outputs() as outputs:
+        if registers:
+            dump_all_registers_from_configs(register_maps, absolute_path, user_modules_only=(registers == "user"), save_to_file=True, print_to_console=False)
+        run_export_tasks(export_tasks)
+    return {os.path.relpath(path, absolute_path): content for path, content in outputs.items()}
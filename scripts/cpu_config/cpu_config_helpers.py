@@ -1,10 +1,15 @@
 from registers import reorder_tree, resolve_expression, build_parameter_table
 from collections import namedtuple
 from math import ceil
+from generator_profile import profile_phase
 import copy
+import io
 import re
 import os
 
+#Entries -> (base_module, section, module_name, module_parent, register_count, id_count(for enforcing order), separator, base_reg_exp)
+submodule_reg_add_map_tuple = namedtuple("submodule_reg_add_map_tuple", ["base_module", "section", "module_name", "module_parent", "register_count", "id_count", "separator", "base_reg_exp"])
+
 def sanitize_identifier(text):
         return re.sub(r'\W+', '_', text.strip()).upper()
 
@@ -13,7 +18,7 @@ def get_code_folders(parsed_configs):
     code_folders = {}
     for cpu_name, config in parsed_configs.items():
         for section in ["CONFIG_PARAMETERS"]:
-            params = config.get(section, {})
+            params = config.sections.get(section, {})
             folder_info = None
             if "C_Code_Folder" in params:
                 print("Warning: C_Code_Folder parameter deprecated! Use Code_Folder instead.")
@@ -21,7 +26,7 @@ def get_code_folders(parsed_configs):
             if "Code_Folder" in params:
                 folder_info = params.get("Code_Folder")
             if folder_info:
-                code_folders[cpu_name] = folder_info["value"]
+                code_folders[cpu_name] = folder_info.value
     return code_folders
 
 def parse_file_path(input_param, config_data):
@@ -86,43 +91,86 @@ def check_config_files(directory, config_file_names):
         for folder in folders
     }
 
-def resolve_mod_include_filepath(base_dir, include_path, include_file_dirs):
+class IncludeFileCache:
+    """
+    Caches Module_Include lookups across every parse_config call of a run.
+    Path probes are cached (including failed ones) and extracted metadata blocks are keyed on path, mtime and size.
+    """
+    def __init__(self):
+        self.probes = {}
+        self.metadata_blocks = {}
+        self.dependencies = None
+
+    def recording(self):
+        """Returns a view sharing this cache that records every probed or read path (path -> exists) in .dependencies."""
+        view = copy.copy(self)
+        view.dependencies = {}
+        return view
+
+    def exists(self, path):
+        if path not in self.probes:
+            self.probes[path] = os.path.exists(path)
+        if self.dependencies is not None:
+            self.dependencies[path] = self.probes[path]
+        return self.probes[path]
+
+    def metadata_block(self, include_path):
+        """Returns the list of (line_number, line) between @ModuleMetadataBegin and @ModuleMetadataEnd."""
+        if self.dependencies is not None:
+            self.dependencies[include_path] = True
+        with profile_phase("includes"):
+            file_stat = os.stat(include_path)
+            key = (include_path, file_stat.st_mtime_ns, file_stat.st_size)
+            if key not in self.metadata_blocks:
+                inside_metadata = False
+                block = []
+                with open(include_path, "r") as file:
+                    for line_number, line in enumerate(file, 1):
+                        if "@ModuleMetadataBegin" in line:
+                            inside_metadata = True
+                            continue
+                        elif "@ModuleMetadataEnd" in line:
+                            break
+                        if inside_metadata:
+                            block.append((line_number, line))
+                self.metadata_blocks[key] = block
+            return self.metadata_blocks[key]
+
+    def forget_probes(self):
+        """Drops cached path probes so newly created or removed files are seen."""
+        self.probes = {}
+
+def resolve_mod_include_filepath(base_dir, include_path, include_file_dirs, include_cache=None):
+    exists = include_cache.exists if include_cache else os.path.exists
     for dir_path in include_file_dirs:
         # Each candidate should be resolved relative to the current file's directory
         candidate = os.path.normpath(os.path.join(base_dir, dir_path, include_path))
-        if os.path.exists(candidate):
+        if exists(candidate):
             return candidate
 
-def scrape_metadata(config_data, file_path, include_file_dirs, include_file, config_file_lines, current_line_index, has_name, has_description, indent_amount=0):
+def scrape_metadata(config_data, file_path, include_file_dirs, include_file, has_name, has_description, indent_amount=0, include_cache=None):
+    """Resolves a Module_Include entry and returns (path, lines) where lines lazily yields the metadata block."""
     include_path = parse_file_path(include_file, config_data)
     current_path = None
     base_dir = os.path.dirname(os.path.abspath(file_path))
 
-    current_path = resolve_mod_include_filepath(base_dir, include_path, include_file_dirs)
+    current_path = resolve_mod_include_filepath(base_dir, include_path, include_file_dirs, include_cache)
 
     # Fallback if nothing matched
     if current_path is None:
         current_path = os.path.normpath(os.path.join(base_dir, include_path))
 
-    inside_metadata = False
-    metadata_block = []
-    inside_register = False
-    filtered_block = []
+    if include_cache is None:
+        include_cache = IncludeFileCache()
+    return current_path, read_metadata_lines(include_cache.metadata_block(current_path), has_name, has_description, indent_amount)
 
+def read_metadata_lines(metadata_block, has_name, has_description, indent_amount=0):
+    """Yields (line_number, line) for a cached metadata block, indented by indent_amount."""
+    inside_register = False
     spaces = " " * indent_amount
 
-    with open(current_path, "r") as file:
-        for line in file:
-            if "@ModuleMetadataBegin" in line:
-                inside_metadata = True
-                continue
-            elif "@ModuleMetadataEnd" in line:
-                inside_metadata = False
-                break
-            if inside_metadata:
-                metadata_block.append(spaces + line)
-
-    for line in metadata_block:
+    for line_number, line in metadata_block:
+        line = spaces + line
         if re.match(r"(Reg\d+)\s*:", line):
             inside_register = True
         if not inside_register:
@@ -130,10 +178,77 @@ def scrape_metadata(config_data, file_path, include_file_dirs, include_file, con
                 continue
             if has_description and re.match(r"Description\s*:\s*(.+)", line):
                 continue
-        filtered_block.append(line)
+        yield line_number, line
+
+def read_config_file_lines(file_path, indent_size=4, text=None):
+    """Yields (line_number, line) for a config file, or for text standing in for it, with normalized indentation."""
+    if text is not None:
+        for line_number, line in enumerate(io.StringIO(text, newline=None), 1):
+            yield line_number, normalize_indent(line, indent_size)
+        return
+    with open(file_path, "r") as file:
+        for line_number, line in enumerate(file, 1):
+            yield line_number, normalize_indent(line, indent_size)
+
+class ConfigLineStream:
+    """
+    Streams config lines from the config file and any nested Module_Include blocks.
+    Included blocks are pushed on a stack and pulled lazily, so the file body is never spliced or copied.
+    Tracks the file and line number of the current line for error messages.
+    If text is given it is read instead of the config file, which then only names the config in errors and locates its includes.
+    """
+    def __init__(self, file_path, indent_size=4, text=None):
+        self.stack = []
+        self.lookahead = []
+        self.location = (file_path, 0, "")
+        self.push(file_path, read_config_file_lines(file_path, indent_size, text))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        entry = self.lookahead.pop() if self.lookahead else self.pull()
+        if entry is None:
+            raise StopIteration
+        self.location = entry
+        return entry[2]
+
+    def push(self, path, lines):
+        """Makes lines (an iterator of (line_number, line)) the next source of lines."""
+        self.stack.append((path, lines))
+
+    def pull(self):
+        while self.stack:
+            path, lines = self.stack[-1]
+            entry = next(lines, None)
+            if entry is not None:
+                return (path, entry[0], entry[1])
+            self.stack.pop()
+        return None
+
+    def peek(self):
+        """Returns the next raw line without consuming it, or None at the end of the config."""
+        if not self.lookahead:
+            self.lookahead.append(self.pull())
+        entry = self.lookahead[-1]
+        return entry[2] if entry is not None else None
 
-    for i in range(len(filtered_block)):
-        config_file_lines.insert(current_line_index+i, filtered_block[i])
+    def located_error(self, error):
+        """Returns a copy of a SyntaxError pointing at the file and line currently being parsed."""
+        path, line_number, line = self.location
+        return SyntaxError(error.msg, (path, line_number, None, line.rstrip("\n")))
+
+    def close(self):
+        for _, lines in self.stack:
+            lines.close()
+        self.stack = []
+        self.lookahead = []
 
 def get_base_module(config_data):
     is_submodule = []
@@ -168,20 +283,20 @@ def normalize_indent(line, indent_size=4):
     return " " * (indent_level * indent_size) + stripped
 
 def resolve_all_expressions(config_data):
+    """
+    Resolves parameter values, module bounds, repeat counts, field bounds and register counts in one pass.
+    config_data is updated in place (nothing else holds on to the freshly read config) and returned.
+    """
     parameters_list = build_parameter_table(config_data)
-    working_config_data = copy.deepcopy(config_data)
 
-    #Resolve parameters first
-    for section, data in working_config_data.items():
+    for section, data in config_data.items():
         if section in ["BUILTIN_PARAMETERS", "USER_PARAMETERS"]:
             for parameter, parameter_data in data.items():
-                current_parameter_data = parameter_data.get("value")
-                working_config_data[section][parameter]["value"] = resolve_expression(current_parameter_data, parameters_list)
+                parameter_data["value"] = resolve_expression(parameter_data.get("value"), parameters_list)
 
-    #Resolve Module Bounds
-    for section, data in working_config_data.items():
-        if section in ["BUILTIN_MODULES", "USER_MODULES"]:
+        elif section in ["BUILTIN_MODULES", "USER_MODULES"]:
             for module, module_data in data.items():
+                #Resolve Module Bounds
                 current_bounds = module_data.get("bounds")
                 if current_bounds:
                     bound_upper = resolve_expression(current_bounds[0], parameters_list)
@@ -191,12 +306,9 @@ def resolve_all_expressions(config_data):
                             raise ValueError(f"Module Bounds for '{module}' don't resolve to an integer")
                     except:
                         raise ValueError(f"Module Bounds for '{module}' don't resolve to an integer")
-                    working_config_data[section][module]["bounds"] = [int(bound_upper), int(bound_lower)]
+                    module_data["bounds"] = [int(bound_upper), int(bound_lower)]
 
-    # Resolve Repeats
-    for section, data in working_config_data.items():
-        if section in ["BUILTIN_MODULES", "USER_MODULES"]:
-            for module, module_data in data.items():
+                # Resolve Repeats
                 current_repeat = module_data.get("repeat", {})
                 if current_repeat:
                     repeat_num = resolve_expression(current_repeat.get("value", 0), parameters_list)
@@ -205,63 +317,95 @@ def resolve_all_expressions(config_data):
                             raise ValueError(f"Repeat Count for '{module}' doesn't resolve to an integer")
                     except:
                         raise ValueError(f"Repeat Count for '{module}' doesn't resolve to an integer")
-                    working_config_data[section][module]["repeat"]["value"] = int(repeat_num)
-
-    #Resolve Field Bounds
-    for section, data in working_config_data.items():
-        if section in ["BUILTIN_MODULES", "USER_MODULES"]:
-            for module, module_data in data.items():
-                current_regs = module_data.get("regs", {})
-                if current_regs:
-                    for reg_name, data in current_regs.items():
-                        field_info = data.get("fields", {})
-                        reg_name_value = data.get("name", "")
-                        if field_info:
-                            for field_name, data in field_info.items():
-                                current_bounds = data.get("bounds", {})
-                                bound_upper = resolve_expression(current_bounds[0], parameters_list)
-                                bound_lower = resolve_expression(current_bounds[1], parameters_list)
-                                try:
-                                    if not bound_upper%1 == 0 or not bound_lower%1 == 0:
-                                        print(f"Warning: Field '{reg_name_value if reg_name_value else reg_name}'->'{field_name}' Bounds in '{module}' don't resolve to an integer")
-                                except:
-                                    print(f"Warning: Field '{reg_name_value if reg_name_value else reg_name}'->'{field_name}' Bounds in '{module}' don't resolve to an integer")
-                                working_config_data[section][module]["regs"][reg_name]["fields"][field_name]["bounds"] = [int(ceil(bound_upper)), int(ceil(bound_lower))]
-
-    #Resolve Register Counts
-    for section, data in working_config_data.items():
-        if section in ["BUILTIN_MODULES", "USER_MODULES"]:
-            for module, module_data in data.items():
+                    current_repeat["value"] = int(repeat_num)
+
+                #Resolve Field Bounds
+                for reg_name, reg_data in module_data.get("regs", {}).items():
+                    reg_name_value = reg_data.get("name", "")
+                    for field_name, field_data in reg_data.get("fields", {}).items():
+                        current_bounds = field_data.get("bounds", {})
+                        bound_upper = resolve_expression(current_bounds[0], parameters_list)
+                        bound_lower = resolve_expression(current_bounds[1], parameters_list)
+                        try:
+                            if not bound_upper%1 == 0 or not bound_lower%1 == 0:
+                                print(f"Warning: Field '{reg_name_value if reg_name_value else reg_name}'->'{field_name}' Bounds in '{module}' don't resolve to an integer")
+                        except:
+                            print(f"Warning: Field '{reg_name_value if reg_name_value else reg_name}'->'{field_name}' Bounds in '{module}' don't resolve to an integer")
+                        field_data["bounds"] = [int(ceil(bound_upper)), int(ceil(bound_lower))]
+
+                #Resolve Register Counts
                 reg_count = module_data.get("registers", {})
                 if reg_count:
                     resolved_register_count = resolve_expression(reg_count, parameters_list)
                     if not resolved_register_count%1 == 0:
                         raise ValueError(f"Register Count for '{module}' doesn't resolve to an integer")
-                    working_config_data[section][module]["registers"] = int(resolved_register_count)
+                    module_data["registers"] = int(resolved_register_count)
 
-    return working_config_data
+    return config_data
+
+def repeat_instance_of(module_data):
+    """
+    Returns a Repeat instance of module_data that shares the template's register and field tree.
+    Only the entries that differ per instance or are updated later (top level, metadata and repeat) are copied.
+    """
+    instance = dict(module_data)
+    instance["metadata"] = dict(module_data["metadata"])
+    instance["repeat"] = dict(module_data.get("repeat", {}))
+    return instance
+
+def parent_module_of(module, submodule_identifier):
+    """Returns the name of the module one level up the '____' hierarchy, or None for a top level module."""
+    if submodule_identifier not in module:
+        return None
+    return module.rsplit(submodule_identifier, 1)[0]
+
+def module_children_index(section_data, submodule_identifier):
+    """
+    Builds {module: [child modules]} for a modules section in a single pass, in section order.
+    Top level modules (and modules whose parent is not in the section) are listed under None.
+    """
+    children = {None: []}
+    for module in section_data:
+        children[module] = []
+    for module in section_data:
+        parent = parent_module_of(module, submodule_identifier)
+        children[parent if parent in section_data else None].append(module)
+    return children
+
+def module_subtree(children, module):
+    """Returns module followed by all of its descendants in section (pre-)order."""
+    subtree = []
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        subtree.append(current)
+        pending.extend(reversed(children[current]))
+    return subtree
 
 def compute_config_submodules(config_data, submodule_identifier):
     #Resolve all expressions
-    config_data = resolve_all_expressions(config_data)
+    with profile_phase("expressions"):
+        config_data = resolve_all_expressions(config_data)
 
     #Build a map of submodules to add to base module recursively
-    parameters_list = build_parameter_table(config_data)
 
     #Account for NOEXPREGS on a tree
+    #Parents come before their submodules, so a module whose parent expands (after propagation) takes the parent's settings
     for section, data in config_data.items():
-            new_section_data = data
             if section in ["BUILTIN_MODULES", "USER_MODULES"]:
                 for module, module_data in data.items():
-                    current_module_level = module
-                    current_module_expand = module_data.get("metadata").get("expand_regs")
-                    current_repeat_expand = module_data.get("repeat", {}).get("expand_regs", {})
-                    for module, module_data in data.items():
-                        if module.startswith(current_module_level) and (current_module_expand == "TRUE" or current_repeat_expand == "TRUE"):
-                            new_section_data[module]["metadata"]["expand_regs"] = current_module_expand
-                            new_section_data[module].setdefault("repeat", {})
-                            new_section_data[module]["repeat"]["expand_regs"] = current_repeat_expand
-            config_data[section] = new_section_data
+                    parent = parent_module_of(module, submodule_identifier)
+                    source_data = module_data
+                    if parent in data:
+                        parent_data = data[parent]
+                        if parent_data.get("metadata").get("expand_regs") == "TRUE" or parent_data.get("repeat", {}).get("expand_regs", {}) == "TRUE":
+                            source_data = parent_data
+                    current_module_expand = source_data.get("metadata").get("expand_regs")
+                    current_repeat_expand = source_data.get("repeat", {}).get("expand_regs", {})
+                    if current_module_expand == "TRUE" or current_repeat_expand == "TRUE":
+                        module_data["metadata"]["expand_regs"] = current_module_expand
+                        module_data.setdefault("repeat", {})
+                        module_data["repeat"]["expand_regs"] = current_repeat_expand
 
     #Build list of Repeat Modules and Sort
     repeat_list_initial = []
@@ -289,49 +433,47 @@ def compute_config_submodules(config_data, submodule_identifier):
             return haystack
         # Rebuild the string using slicing and concatenation
         return haystack[:i + len(needle)] + new_text + haystack[i + len(needle):]
-    
-    def insert_after_last_match(d, repeat_module, new_items): 
-        #Insert new_items after the LAST key in d that starts with repeat_module.
-        out = {}
-        last_match = None
-        # First pass: find the last matching key
-        for k in d.keys():
-            if k.startswith(repeat_module):
-                last_match = k
-        # Second pass: rebuild dict with insertion
-        for k, v in d.items():
-            out[k] = v
-            if k == last_match:
-                for nk, nv in new_items.items():
-                    out[nk] = nv
-        return out
-    
+
     def strip_repeat_suffix(name):
         parts = name.rsplit("_", 1)
         return parts[0] if parts[-1].isdigit() else name
 
     #Account for Repeat entries in modules
+    #Instances are added to the section's parent/child index right after the repeated module; the section is rebuilt from the index once at the end
+    section_children = {}
     for repeat_module, repeat_count in repeat_dict_initial_sorted_filtered.items():
         for section, section_data in config_data.items():
-            if section in ["BUILTIN_MODULES", "USER_MODULES"]:
+            if section in ["BUILTIN_MODULES", "USER_MODULES"] and repeat_module in section_data:
+                if section not in section_children:
+                    section_children[section] = module_children_index(section_data, submodule_identifier)
+                children = section_children[section]
                 # snapshot of the ORIGINAL subtree for this repeat_module
-                orig_modules = [(m, section_data[m]) for m in section_data.keys() if m.startswith(repeat_module)]
+                orig_modules = module_subtree(children, repeat_module)
+                instance_modules = []
                 for i in range(1, repeat_count+1):
-                    new_section_data = {}
                     # only clone from the original snapshot, never from updated config
-                    for module, module_data in orig_modules:
+                    for module in orig_modules:
+                        module_data = section_data[module]
                         new_key = insert_after_match(module, repeat_module, f"_{i}")
-                        new_section_data[new_key] = copy.deepcopy(module_data)
-                        new_section_data[new_key]["metadata"]["repeat_instance"] = 'TRUE'
-                        new_section_data[new_key].setdefault("repeat", {})
-                        new_section_data[new_key]["repeat"]["repeat_of"] = strip_repeat_suffix(module.split(submodule_identifier)[-1])
-                        new_section_data[new_key]["repeat"]["expand_regs"] = module_data.get("repeat", {}).get("expand_regs", "FALSE")
-                        if new_section_data[new_key].get("submodule_of"):
-                            new_section_data[new_key]["submodule_of"] = insert_after_match(new_section_data[new_key]["submodule_of"], repeat_module, f"_{i}")
-                    config_data[section] = insert_after_last_match(config_data[section], repeat_module, new_section_data)
-
-    #Entries -> (base_module, section, module_name, module_parent, register_count, id_count(for enforcing order), separator, base_reg_exp)
-    submodule_reg_add_map_tuple = namedtuple("submodule_reg_add_map_tuple", ["base_module", "section", "module_name", "module_parent", "register_count", "id_count", "separator", "base_reg_exp"])
+                        section_data[new_key] = repeat_instance_of(module_data)
+                        section_data[new_key]["metadata"]["repeat_instance"] = 'TRUE'
+                        section_data[new_key]["repeat"]["repeat_of"] = strip_repeat_suffix(module.split(submodule_identifier)[-1])
+                        section_data[new_key]["repeat"]["expand_regs"] = module_data.get("repeat", {}).get("expand_regs", "FALSE")
+                        if section_data[new_key].get("submodule_of"):
+                            section_data[new_key]["submodule_of"] = insert_after_match(section_data[new_key]["submodule_of"], repeat_module, f"_{i}")
+                        children[new_key] = []
+                        if module == repeat_module:
+                            instance_modules.append(new_key)
+                        else:
+                            children[insert_after_match(parent_module_of(module, submodule_identifier), repeat_module, f"_{i}")].append(new_key)
+                parent = parent_module_of(repeat_module, submodule_identifier)
+                siblings = children[parent if parent in section_data else None]
+                position = siblings.index(repeat_module) + 1
+                siblings[position:position] = instance_modules
+
+    for section, children in section_children.items():
+        config_data[section] = {module: config_data[section][module] for module in module_subtree(children, None)[1:]}
+
     submodule_reg_add_map = []
     id_count = 0
     for section, data in config_data.items():
@@ -353,17 +495,13 @@ def compute_config_submodules(config_data, submodule_identifier):
     submodule_reg_add_map_sorted_key["key"] = submodule_reg_add_map
     submodule_reg_add_map_sorted = reorder_tree(submodule_reg_add_map_sorted_key)["key"]
    
-    # Build parent -> children map and native counts
+    # Record native counts
     native_counts = {}
-    children_map = {}
 
     for _, section, full, parent, count, _, _, _ in submodule_reg_add_map_sorted:
         # record native count for this module (from tuples)
         native_counts[full] = count
 
-        # build children map
-        children_map.setdefault(parent, []).append(full)
-
         # ensure dict entries exist
         config_data.setdefault(section, {}).setdefault(full, {"registers": 0, "subregisters": 0})
         config_data.setdefault(section, {}).setdefault(parent, {"registers": 0, "subregisters": 0})
@@ -376,25 +514,16 @@ def compute_config_submodules(config_data, submodule_identifier):
             base_initial = config_data[section].get(base, {}).get("registers", 0)
             native_counts[base] = base_initial
 
-    # Recursive total calculator (native + descendants)
-    def compute_total(module):
-        total = native_counts.get(module, 0)
-        for child in children_map.get(module, []):
-            total += compute_total(child)
-        return total
+    # Totals (native + descendants) in a single post-order pass: the tuples are in depth-first order,
+    # so walking them backwards completes every module's subtree before its parent is reached
+    totals = dict(native_counts)
+    for _, _, full, parent, _, _, _, _ in reversed(submodule_reg_add_map_sorted):
+        totals[parent] = totals.get(parent, 0) + totals[full]
 
-    # Fill registers and subregisters for all modules in the tree
+    # Fill registers and subregisters for all modules in the tree, base (level 0) modules included
     for base, section, full, _, _, _, _, _ in submodule_reg_add_map_sorted:
-        total = compute_total(full)
-        native = native_counts.get(full, 0)
-        config_data[section][full]["registers"] = total # native + children
-        config_data[section][full]["subregisters"] = total - native # children only
-
-    # Ensure base (level 0) modules also get updated correctly
-    for base, section, _, _, _, _, _, _ in submodule_reg_add_map_sorted:
-        total = compute_total(base)
-        native = native_counts.get(base, 0)
-        config_data[section][base]["registers"] = total
-        config_data[section][base]["subregisters"] = total - native
+        for module in (full, base):
+            config_data[section][module]["registers"] = totals[module] # native + children
+            config_data[section][module]["subregisters"] = totals[module] - native_counts[module] # children only
 
     return config_data, submodule_reg_add_map_sorted
\ No newline at end of file
@@ -1,9 +1,112 @@
 import os
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from cpu_config_helpers import *
-
-def parse_config(file_path):
-    """Parses the cpu_config.txt file and returns a structured dictionary, including metadata and multiline support."""
+from config_cache import load_cached_config, store_cached_config, generator_sources_fingerprint
+from register_model import cpu_config_from_dict
+from generator_profile import profile_phase, profiled_call, merge_worker_phases
+
+# Pattern matching compile
+config_keyword_re = re.compile(r"\w+")
+section_re = re.compile(r"^(\w+):\s*(.*)?$")
+param_re = re.compile(r"^\s*(\w+)\s*:\s*(\"[^\"]*\"|\{[^}]*\}|[^:#]+?)(?:\s*:\s*\{(\d+:\d+)\})?\s*,?\s*(?:#.*)?\s*$")
+module_head_re = re.compile(r"\w+\s*:\s*(?:TRUE|FALSE)\s*:\s*")
+module_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*\{([^}]+)\}(?:\s*:\s*(\w+))?")
+auto_expr_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*AUTO\s*:\s*\{(.+?)\}(?:\s*:\s*(\w+))?")
+auto_literal_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*AUTO\s*:\s*(\d+)(?:\s*:\s*(\w+))?")
+auto_simple_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*AUTO(?:\s*:\s*(\w+))?")
+reg_re = re.compile(r"(Reg\d+)\s*:")
+field_re = re.compile(r"(Field\d+)\s*:")
+name_re = re.compile(r"Name\s*:\s*(.+)")
+repeat_re = re.compile(r"Repeat\s*:\s*(\d+|\{[^}]+\})(?:\s*:\s*(\w+))?")
+desc_re = re.compile(r"Description\s*:\s*(.+)")
+bounds_re =  re.compile(r"Bounds\s*:\s*\[\s*([^\]:]+)\s*:\s*([^\]]+)\s*\]")
+permissions_re = re.compile(r"Permissions\s*:\s*(.+)")
+module_include_re = re.compile(r"Module_Include\s*:\s*(.+)")
+
+submodule_identifier = "____"
+config_indent_size = 4
+
+# Leading keyword -> (token, pattern) for entries that can only start with a fixed keyword
+keyword_tokens = {
+    "Name"           : ("name", name_re),
+    "Repeat"         : ("repeat", repeat_re),
+    "Description"    : ("description", desc_re),
+    "Bounds"         : ("bounds", bounds_re),
+    "Permissions"    : ("permissions", permissions_re),
+    "Module_Include" : ("module_include", module_include_re)
+}
+
+def match_module_line(line):
+    """Matches a module instantiation line and returns (token, match) or (None, None)."""
+    head_match = module_head_re.match(line)
+    if not head_match:
+        return None, None
+    if line.startswith("AUTO", head_match.end()):
+        for token, pattern in [("auto_expr", auto_expr_re), ("auto_literal", auto_literal_re), ("auto_simple", auto_simple_re)]:
+            match = pattern.match(line)
+            if match:
+                return token, match
+    elif line.startswith("{", head_match.end()):
+        match = module_re.match(line)
+        if match:
+            return "module", match
+    return None, None
+
+def classify_config_line(line, current_section):
+    """
+    Classifies a stripped config line by its leading keyword and returns (token, match).
+    Only the pattern that applies to the keyword is run. Returns (None, None) for invalid lines.
+    """
+    keyword_match = config_keyword_re.match(line)
+    if not keyword_match:
+        return None, None
+    keyword = keyword_match.group(0)
+
+    # "NAME:" with no space before the colon always starts a section
+    if line.startswith(":", keyword_match.end()):
+        return "section", section_re.match(line)
+
+    # Parameters and modules can be named anything, so they are checked before keywords
+    if current_section in ["BUILTIN_PARAMETERS", "USER_PARAMETERS", "CONFIG_PARAMETERS"]:
+        param_match = param_re.match(line)
+        if param_match:
+            return "parameter", param_match
+    elif current_section in ["BUILTIN_MODULES", "USER_MODULES"]:
+        token, module_match = match_module_line(line)
+        if module_match:
+            return token, module_match
+
+    if keyword in keyword_tokens:
+        token, pattern = keyword_tokens[keyword]
+    elif keyword.startswith("Reg") and keyword[3:].isdigit():
+        token, pattern = "reg", reg_re
+    elif keyword.startswith("Field") and keyword[5:].isdigit():
+        token, pattern = "field", field_re
+    else:
+        return None, None
+
+    match = pattern.match(line)
+    if not match:
+        return None, None
+    return token, match
+
+def read_config(file_path, include_cache=None, text=None):
+    """
+    Reads the cpu_config.txt file into an unresolved dictionary, including metadata and multiline support.
+    With text the config is read from the string instead, as if it were the content of file_path.
+    """
+    if include_cache is None:
+        include_cache = IncludeFileCache()
+    with ConfigLineStream(file_path, config_indent_size, text) as config_lines:
+        try:
+            return read_config_lines(config_lines, file_path, include_cache)
+        except SyntaxError as e:
+            raise config_lines.located_error(e) from None
+
+def read_config_lines(config_lines, file_path, include_cache):
+    """Parses lines pulled from a ConfigLineStream. Module_Include blocks are pushed back onto the stream."""
     config_data = {}
     current_section = None
     current_base_section = None
@@ -12,7 +115,6 @@ def parse_config(file_path):
     current_field = None
     pending_key = None
     pending_value = ""
-    current_line_index = 0
     got_register_name = False
     got_register_description = False
     infer_module_registers = {}
@@ -25,31 +127,9 @@ def parse_config(file_path):
     got_module_name = False
     got_module_description = False
 
-    indent_size = 4
-    submodule_indent_size = indent_size * 2
-    submodule_identifier = "____"
-
-    # Pattern matching compile
-    section_re = re.compile(r"^(\w+):\s*(.*)?$")
-    param_re = re.compile(r"^\s*(\w+)\s*:\s*(\"[^\"]*\"|\{[^}]*\}|[^:#]+?)(?:\s*:\s*\{(\d+:\d+)\})?\s*,?\s*(?:#.*)?\s*$")
-    module_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*\{([^}]+)\}(?:\s*:\s*(\w+))?")
-    auto_expr_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*AUTO\s*:\s*\{(.+?)\}(?:\s*:\s*(\w+))?")
-    auto_literal_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*AUTO\s*:\s*(\d+)(?:\s*:\s*(\w+))?")
-    auto_simple_re = re.compile(r"(\w+)\s*:\s*(TRUE|FALSE)\s*:\s*AUTO(?:\s*:\s*(\w+))?")
-    reg_re = re.compile(r"(Reg\d+)\s*:")
-    field_re = re.compile(r"(Field\d+)\s*:")
-    name_re = re.compile(r"Name\s*:\s*(.+)")
-    repeat_re = re.compile(r"Repeat\s*:\s*(\d+|\{[^}]+\})(?:\s*:\s*(\w+))?")
-    desc_re = re.compile(r"Description\s*:\s*(.+)")
-    bounds_re =  re.compile(r"Bounds\s*:\s*\[\s*([^\]:]+)\s*:\s*([^\]]+)\s*\]")
-    permissions_re = re.compile(r"Permissions\s*:\s*(.+)")
-    module_include_re = re.compile(r"Module_Include\s*:\s*(.+)")
-
-    with open(file_path, "r") as file:
-        config_file_lines = [normalize_indent(line, indent_size) for line in file]
-
-    for raw_line in config_file_lines:
-        current_line_index = current_line_index + 1
+    submodule_indent_size = config_indent_size * 2
+
+    for raw_line in config_lines:
         line = raw_line.strip()
         if not line or line.startswith("#"):
             continue
@@ -77,32 +157,19 @@ def parse_config(file_path):
                 pending_value = ""
                 continue
 
-        # Pattern matching
-        section_match = section_re.match(line)
-        param_match = param_re.match(line)
-        module_match = module_re.match(line)
-        auto_expr_match = auto_expr_re.match(line)
-        auto_literal_match = auto_literal_re.match(line)
-        auto_simple_match = auto_simple_re.match(line)
-        reg_match = reg_re.match(line)
-        field_match = field_re.match(line)
-        bounds_match = bounds_re.match(line)
-        name_match = name_re.match(line)
-        repeat_match = repeat_re.match(line)
-        desc_match = desc_re.match(line)
-        permissions_match = permissions_re.match(line)
-        module_include_match = module_include_re.match(line)
-
-        if section_match:
-            if (section_match.group(1) == "SUBMODULE"):
+        # Classify the line once and only keep the match that applies
+        token, token_match = classify_config_line(line, current_section)
+
+        if token == "section":
+            if (token_match.group(1) == "SUBMODULE"):
                 current_base_section = current_section
                 if current_module:
                     if not submodule_indexes:
                         submodule_indexes.append((current_module, get_indent_level(raw_line)-submodule_indent_size))
-                    next_line = config_file_lines[current_line_index]
+                    next_line = config_lines.peek() or ""
                     next_line = next_line.strip()
-                    sub_module_match = module_re.match(next_line) or auto_expr_re.match(next_line) or auto_literal_re.match(next_line) or auto_simple_re.match(next_line)
-                    if not sub_module_match.group(1):
+                    _, sub_module_match = match_module_line(next_line)
+                    if not sub_module_match or not sub_module_match.group(1):
                         raise SyntaxError(f"'{next_line}' is not valid")
                     submodule_indexes.append((sub_module_match.group(1), get_indent_level(raw_line)))
                     if submodule_indexes[-1][1] - submodule_indexes[-2][1] > submodule_indent_size:
@@ -130,19 +197,19 @@ def parse_config(file_path):
                 else:
                     raise SyntaxError(f"'{line}' is not valid")
             else:
-                current_section = section_match.group(1)
+                current_section = token_match.group(1)
             config_data.setdefault(current_section, {})
             infer_module_registers.setdefault(current_section, {})
             current_module = None
             current_register = None
-            remainder = section_match.group(2).strip() if section_match.group(2) else ""
+            remainder = token_match.group(2).strip() if token_match.group(2) else ""
             if remainder:
                 config_data[current_section]["BaseAddress"] = remainder
 
-        elif param_match and current_section in ["BUILTIN_PARAMETERS", "USER_PARAMETERS", "CONFIG_PARAMETERS"]:
-            key = param_match.group(1)
-            value = param_match.group(2).rstrip(",")
-            bit_width = param_match.group(3)
+        elif token == "parameter":
+            key = token_match.group(1)
+            value = token_match.group(2).rstrip(",")
+            bit_width = token_match.group(3)
             if value.startswith("{") and value.endswith("}"):
                 config_data[current_section][key] = {"value": value[1:-1].strip()}
             else:
@@ -151,173 +218,42 @@ def parse_config(file_path):
             if bit_width:
                 config_data[current_section][key]["bit_width"] = bit_width
 
-        elif auto_expr_match and current_section in ["BUILTIN_MODULES", "USER_MODULES"]:
+        elif token in ["auto_expr", "auto_literal", "auto_simple", "module"]:
             if submodule_name_append:
                 key = submodule_name_append
                 submodule_name_append = None
             else:
-                key = auto_expr_match.group(1)
-            flag = auto_expr_match.group(2)
-            reg_count = auto_expr_match.group(3)
-            expand_regs = auto_expr_match.group(4)
+                key = token_match.group(1)
             got_register_name = False
             got_register_description = False
             got_module_name = False
             got_module_description = False
-            
-            if got_submodule:
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "auto": True,
-                    "registers": reg_count,
-                    "metadata": {},
-                    "regs": {},
-                    "include_file" : {},
-                    "submodule_of" : current_base_module
-                }
-            else:
-                submodule_indexes = []
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "auto": True,
-                    "registers": reg_count,
-                    "metadata": {},
-                    "regs": {},
-                    "include_file" : {}
-                }
-
-            if (expand_regs == "NOEXPREGS"):
-                config_data[current_section][key]["metadata"]["expand_regs"] = 'TRUE'
-            else:
-                config_data[current_section][key]["metadata"]["expand_regs"] = 'FALSE'
-            current_module = key
-            current_register = None
-            current_field = None
-            got_submodule = False
-            current_base_module = None
 
-        elif auto_literal_match and current_section in ["BUILTIN_MODULES", "USER_MODULES"]:
-            if submodule_name_append:
-                key = submodule_name_append
-                submodule_name_append = None
+            module_entry = {"flag": token_match.group(2)}
+            if token == "module":
+                module_entry["bounds"] = [b.strip().rstrip(",") for b in token_match.group(3).split(",")]
+                expand_regs = token_match.group(4)
+            elif token == "auto_expr":
+                module_entry["auto"] = True
+                module_entry["registers"] = token_match.group(3)
+                expand_regs = token_match.group(4)
+            elif token == "auto_literal":
+                module_entry["auto"] = True
+                module_entry["registers"] = int(token_match.group(3))
+                expand_regs = token_match.group(4)
             else:
-                key = auto_literal_match.group(1)
-            flag = auto_literal_match.group(2)
-            reg_count = int(auto_literal_match.group(3))
-            expand_regs = auto_literal_match.group(4)
-            got_register_name = False
-            got_register_description = False
-            got_module_name = False
-            got_module_description = False
+                module_entry["auto"] = True
+                module_entry["registers"] = None  #Will be inferred later
+                expand_regs = token_match.group(3)
+            module_entry["metadata"] = {}
+            module_entry["regs"] = {}
+            module_entry["include_file"] = {}
 
             if got_submodule:
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "auto": True,
-                    "registers": reg_count,
-                    "metadata": {},
-                    "regs": {},
-                    "include_file" : {},
-                    "submodule_of" : current_base_module
-                }
+                module_entry["submodule_of"] = current_base_module
             else:
                 submodule_indexes = []
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "auto": True,
-                    "registers": reg_count,
-                    "metadata": {},
-                    "regs": {},
-                    "include_file" : {}
-                } 
-            
-            if (expand_regs == "NOEXPREGS"):
-                config_data[current_section][key]["metadata"]["expand_regs"] = 'TRUE'
-            else:
-                config_data[current_section][key]["metadata"]["expand_regs"] = 'FALSE'
-            current_module = key
-            current_register = None
-            current_field = None
-            got_submodule = False
-            current_base_module = None
-
-        elif auto_simple_match and current_section in ["BUILTIN_MODULES", "USER_MODULES"]:
-            if submodule_name_append:
-                key = submodule_name_append
-                submodule_name_append = None
-            else:
-                key = auto_simple_match.group(1)
-            flag = auto_simple_match.group(2)
-            expand_regs = auto_simple_match.group(3)
-            got_register_name = False
-            got_register_description = False
-            got_module_name = False
-            got_module_description = False
-
-            if got_submodule:
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "auto": True,
-                    "registers": None,  #Will be inferred later
-                    "metadata": {},
-                    "regs": {},
-                    "include_file": {},
-                    "submodule_of" : current_base_module
-                }
-            else:
-                submodule_indexes = []
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "auto": True,
-                    "registers": None,  #Will be inferred later
-                    "metadata": {},
-                    "regs": {},
-                    "include_file": {}
-                }
-
-            if expand_regs == "NOEXPREGS":
-                config_data[current_section][key]["metadata"]["expand_regs"] = 'TRUE'
-            else:
-                config_data[current_section][key]["metadata"]["expand_regs"] = 'FALSE'
-            current_module = key
-            current_register = None
-            current_field = None
-            infer_module_registers[current_section][current_module] = 0
-            got_submodule = False
-            current_base_module = None
-
-        elif module_match and current_section in ["BUILTIN_MODULES", "USER_MODULES"]:
-            if submodule_name_append:
-                key = submodule_name_append
-                submodule_name_append = None
-            else:
-                key = module_match.group(1)
-            flag = module_match.group(2)
-            bounds = [b.strip().rstrip(",") for b in module_match.group(3).split(",")]
-            expand_regs = module_match.group(4)
-            got_register_name = False
-            got_register_description = False
-            got_module_name = False
-            got_module_description = False
-
-            if got_submodule:
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "bounds": bounds,
-                    "metadata": {},
-                    "regs": {},
-                    "include_file" : {},
-                    "submodule_of" : current_base_module
-                }
-            else:
-                submodule_indexes = []
-                config_data[current_section][key] = {
-                    "flag": flag,
-                    "bounds": bounds,
-                    "metadata": {},
-                    "regs": {},
-                    "include_file" : {}
-                }
+            config_data[current_section][key] = module_entry
 
             if (expand_regs == "NOEXPREGS"):
                 config_data[current_section][key]["metadata"]["expand_regs"] = 'TRUE'
@@ -326,26 +262,30 @@ def parse_config(file_path):
             current_module = key
             current_register = None
             current_field = None
+            if token == "auto_simple":
+                infer_module_registers[current_section][current_module] = 0
             got_submodule = False
             current_base_module = None
 
-        elif current_module and module_include_match:
+        elif token == "module_include" and current_module:
             if (current_register == None):
-                include_file = module_include_match.group(1)
+                include_file = token_match.group(1)
                 absolute_path = os.path.normpath(os.path.dirname(parse_file_path(include_file, config_data)))
-                resolved_mod_filepath = resolve_mod_include_filepath(os.path.dirname(os.path.abspath(file_path)), parse_file_path(include_file, config_data), include_file_dirs)
-                config_data[current_section][key]["metadata"]["module_filepath"] = resolved_mod_filepath
+                resolved_mod_filepath = resolve_mod_include_filepath(os.path.dirname(os.path.abspath(file_path)), parse_file_path(include_file, config_data), include_file_dirs, include_cache)
+                config_data[current_section][current_module]["metadata"]["module_filepath"] = resolved_mod_filepath
                 if absolute_path not in include_file_dirs:
                     include_file_dirs.append(absolute_path)
                 existing_metadata = config_data[current_section][current_module]["metadata"]
                 has_name = "name" in existing_metadata
                 has_description = "description" in existing_metadata
-                scrape_metadata(config_data, file_path, include_file_dirs, include_file, config_file_lines, current_line_index, has_name, has_description, get_indent_level(raw_line))
+                include_path, metadata_lines = scrape_metadata(config_data, file_path, include_file_dirs, include_file, has_name, has_description, get_indent_level(raw_line), include_cache)
+                config_data[current_section][current_module]["include_file"] = include_path
+                config_lines.push(include_path, metadata_lines)
             else:
                 raise SyntaxError(f"Registers Defined and Module Include Specified in Entry: '{current_module}'")
             
-        elif current_register and field_match:
-            current_field = field_match.group(1)
+        elif token == "field" and current_register:
+            current_field = token_match.group(1)
             config_data[current_section][current_module]["regs"][current_register].setdefault("fields", {})
             config_data[current_section][current_module]["regs"][current_register]["fields"].setdefault(current_field, {})
             config_data[current_section][current_module]["regs"][current_register]["fields"][current_field] = {
@@ -354,23 +294,23 @@ def parse_config(file_path):
                 "description" : {}
             }
         
-        elif current_field and bounds_match:
+        elif token == "bounds" and current_field:
             #Make sure to strip off {} for consistency with expressions if used
-            bounds = [bounds_match.group(1).strip("{}"), bounds_match.group(2).strip("{}")]
+            bounds = [token_match.group(1).strip("{}"), token_match.group(2).strip("{}")]
             config_data[current_section][current_module]["regs"][current_register]["fields"][current_field]["bounds"] = bounds
 
-        elif current_module and reg_match:
+        elif token == "reg" and current_module:
             got_register_name = False
             got_register_description = False
-            current_register = reg_match.group(1)
+            current_register = token_match.group(1)
             if current_register in config_data[current_section][current_module]["regs"]:
                 raise SyntaxError(f"Register '{current_register}' Redefinition in Entry: '{current_module}'")
             config_data[current_section][current_module]["regs"].setdefault(current_register, {})
             if current_module in infer_module_registers[current_section]:
                 infer_module_registers[current_section][current_module] += 1
 
-        elif current_module and name_match:
-            name_val = name_match.group(1)
+        elif token == "name" and current_module:
+            name_val = token_match.group(1)
             if current_register and not got_register_name:
                 config_data[current_section][current_module]["regs"][current_register]["name"] = name_val
                 got_register_name = True
@@ -381,9 +321,9 @@ def parse_config(file_path):
                     got_module_name = True
                     config_data[current_section][current_module]["metadata"]["name"] = name_val
 
-        elif current_module and repeat_match:
-            repeat_val = repeat_match.group(1)
-            expand_regs = repeat_match.group(2)
+        elif token == "repeat" and current_module:
+            repeat_val = token_match.group(1)
+            expand_regs = token_match.group(2)
 
             #remove braces if present
             if repeat_val.startswith("{") and repeat_val.endswith("}"):
@@ -402,8 +342,8 @@ def parse_config(file_path):
             else:
                 raise SyntaxError(f"Repeat value not correct in Entry: '{current_module}'")
 
-        elif current_module and desc_match:
-            desc_val = desc_match.group(1)
+        elif token == "description" and current_module:
+            desc_val = token_match.group(1)
             if desc_val.endswith("\\"):
                 pending_key = "description"
                 pending_value = desc_val.rstrip("\\").strip()
@@ -418,8 +358,8 @@ def parse_config(file_path):
                         got_module_description = True
                         config_data[current_section][current_module]["metadata"]["description"] = desc_val.strip()
 
-        elif current_module and permissions_match:
-            perm_val = permissions_match.group(1).strip().lower()
+        elif token == "permissions" and current_module:
+            perm_val = token_match.group(1).strip().lower()
             if perm_val in ["r", "read"]:
                 new_perm_val = "R"
             elif perm_val in ["w", "write"]:
@@ -445,24 +385,98 @@ def parse_config(file_path):
                 #Should error in the auto allocator if there aren't
                 config_data[section][mod]["registers"] = 0
 
-    return compute_config_submodules(config_data, submodule_identifier)
-
-def process_configs(directory_path, config_file_names):
-    """Processes config files in multiple folders and returns parsed data."""
-    parsed_configs = {}
-    submodule_reg_map = {}
-
+    return config_data
+
+def parse_config(file_path, include_cache=None, text=None):
+    """Parses the cpu_config.txt file (or text standing in for it) and returns the resolved dictionary and its submodule map."""
+    with profile_phase("read"):
+        config_data = read_config(file_path, include_cache, text)
+    with profile_phase("expand"):
+        return compute_config_submodules(config_data, submodule_identifier)
+
+def find_config_file(folder_path, config_file_names):
+    """Returns the first config file found in folder_path, or None."""
+    for name in config_file_names:
+        potential_path = os.path.join(folder_path, name)
+        if os.path.exists(potential_path):
+            return potential_path  # Found a valid config file; no need to keep checking
+    return None
+
+def find_config_paths(directory_path, config_file_names):
+    """Returns {folder: config_path} for every folder in directory_path that has a config file, in directory listing order."""
+    config_paths = {}
     for folder in os.listdir(directory_path):
         folder_path = os.path.join(directory_path, folder)
-        config_path = None
         if not os.path.isdir(folder_path):
             continue  # Skip files; only process directories
-        for name in config_file_names:
-            potential_path = os.path.join(folder_path, name)
-            if os.path.exists(potential_path):
-                config_path = potential_path
-                break  # Found a valid config file; no need to keep checking
+        config_path = find_config_file(folder_path, config_file_names)
         if config_path:
-            parsed_configs[folder], submodule_reg_map[folder] = parse_config(config_path)
-
-    return parsed_configs, submodule_reg_map
\ No newline at end of file
+            config_paths[folder] = config_path
+    return config_paths
+
+def load_config(config_path, include_cache=None, cache_dir=None, fingerprint=None, text=None):
+    """
+    Parses one config file, loading it from and storing it to the config cache when cache_dir is given.
+    Returns (cpu_config, submodule_map, dependencies) where cpu_config is the typed CpuConfig model and dependencies maps every file the parse read or probed to whether it existed.
+    With text the config is parsed from the string, as if it were the content of config_path, and the cache is not used.
+    """
+    if include_cache is None:
+        include_cache = IncludeFileCache()
+    if text is not None:
+        cache_dir = None
+    if cache_dir:
+        if fingerprint is None:
+            fingerprint = generator_sources_fingerprint()
+        cached_config = load_cached_config(cache_dir, config_path, fingerprint)
+        if cached_config:
+            parsed_config, submodule_map, dependencies = cached_config
+            return cpu_config_from_dict(parsed_config), submodule_map, dependencies
+
+    recording_cache = include_cache.recording()
+    parsed_config, submodule_map = parse_config(config_path, recording_cache, text)
+    if cache_dir:
+        store_cached_config(cache_dir, config_path, fingerprint, recording_cache.dependencies, parsed_config, submodule_map)
+    dependencies = {os.path.abspath(config_path): True, **recording_cache.dependencies}
+    return cpu_config_from_dict(parsed_config), submodule_map, dependencies
+
+def process_configs(directory_path, config_file_names, cache_dir=None, jobs=1, dependencies=None):
+    """
+    Processes config files in multiple folders and returns ({folder: CpuConfig}, {folder: submodule map}).
+    If cache_dir is given, folders whose config and included files are unchanged are loaded from the cache instead of parsed.
+    With jobs > 1 each folder is parsed in its own worker process and the results are merged in folder order.
+    If a dependencies dict is given it is filled with folder -> {path: existed} for every file each folder's parse depended on.
+    """
+    if dependencies is None:
+        dependencies = {}
+    parsed_configs = {}
+    submodule_reg_map = {}
+    fingerprint = generator_sources_fingerprint() if cache_dir else None
+    config_paths = find_config_paths(directory_path, config_file_names)
+
+    def add_folder_context(error, folder):
+        if hasattr(error, "add_note"):
+            error.add_note(f"While processing CPU folder '{folder}': {config_paths[folder]}")
+
+    # Worker processes are forked so they share the generator code that is already loaded
+    if jobs > 1 and len(config_paths) > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+            futures = {folder: executor.submit(profiled_call, "parse", folder, load_config, config_path, None, cache_dir, fingerprint)
+                       for folder, config_path in config_paths.items()}
+            for folder, future in futures.items():
+                try:
+                    (parsed_configs[folder], submodule_reg_map[folder], dependencies[folder]), worker_phases = future.result()
+                    merge_worker_phases(worker_phases)
+                except Exception as e:
+                    add_folder_context(e, folder)
+                    raise
+    else:
+        include_cache = IncludeFileCache() # Shared by every CPU folder in this run
+        for folder, config_path in config_paths.items():
+            try:
+                with profile_phase("parse", folder):
+                    parsed_configs[folder], submodule_reg_map[folder], dependencies[folder] = load_config(config_path, include_cache, cache_dir, fingerprint)
+            except Exception as e:
+                add_folder_context(e, folder)
+                raise
+
+    return parsed_configs, submodule_reg_map
@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+import contextlib
+from output_files import write_output_file
+
+profile_report_file_name = "generator_profile.json"
+profile_report_version = 1
+profile_modes = ["time", "cprofile"]
+
+class GeneratorProfile:
+    """
+    Wall time and peak traced memory of every phase of one generator run, per CPU, and in cprofile mode a call
+    profile per phase. Phases nest: a phase opened inside another is named <outer>/<inner> and belongs to the
+    CPU of the outer phase unless it names its own.
+    """
+    def __init__(self, mode="time"):
+        self.mode = mode
+        self.start = time.perf_counter()
+        self.phases = {}   # (phase, cpu_name) -> {"seconds", "calls", "peak_memory_bytes"}
+        self.profiles = {} # phase -> pstats.Stats, without the phases nested in it
+        self.counts = {}   # cpu_name -> counts of the allocated config (see config_counts)
+        self.stack = []    # open phases, innermost last
+        self.peak_memory = 0
+
+    def record(self, phase, cpu_name, seconds, calls, peak_memory):
+        entry = self.phases.setdefault((phase, cpu_name), {"seconds": 0.0, "calls": 0, "peak_memory_bytes": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += calls
+        entry["peak_memory_bytes"] = max(entry["peak_memory_bytes"], peak_memory)
+
+    def add_profile(self, phase, stats):
+        if phase in self.profiles:
+            self.profiles[phase].add(stats)
+        else:
+            self.profiles[phase] = stats
+
+# The profile of the running generator, or None when not profiling. A global, so forked workers inherit it.
+active_profile = None
+
+def start_profile(mode="time"):
+    """Starts profiling the phases of this run (see profile_phase). Memory is traced with tracemalloc from here on."""
+    global active_profile
+    if mode not in profile_modes:
+        raise ValueError(f"Invalid profile mode '{mode}'. Options are: {', '.join(profile_modes)}")
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    active_profile = GeneratorProfile(mode)
+    return active_profile
+
+def profile_phase(name, cpu_name=None):
+    """Returns a context manager that records its block as phase name (of CPU cpu_name) while profiling, and does nothing otherwise."""
+    if active_profile is None:
+        return contextlib.nullcontext()
+    return recorded_phase(active_profile, name, cpu_name)
+
+@contextlib.contextmanager
+def recorded_phase(profile, name, cpu_name):
+    parent = profile.stack[-1] if profile.stack else None
+    if parent is not None:
+        name = f"{parent['name']}/{name}"
+        if cpu_name is None:
+            cpu_name = parent["cpu_name"]
+        # The peak is reset for the nested phase, so the outer phase keeps what it reached so far
+        parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+        if parent["profiler"] is not None:
+            parent["profiler"].disable()
+    tracemalloc.reset_peak()
+    phase = {"name": name, "cpu_name": cpu_name, "traced": tracemalloc.get_traced_memory()[0], "peak": 0, "profiler": None}
+    if profile.mode == "cprofile":
+        phase["profiler"] = cProfile.Profile()
+    profile.stack.append(phase)
+    profile.record(name, cpu_name, 0.0, 0, 0) # Phases are listed in the order they first start
+    start = time.perf_counter()
+    if phase["profiler"] is not None:
+        phase["profiler"].enable()
+    try:
+        yield
+    finally:
+        if phase["profiler"] is not None:
+            phase["profiler"].disable()
+        seconds = time.perf_counter() - start
+        profile.stack.pop()
+        phase["peak"] = max(phase["peak"], tracemalloc.get_traced_memory()[1])
+        profile.record(name, cpu_name, seconds, 1, phase["peak"] - phase["traced"])
+        profile.peak_memory = max(profile.peak_memory, phase["peak"])
+        if phase["profiler"] is not None:
+            profile.add_profile(name, pstats.Stats(phase["profiler"]))
+        if parent is not None:
+            parent["peak"] = max(parent["peak"], phase["peak"])
+            if parent["profiler"] is not None:
+                parent["profiler"].enable()
+
+def profiled_call(name, cpu_name, function, *args, **kwargs):
+    """
+    Runs function(*args, **kwargs) as phase name of cpu_name in a forked worker process and returns (result, worker_phases),
+    where worker_phases holds what the worker recorded (None when not profiling) for merge_worker_phases in the parent.
+    """
+    if active_profile is None:
+        return function(*args, **kwargs), None
+    # The worker's copy of the profile still holds what the parent had recorded and opened when it was forked
+    active_profile.phases, active_profile.profiles, active_profile.stack = {}, {}, []
+    with profile_phase(name, cpu_name):
+        result = function(*args, **kwargs)
+    return result, (active_profile.phases, {phase: stats.stats for phase, stats in active_profile.profiles.items()})
+
+def merge_worker_phases(worker_phases):
+    """Adds the phases a worker returned from profiled_call to the active profile."""
+    if active_profile is None or worker_phases is None:
+        return
+    phases, profiles = worker_phases
+    for (phase, cpu_name), entry in phases.items():
+        active_profile.record(phase, cpu_name, entry["seconds"], entry["calls"], entry["peak_memory_bytes"])
+    for phase, stats_data in profiles.items():
+        stats = pstats.Stats()
+        stats.stats = stats_data
+        stats.get_top_level_stats()
+        active_profile.add_profile(phase, stats)
+
+def config_counts(cpu_config):
+    """
+    Returns the size of an allocated CpuConfig: its modules (submodules and Repeat instances included), the registers
+    its enabled modules span in the address map, the fields of its described registers, its Module_Include entries
+    and its Repeat instances.
+    """
+    counts = {"modules": 0, "registers": 0, "fields": 0, "includes": 0, "repeat_instances": 0}
+    for section in ["BUILTIN_MODULES", "USER_MODULES"]:
+        for module in cpu_config.modules(section).values():
+            counts["modules"] += 1
+            if module.enabled and module.submodule_of is None and module.has_bounds:
+                counts["registers"] += (module.end - module.start) // 4 + 1
+            counts["fields"] += sum(len(register.fields) for register in module.regs.values())
+            if module.repeat_instance:
+                counts["repeat_instances"] += 1
+            elif module.include_file is not None:
+                counts["includes"] += 1
+    return counts
+
+def record_config_counts(cpu_name, cpu_config):
+    """Records the config_counts of a CPU in the active profile."""
+    if active_profile is not None:
+        active_profile.counts[cpu_name] = config_counts(cpu_config)
+
+def profile_stats_file_name(phase):
+    """Returns the pstats file name of a phase, e.g. parse.read.includes.pstats for parse/read/includes."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", phase.replace("/", ".")) + ".pstats"
+
+def save_profile_report(directory_path):
+    """
+    Writes the report of the active profile to generator_profile.json in directory_path: the wall time and peak traced
+    memory of the run, the totals of every phase over all CPUs and, per CPU, its counts and phases. Peak memory of a
+    phase is the most it traced above what was traced when it started. In cprofile mode the call profile of every phase
+    is dumped to generator_profile/<phase>.pstats as well. Returns the report path.
+    """
+    profile = active_profile
+    cpus = {cpu_name: {} for cpu_name in profile.counts}
+    totals = {}
+    for (phase, cpu_name), entry in profile.phases.items():
+        if cpu_name is not None:
+            cpus.setdefault(cpu_name, {})[phase] = {**entry, "seconds": round(entry["seconds"], 6)}
+        total = totals.setdefault(phase, {"seconds": 0.0, "calls": 0, "peak_memory_bytes": 0})
+        total["seconds"] += entry["seconds"]
+        total["calls"] += entry["calls"]
+        total["peak_memory_bytes"] = max(total["peak_memory_bytes"], entry["peak_memory_bytes"])
+    report = {
+        "format": profile_report_version,
+        "mode": profile.mode,
+        "wall_seconds": round(time.perf_counter() - profile.start, 6),
+        "peak_memory_bytes": profile.peak_memory,
+        "phases": {phase: {**total, "seconds": round(total["seconds"], 6)} for phase, total in totals.items()},
+        "cpus": {cpu_name: {"counts": profile.counts.get(cpu_name, {}), "phases": phases} for cpu_name, phases in cpus.items()},
+    }
+    report_path = os.path.join(directory_path, profile_report_file_name)
+    write_output_file(report_path, json.dumps(report, indent=1) + "\n")
+    print(f"Profile saved to {report_path}")
+    if profile.mode == "cprofile":
+        stats_directory = os.path.join(directory_path, os.path.splitext(profile_report_file_name)[0])
+        os.makedirs(stats_directory, exist_ok=True)
+        for phase, stats in profile.profiles.items():
+            stats.dump_stats(os.path.join(stats_directory, profile_stats_file_name(phase)))
+        print(f"Call profiles of {len(profile.profiles)} phases saved to {stats_directory}")
+    return report_path
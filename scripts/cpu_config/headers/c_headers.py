@@ -1,14 +1,12 @@
 import os
 import re
 
-from cpu_config_helpers import sanitize_identifier
-from registers import reorder_tree
+from output_files import write_output_file, report_output
 
-def export_c_headers(parsed_configs, submodule_reg_map, directory_path, reg_width_bytes=4, user_modules_only=False, new_c_header=False):
-    for cpu_name, cpu_config in parsed_configs.items():
+def export_c_headers(register_maps, directory_path, reg_width_bytes=4, user_modules_only=False, new_c_header=False):
+    for cpu_name, register_map in register_maps.items():
         output_dir = cpu_name
-        os.makedirs(f"{directory_path}/{output_dir}", exist_ok=True)
-        current_submodule_map = reorder_tree(submodule_reg_map)[cpu_name]
+        current_submodule_map = register_map.submodules
 
         c_filename = os.path.join(directory_path, output_dir, f"{cpu_name}_registers.h")
 
@@ -84,39 +82,25 @@ static inline uint8_t Read8(Register reg) {{
         module_sections = ["USER_MODULES"] if user_modules_only else ["BUILTIN_MODULES", "USER_MODULES"]
 
         for section in module_sections:
-            for module_name, module in cpu_config.get(section, {}).items():
+            for module in register_map.modules(section):
                 temp_module_storage = []
-                if module_name == "BaseAddress" or not isinstance(module, dict):
+                module_name = module.name
+                if not module.enabled or not module.has_bounds:
                     continue
-                if module.get("flag") != "TRUE" or "bounds" not in module:
+                if module.submodule is not None and not new_c_header:
                     continue
-                if any(x.module_name == module_name for x in current_submodule_map) and not new_c_header:
-                    continue
-                try:
-                    start_addr = module["bounds"][0]
-                    end_addr = module["bounds"][1]
-                except Exception:
-                    continue
-
-                reg_count = ((end_addr - start_addr) // reg_width_bytes) + 1
-                subregisters = module.get("subregisters", 0)
-                module_id = module_name.upper()
-                mod_meta = module.get("metadata", {})
-                mod_name_str = mod_meta.get("name", module_name)
-                mod_desc_str = mod_meta.get("description", "").strip()
-                mod_reg_expand_str = mod_meta.get("expand_regs", '')
-                mod_repeat_inst = mod_meta.get("repeat_instance", '')
-                mod_repeat_info = module.get("repeat", {"value": {}, "expand_regs": {}, "repeat_of": {}})
-
-                if "submodule_of" in module:
-                    for submodule in current_submodule_map:
-                        if submodule.module_name == module_name:
-                            base_module_reg_expand = submodule.base_reg_exp
-                            break
-                else:
-                    base_module_reg_expand = ""
 
-                if base_module_reg_expand == "TRUE":
+                start_addr = module.start
+                reg_count = module.reg_count
+                subregisters = module.subregisters
+                module_id = module.identifier
+                mod_name_str = module.display_name if module.display_name is not None else module_name
+                mod_desc_str = module.description
+                mod_reg_expand = module.model.expand_regs
+                mod_repeat_inst = module.model.repeat_instance
+                mod_repeat_count = module.model.repeat_count
+
+                if module.base_reg_exp == "TRUE":
                     continue
 
                 # === Module Documentation ===
@@ -142,26 +126,22 @@ static inline uint8_t Read8(Register reg) {{
                 c_enum_entries = []
                 c_addr_macros = []
 
-                if (mod_reg_expand_str == 'FALSE' or (mod_repeat_inst == 'TRUE' and mod_repeat_info["expand_regs"] == 'FALSE' and mod_reg_expand_str == 'FALSE')):
+                if (not mod_reg_expand or (mod_repeat_inst and module.model.repeat_expand_regs is False and not mod_reg_expand)):
                     modified_range_reg_count = max(1, reg_count - subregisters)
                     for i in range(modified_range_reg_count):
-                        addr = start_addr + i * reg_width_bytes
-                        reg_key = f"Reg{i}"
-                        reg_info = module.get("regs", {}).get(reg_key, {})
-                        reg_name_raw = reg_info.get("name", f"Reg{i}")
-                        reg_desc = reg_info.get("description", "").strip()
-                        reg_perm = reg_info.get("permissions", "").strip()
-                        reg_name_id = sanitize_identifier(reg_name_raw)
+                        register = module.register(i, reg_width_bytes)
+                        addr = register.address
+                        reg_name_raw = register.name
+                        reg_desc = register.description
+                        reg_perm = register.permissions
+                        reg_name_id = register.identifier
                         entry_name = f"{module_id}_{reg_name_id}"
 
                         if new_c_header and i == 0:
                             c_lines_storage.append(f"typedef struct {{")
                             c_lines_storage.append(f"    CompactRegisterBlock block;")
-                            for idx, entry in enumerate(current_submodule_map):
-                                    if entry.module_parent == module_name:
-                                        full_submodule_name = entry.module_name
-                                        sub_module = str(full_submodule_name.split(entry.separator)[-1])
-                                        c_lines_storage.append(f"    {full_submodule_name}_t {sub_module};")
+                            for child in module.children:
+                                c_lines_storage.append(f"    {child.name}_t {child.short_name};")
                         add_reg_comma = ","
                         if (i == (reg_count-subregisters)-1):
                             add_reg_comma = ""
@@ -194,14 +174,11 @@ static inline uint8_t Read8(Register reg) {{
                                 c_lines_storage.append(f"}} {module_id.lower()}_t;\n")
                                 c_lines_storage.append(f"static const {module_id.lower()}_t {module_id.lower()} = {{")
                                 c_lines_storage.append(f"    .block = {{ 0x{start_addr:04X}, {reg_count}, {reg_width_bytes} }},")
-                                for idx, entry in enumerate(current_submodule_map):
-                                    if entry.module_parent == module_name:
-                                        full_submodule_name = entry.module_name
-                                        sub_module = str(full_submodule_name.split(entry.separator)[-1])
-                                        if (idx < len(current_submodule_map)-1) or (reg_count-subregisters) > 0:
-                                            c_lines_storage.append(f"    .{sub_module} = {full_submodule_name},")
-                                        else:
-                                            c_lines_storage.append(f"    .{sub_module} = {full_submodule_name}")
+                                for child in module.children:
+                                    if (child.position < len(current_submodule_map)-1) or (reg_count-subregisters) > 0:
+                                        c_lines_storage.append(f"    .{child.short_name} = {child.name},")
+                                    else:
+                                        c_lines_storage.append(f"    .{child.short_name} = {child.name}")
                 else:
                     c_lines_storage.append(f"typedef struct {{")
                     c_lines_storage.append(f"   CompactRegisterBlock block;")
@@ -215,33 +192,31 @@ static inline uint8_t Read8(Register reg) {{
                     c_lines_storage.append(f"}};\n")
                     
                 #Generate Repeat Module Arrays
-                if not mod_repeat_info.get("value", {}) and subregisters > 0:
+                if not mod_repeat_count and subregisters > 0:
                     array_type = ""
                     adding_array = 0
-                    for entry in current_submodule_map:
-                        if entry.module_parent == module_name and cpu_config.get(section, {}).get(entry.module_name).get("repeat", {}).get("value", None):
-                            if adding_array == 0:
-                                c_lines_storage.append(f"// Repeat Instance Iterable Array(s) of {entry.module_parent}")
-                            module_name_stripped = entry.module_name.split(entry.separator)[-1]
-                            base_module_match = re.match(r"(.+?)(?:_\d+)?$", module_name_stripped)
-                            base_module = base_module_match.group(1)
-                            if module_name_stripped == base_module:
-                                array_type = entry.module_name
-                                c_lines_storage.append(f"static __attribute__((unused))")
-                                array_name = entry.module_name.split(entry.separator)[-1]
-                                array_count = array_mask.count(array_name)
-                                array_iterator = f"_{array_count}" if array_count != 0 else ""
-                                c_lines_storage.append(f"{entry.module_name}_t* {array_name}_array{array_iterator}[] = {{")
-                                array_mask.append(array_name)
-                                adding_array = 1
-                                for entry in current_submodule_map:
-                                    if entry.module_parent == module_name and cpu_config.get(section, {}).get(entry.module_name).get("repeat", {}).get("value", None) and adding_array == 1:
-                                        module_name_stripped = entry.module_name.split(entry.separator)[-1]
-                                        if module_name_stripped == base_module or module_name_stripped.startswith(base_module + "_"):
-                                            c_lines_storage.append(f"   ({array_type}_t*)&{entry.module_name},")
-                                if adding_array == 1:
-                                    c_lines_storage[-1] = c_lines_storage[-1].replace(",", "") #Remove comma from last entry
-                                    c_lines_storage.append(f"}};\n")
+                    repeat_children = [child for child in module.children if child.model.repeat_count]
+                    for child in repeat_children:
+                        if adding_array == 0:
+                            c_lines_storage.append(f"// Repeat Instance Iterable Array(s) of {module_name}")
+                        module_name_stripped = child.short_name
+                        base_module_match = re.match(r"(.+?)(?:_\d+)?$", module_name_stripped)
+                        base_module = base_module_match.group(1)
+                        if module_name_stripped == base_module:
+                            array_type = child.name
+                            c_lines_storage.append(f"static __attribute__((unused))")
+                            array_name = child.short_name
+                            array_count = array_mask.count(array_name)
+                            array_iterator = f"_{array_count}" if array_count != 0 else ""
+                            c_lines_storage.append(f"{child.name}_t* {array_name}_array{array_iterator}[] = {{")
+                            array_mask.append(array_name)
+                            adding_array = 1
+                            for instance in repeat_children:
+                                if instance.short_name == base_module or instance.short_name.startswith(base_module + "_"):
+                                    c_lines_storage.append(f"   ({array_type}_t*)&{instance.name},")
+                            if adding_array == 1:
+                                c_lines_storage[-1] = c_lines_storage[-1].replace(",", "") #Remove comma from last entry
+                                c_lines_storage.append(f"}};\n")
                 c_module_storage[0:0] = c_lines_storage
                 c_lines_storage = []
                 temp_c_storage = []
@@ -254,6 +229,5 @@ static inline uint8_t Read8(Register reg) {{
                 c_lines.append(entry)
             c_lines.append("#endif")
         
-        with open(c_filename, "w") as f:
-            f.write("\n".join(c_lines))
-        print(f"C header for {cpu_name} saved to: {os.path.abspath(c_filename)}")
\ No newline at end of file
+        write_output_file(c_filename, "\n".join(c_lines))
+        report_output(f"C header for {cpu_name} saved to: {os.path.abspath(c_filename)}")
\ No newline at end of file
@@ -2,13 +2,11 @@ import os
 import re
 
 from cpu_config_helpers import sanitize_identifier
-from registers import reorder_tree
+from output_files import write_output_file, report_output
 
-def export_python_headers(parsed_configs, submodule_reg_map, directory_path, reg_width_bytes=4, user_modules_only=False, new_python_header=False):
-    for cpu_name, cpu_config in parsed_configs.items():
+def export_python_headers(register_maps, directory_path, reg_width_bytes=4, user_modules_only=False, new_python_header=False):
+    for cpu_name, register_map in register_maps.items():
         output_dir = cpu_name
-        os.makedirs(f"{directory_path}/{output_dir}", exist_ok=True)
-        current_submodule_map = reorder_tree(submodule_reg_map)[cpu_name]
 
         py_filename = os.path.join(directory_path, output_dir, f"{cpu_name}_registers.py")
 
@@ -354,38 +352,23 @@ class FPGAInterface:
         module_sections = ["USER_MODULES"] if user_modules_only else ["BUILTIN_MODULES", "USER_MODULES"]
 
         for section in module_sections:
-            for module_name, module in cpu_config.get(section, {}).items():
+            for module in register_map.modules(section):
                 temp_module_storage = []
-                if module_name == "BaseAddress" or not isinstance(module, dict):
+                module_name = module.name
+                if not module.enabled or not module.has_bounds:
                     continue
-                if module.get("flag") != "TRUE" or "bounds" not in module:
-                    continue
-                if any(x.module_name == module_name for x in current_submodule_map) and not new_python_header:
-                    continue
-                try:
-                    start_addr = module["bounds"][0]
-                    end_addr = module["bounds"][1]
-                except Exception:
+                if module.submodule is not None and not new_python_header:
                     continue
 
-                reg_count = ((end_addr - start_addr) // reg_width_bytes) + 1
-                module_id = module_name.upper()
-                mod_meta = module.get("metadata", {})
-                mod_name_str = mod_meta.get("name", module_name)
-                mod_desc_str = mod_meta.get("description", "").strip()
-                mod_reg_expand_str = mod_meta.get("expand_regs", '')
-                mod_repeat_inst = mod_meta.get("repeat_instance", '')
-                mod_repeat_info = module.get("repeat", {"value": {}, "expand_regs": {}, "repeat_of": {}})
-
-                if "submodule_of" in module:
-                    for submodule in current_submodule_map:
-                        if submodule.module_name == module_name:
-                            base_module_reg_expand = submodule.base_reg_exp
-                            break
-                else:
-                    base_module_reg_expand = ""
+                start_addr = module.start
+                reg_count = module.reg_count
+                module_id = module.identifier
+                mod_name_str = module.display_name if module.display_name is not None else module_name
+                mod_desc_str = module.description
+                mod_reg_expand = module.model.expand_regs
+                mod_repeat_inst = module.model.repeat_instance
 
-                if base_module_reg_expand == "TRUE":
+                if module.base_reg_exp == "TRUE":
                     continue
 
                 # === Module Documentation ===
@@ -406,57 +389,54 @@ class FPGAInterface:
                     #Submodule specific Logic
                     subblock_name = None
                     hidden_entry_prefix = ""
-                    if any(x.module_name == module_name for x in current_submodule_map) and module.get("submodule_of", "") or any(x.base_module == module_name for x in current_submodule_map):
+                    if module.submodule is not None and module.model.submodule_of or module.is_base:
                         current_module = ""
                         subblock_placed = False
-                        for idx, entry in enumerate(current_submodule_map):
-                            if entry.module_parent == module_name and cpu_config[entry.section][entry.module_name]["flag"] == 'TRUE':
-                                if entry.base_reg_exp == 'TRUE':
+                        for child in module.children:
+                            if child.enabled:
+                                if child.base_reg_exp == 'TRUE':
                                     continue
-                                sub_module = str(entry.module_name.split(entry.separator)[-1])
-                                get_current_addr = module.get("bounds")
-                                get_sub_addr = cpu_config[entry.section][entry.module_name]["bounds"]
-                                offset_from_base = get_sub_addr[0]-get_current_addr[0]
+                                offset_from_base = child.start-start_addr
                                 if current_module != module_id:
                                     current_module = module_id
                                     temp_module_storage.append(f"_{module_id}_subblocks = [")
                                     subblock_placed = True
-                                temp_module_storage.append(f"    ('{sub_module}', {offset_from_base}, _{entry.module_name}),")
-                            if idx == len(current_submodule_map)-1 and subblock_placed:
-                                temp_module_storage.append(f"]")
+                                temp_module_storage.append(f"    ('{child.short_name}', {offset_from_base}, _{child.name}),")
+                        if subblock_placed:
+                            temp_module_storage.append(f"]")
                         if subblock_placed == True:
                             subblock_name = f"_{module_id}_subblocks"
                     hidden_entry_prefix = "_"
                     #Normal Module Logic
                     register_defs = []
-                    if (mod_reg_expand_str == 'FALSE' or (mod_repeat_inst == 'TRUE' and mod_repeat_info["expand_regs"] == 'FALSE' and mod_reg_expand_str == 'FALSE')):
+                    if (not mod_reg_expand or (mod_repeat_inst and module.model.repeat_expand_regs is False and not mod_reg_expand)):
                         field_defs = []
                         for i in range(reg_count):
-                            reg_key = f"Reg{i}"
-                            reg_info = module.get("regs", {}).get(reg_key, {})
-                            field_info = reg_info.get("fields")
+                            register = module.register(i, reg_width_bytes)
+                            field_info = register.model.fields if register.model is not None else {}
                             reg_fields = []
                             if field_info:
-                                for field_name, field_data in field_info.items():
+                                for field in field_info.values():
                                     try:
-                                        upper_bounds = field_data['bounds'][0]
-                                        lower_bounds = field_data['bounds'][1]
+                                        upper_bounds = field.upper
+                                        lower_bounds = field.lower
                                         if upper_bounds < 0 or lower_bounds < 0 or upper_bounds == None or lower_bounds == None:
                                             raise SyntaxError(f"Field Bounds for {module_name} is not valid")
                                         width = abs(upper_bounds - lower_bounds)+1
                                     except Exception:
                                         raise SyntaxError(f"Field Bounds for {module_name} is not valid")
-                                    field_name = sanitize_identifier(field_data.get('name', ''))
-                                    reg_fields.append((field_name.lower(), lower_bounds, width, field_data.get('description', '')))
+                                    field_name = sanitize_identifier(field.name)
+                                    # A field without a description has always been written out as {}
+                                    field_desc = field.description if field.description is not None else {}
+                                    reg_fields.append((field_name.lower(), lower_bounds, width, field_desc))
                             else:
                                 reg_fields.append((None, None, None, None))
                             field_defs.append(reg_fields)
-                            reg_name_raw = reg_info.get("name", f"Reg{i}")
-                            reg_name_id = sanitize_identifier(reg_name_raw)
+                            reg_name_id = register.identifier
                             if (re.fullmatch(r'REG\d+', reg_name_id)): #Check for default name. Assume it shouldn't be exposed if it is
                                 continue
-                            reg_perm = reg_info.get("permissions", "").strip()
-                            reg_desc = reg_info.get("description", "").strip()
+                            reg_perm = register.permissions
+                            reg_desc = register.description
                             if reg_perm not in ("R", "W", "R/W"):
                                 reg_perm = "R/W"
                             register_defs.append((reg_name_id.lower(), reg_perm, reg_desc))
@@ -481,13 +461,12 @@ class FPGAInterface:
                         temp_module_storage.append(f"{hidden_entry_prefix}{module_id.lower()} = CompactRegisterBlock(0x{start_addr:04X}, {reg_count}, {reg_width_bytes}, {(mod_name_str,mod_desc_str)}, _{module_id}_reg_defs, {subblock_name})\n")
                     else:
                         temp_module_storage.append(f"{hidden_entry_prefix}{module_id.lower()} = CompactRegisterBlock(0x{start_addr:04X}, {reg_count}, {reg_width_bytes}, {(mod_name_str,mod_desc_str)}, None, {subblock_name})\n")
-                    if not(any(x.module_name == module_name for x in current_submodule_map)):
+                    if module.submodule is None:
                         temp_module_storage.append(f"FPGAInterface.{module_id.lower()} = _{module_id.lower()}")
                     module_storage[0:0] = temp_module_storage
 
         for entry in module_storage:
             py_lines.append(entry)
 
-        with open(py_filename, "w") as f:
-            f.write("\n".join(py_lines))
-        print(f"Python header for {cpu_name} saved to: {os.path.abspath(py_filename)}\n")
\ No newline at end of file
+        write_output_file(py_filename, "\n".join(py_lines))
+        report_output(f"Python header for {cpu_name} saved to: {os.path.abspath(py_filename)}\n")
\ No newline at end of file
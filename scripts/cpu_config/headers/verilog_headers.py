@@ -2,23 +2,20 @@ import os
 from collections import namedtuple
 
 from cpu_config_helpers import sanitize_identifier
-from registers import reorder_tree
+from output_files import write_output_file, report_output
 
-def export_verilog_headers(parsed_configs, submodule_reg_map, directory_path, reg_width_bytes=4, user_modules_only=False, verilog_muxes=False, verilog_regs=False, strip_verilog=False):
+def export_verilog_headers(register_maps, directory_path, reg_width_bytes=4, user_modules_only=False, verilog_muxes=False, verilog_regs=False, strip_verilog=False):
     regs_package_mask_list = []
     mux_package_mask_list = []
     generate_files = True
-    for cpu_name, cpu_config in parsed_configs.items():
+    for cpu_name, register_map in register_maps.items():
         output_dir = cpu_name
-        os.makedirs(f"{directory_path}/{output_dir}", exist_ok=True)
-        current_submodule_map = reorder_tree(submodule_reg_map)[cpu_name]
         verilog_filename = os.path.join(directory_path, output_dir, f"{cpu_name}_muxes.sv")
         verilog_lines = []
         verilog_lines.append(f"// Auto-generated data mux modules and packages\n")
         #Case where function is called and no submodules are present
-        try:
-            submodule_separator = current_submodule_map[0].separator
-        except:
+        submodule_separator = register_map.separator
+        if submodule_separator is None:
             print(f"Warning: Verilog headers not generated due to no submodules")
             submodule_separator = " "
             generate_files = False
@@ -28,15 +25,14 @@ def export_verilog_headers(parsed_configs, submodule_reg_map, directory_path, re
         module_sections = ["USER_MODULES"] if user_modules_only else ["BUILTIN_MODULES", "USER_MODULES"]
 
         for section in module_sections:
-            for module_name, module in cpu_config.get(section, {}).items():
-                mod_regs = module.get("regs", {})
+            for module_entry in register_map.modules(section):
+                module_name = module_entry.name
+                mod_regs = module_entry.model.regs
                 mod_reg_offsets = []
 
-                if not cpu_config[section][module_name]["metadata"].get("repeat_instance", ''):
-                    for idx, _ in enumerate(mod_regs):
-                        reg_key = f"Reg{idx}"
-                        reg_info = module.get("regs", {}).get(reg_key, {})
-                        reg_name = sanitize_identifier(reg_info.get('name',{})).lower()
+                if not module_entry.model.repeat_instance:
+                    for idx in range(len(mod_regs)):
+                        reg_name = sanitize_identifier(mod_regs[f"Reg{idx}"].name).lower()
                         mod_reg_offsets.append(f"localparam {reg_name}_offset = 'h{(idx*reg_width_bytes):04X};")
                     
                     module_name_stripped = str(module_name.split(submodule_separator)[-1])
@@ -63,23 +59,16 @@ endpackage
                         else:
                            raise RuntimeError(f"Multiple definitions of module instance name: '{module_name}'. Please rename.") 
 
-                if module_name == "BaseAddress" or not isinstance(module, dict):
+                if not module_entry.children:
                     continue
-                if not any(x.module_parent == module_name for x in current_submodule_map):
-                    continue
-                if module.get("flag") != "TRUE" or "bounds" not in module:
-                    continue
-                try:
-                    start_addr = module["bounds"][0]
-                    end_addr = module["bounds"][1]
-                except Exception:
+                if not module_entry.enabled or not module_entry.has_bounds:
                     continue
 
-                reg_count = ((end_addr - start_addr) // reg_width_bytes) + 1
-                subregisters = module.get("subregisters", "0")
-                mod_meta = module.get("metadata", {})
-                mod_name_str = mod_meta.get("name", module_name)
-                mod_desc_str = mod_meta.get("description", "").strip()
+                start_addr = module_entry.start
+                reg_count = module_entry.reg_count
+                subregisters = module_entry.subregisters
+                mod_name_str = module_entry.display_name if module_entry.display_name is not None else module_name
+                mod_desc_str = module_entry.description
 
                 num_ports = 0
                 offset = 0
@@ -94,7 +83,7 @@ endpackage
                 mod_data_i_values = []
                 mod_data_i_assignments = []
 
-                if cpu_config[section][module_name]["metadata"].get("repeat_instance", ''):
+                if module_entry.model.repeat_instance:
                     continue
 
                 if (reg_count-subregisters) >= 1: #Account for if the module itself has registers
@@ -105,7 +94,7 @@ endpackage
                         if not mux_package_mask_list.count(stripped_name) > 1:
                             mod_params_data.append(f"                   '{{'h{offset:04X}, {reg_count-subregisters}}}, // {stripped_module_name}\n")
                             mod_params_base_addresses.append(f"localparam {stripped_module_name}_offset = 'h{offset:04X};")
-                            repeat_instance = cpu_config[section][module_name]["metadata"].get("repeat_instance", '')
+                            repeat_instance = module_entry.model.repeat_instance
                             if not repeat_instance:
                                 mod_params_reg_count.append(f"localparam {stripped_module_name}_reg_count = {reg_count-subregisters};")
                                 local_mux_package_mask_list.append(stripped_name)
@@ -116,29 +105,28 @@ endpackage
                     else:
                         raise RuntimeError(f"Multiple definitions of module instance name: '{module_name}'. Please rename.")
 
-                for elements in current_submodule_map:
-                    if module_name == elements.module_parent:
-                        stripped_name = str(elements.module_name.split(submodule_separator)[-1])
-                        stripped_module_name = stripped_name
-                        stripped_name = elements.module_name if not strip_verilog else stripped_name
-                        if not local_mux_package_mask_list.count(stripped_name) > 1:
-                            if not mux_package_mask_list.count(stripped_name) > 1:
-                                current_module_start_addr = cpu_config[section][elements.module_name]["bounds"][0]
-                                current_module_end_addr = cpu_config[section][elements.module_name]["bounds"][1]
-                                current_module_reg_count = ((current_module_end_addr - current_module_start_addr) // reg_width_bytes) + 1
-                                mod_params_data.append(f"                   '{{'h{offset:04X}, {current_module_reg_count}}}, // {stripped_module_name}\n")
-                                mod_params_base_addresses.append(f"localparam {stripped_module_name}_offset = 'h{offset:04X};")
-                                repeat_instance = cpu_config[section][elements.module_name]["metadata"].get("repeat_instance", '')
-                                if not repeat_instance:
-                                    mod_params_reg_count.append(f"localparam {stripped_module_name}_reg_count = {current_module_reg_count};")
-                                    local_mux_package_mask_list.append(stripped_name)
-                                mod_num_instances.append(mod_params_instances_tuple(stripped_module_name, repeat_instance))
-                                mod_input_ports.append(f"input  logic [31:0] {stripped_module_name}_data_i,")
-                                mod_data_i_values.append(mod_data_tuple(num_ports, stripped_module_name))
-                                num_ports += 1
-                                offset += (current_module_reg_count)*reg_width_bytes
-                        else:
-                            raise RuntimeError(f"Multiple definitions of module instance name: '{stripped_name}'. Please rename.")
+                for child in module_entry.children:
+                    stripped_name = child.short_name
+                    stripped_module_name = stripped_name
+                    stripped_name = child.name if not strip_verilog else stripped_name
+                    if not local_mux_package_mask_list.count(stripped_name) > 1:
+                        if not mux_package_mask_list.count(stripped_name) > 1:
+                            current_module_start_addr = child.start
+                            current_module_reg_count = child.reg_count
+                            offset = current_module_start_addr - start_addr # Submodules can be padded apart (NATURAL allocation)
+                            mod_params_data.append(f"                   '{{'h{offset:04X}, {current_module_reg_count}}}, // {stripped_module_name}\n")
+                            mod_params_base_addresses.append(f"localparam {stripped_module_name}_offset = 'h{offset:04X};")
+                            repeat_instance = child.model.repeat_instance
+                            if not repeat_instance:
+                                mod_params_reg_count.append(f"localparam {stripped_module_name}_reg_count = {current_module_reg_count};")
+                                local_mux_package_mask_list.append(stripped_name)
+                            mod_num_instances.append(mod_params_instances_tuple(stripped_module_name, repeat_instance))
+                            mod_input_ports.append(f"input  logic [31:0] {stripped_module_name}_data_i,")
+                            mod_data_i_values.append(mod_data_tuple(num_ports, stripped_module_name))
+                            num_ports += 1
+                            offset += (current_module_reg_count)*reg_width_bytes
+                    else:
+                        raise RuntimeError(f"Multiple definitions of module instance name: '{stripped_name}'. Please rename.")
 
                 mod_params_data[-1] = mod_params_data[-1].replace("},", "} ") #Remove comma from last entry
                 mod_params_base_address_joined = "\n    ".join(mod_params_base_addresses)
@@ -259,9 +247,10 @@ endmodule
             regs_package_mask_list.append(item)
 
         if generate_files == True:
-            with open(verilog_filename, "w") as f:
-                if verilog_muxes:
-                    f.write("\n".join(verilog_lines))
-                if verilog_regs:
-                    f.write("\n".join(mod_reg_package))
-            print(f"Verilog mux modules and packages for {cpu_name} saved to: {os.path.abspath(verilog_filename)}")
\ No newline at end of file
+            verilog_output = ""
+            if verilog_muxes:
+                verilog_output += "\n".join(verilog_lines)
+            if verilog_regs:
+                verilog_output += "\n".join(mod_reg_package)
+            write_output_file(verilog_filename, verilog_output)
+            report_output(f"Verilog mux modules and packages for {cpu_name} saved to: {os.path.abspath(verilog_filename)}")
\ No newline at end of file
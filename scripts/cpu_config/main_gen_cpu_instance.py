@@ -1,24 +1,20 @@
 #!/usr/bin/env python3
 import os
+import sys
 import subprocess
 import shutil
 import argparse
-from cpu_config_parser import *
-from verilog import *
-from registers import *
+from cpu_config_generator import *
+from config_cache import resolve_cache_dir, cache_dir_env_var, generator_fingerprint
+from build_manifest import BuildManifest, build_manifest_file_name
+from config_watch import watch_configs
+from config_sweep import parameter_override, read_sweep_file, run_sweep
+from generator_profile import profile_modes, profile_report_file_name, start_profile, profile_phase, save_profile_report
 
 current_directory = os.path.abspath(__file__)
 
-from headers.c_headers import export_c_headers
-from headers.python_headers import export_python_headers
-from headers.zig_headers import export_zig_headers
-from headers.verilog_headers import export_verilog_headers
-
-config_file_names = ["cpu_config.txt", "cpu_config.cfg"]
-
 directory_path = "."
 build_script = "build_single_module.sh"
-reference_system_file = "ref_fpga_sys_lite.sv"
 
 parser = argparse.ArgumentParser(prog="generate_cpu_instance.py", description="Generate CPU Instance", add_help=False,
                                  formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=50))
@@ -30,80 +26,120 @@ parser.add_argument("--print-all-registers", action='store_true', help="Prints a
 parser.add_argument("--print-user-registers", action='store_true', help="Prints user registers to console")
 parser.add_argument("--save-all-registers", action='store_true', help="Saves all registers to a cpu_registers.txt file")
 parser.add_argument("--save-user-registers", action='store_true', help="Saves user registers to a cpu_registers.txt file")
+parser.add_argument("--cache-dir", help=f"Cache parsed configs in this directory (or set {cache_dir_env_var})")
+parser.add_argument("--no-cache", action='store_true', help="Ignore the parsed config cache")
+parser.add_argument("--jobs", type=int, default=1, help="Number of CPU folders to parse, output files to write or sweep variants to generate in parallel")
+parser.add_argument("--explain", action='store_true', help="Print why each output was rebuilt or skipped")
+parser.add_argument("--watch", action='store_true', help="Keep running and regenerate outputs whenever a config or included file changes")
+parser.add_argument("-P", "--param", action='append', type=parameter_override, metavar="NAME=VALUE", help="Override a parameter, or sweep it with NAME=VALUE,VALUE,... (variants go to --sweep-dir)")
+parser.add_argument("--sweep", metavar="SWEEP_FILE", help="Sweep every combination of the parameter values listed in SWEEP_FILE")
+parser.add_argument("--sweep-dir", help="Folder for the sweep variants (default: sweep in the configs path)")
+parser.add_argument("--profile", nargs="?", const="time", choices=profile_modes, help=f"Save the time and peak memory of every phase and CPU to {profile_report_file_name} (cprofile: also dump pstats per phase)")
 
 args = parser.parse_args()
 
+if args.watch and args.build:
+    parser.error("--watch cannot be combined with --build")
+if (args.param or args.sweep) and (args.build or args.watch):
+    parser.error("-P and --sweep cannot be combined with --build or --watch")
+if args.profile and (args.watch or args.param or args.sweep):
+    parser.error("--profile cannot be combined with --watch, -P or --sweep")
+
+if args.profile:
+    start_profile(args.profile)
+
 if args.configs_path:
     directory_path = args.configs_path
 
 absolute_path = os.path.abspath(directory_path)
 
-#folders = list_folders(directory_path)
-#print(folders)
+filtered_dirs = [dir_name for dir_name, has_config in check_config_files(absolute_path, config_file_names).items() if has_config]
+
+cache_dir = resolve_cache_dir(args.cache_dir, args.no_cache)
+
+zig_header = header_options(args.gen_headers)["zig_header"]
+
+if args.param or args.sweep:
+    # Variants go to their own folders; the regular outputs and the build manifest are left alone
+    sweep_axes = (args.param or []) + (read_sweep_file(args.sweep) if args.sweep else [])
+    sweep_registers = "all" if args.save_all_registers else "user" if args.save_user_registers else None
+    failed_variants = run_sweep(absolute_path, config_file_names, sweep_axes, args.sweep_dir or os.path.join(absolute_path, "sweep"),
+                                args.gen_headers, sweep_registers, os.path.exists(reference_system_path), args.jobs)
+    sys.exit(1 if failed_variants else 0)
+
+def export_outputs(parsed_configs, submodule_reg_map, cpu_dependencies):
+    """
+    Prints and saves the register maps and writes every header and (without --build) SystemVerilog file that is out of date.
+    The header and SystemVerilog files are written by run_export_tasks, in parallel with --jobs.
+    Returns the BuildManifest and the register maps so --build can write and record its files without rebuilding the maps.
+    """
+    # Outputs whose inputs, options and generator code are unchanged since the last run are skipped (see build_manifest_file_name)
+    build_manifest = BuildManifest(absolute_path, generator_code_fingerprint, rebuild_all=args.build, explain=args.explain)
+    # Every exporter renders from the same flattened register maps, built once per run
+    with profile_phase("register maps"):
+        register_maps = build_register_maps(parsed_configs, submodule_reg_map)
+    all_cpu_inputs = [path for cpu_name in parsed_configs for path in cpu_dependencies[cpu_name]]
+
+    def stale_cpu_outputs(file_suffix, options, extra_inputs=[], together=False):
+        """Returns {cpu_name: output_path} for the per-CPU outputs named <cpu_name><file_suffix> that need rebuilding."""
+        outputs = {
+            cpu_name: (os.path.join(absolute_path, cpu_name, f"{cpu_name}{file_suffix}"),
+                       (all_cpu_inputs if together else list(cpu_dependencies[cpu_name])) + extra_inputs, options)
+            for cpu_name in parsed_configs
+        }
+        return {cpu_name: outputs[cpu_name][0] for cpu_name in build_manifest.stale_outputs(outputs, together)}
+
+    registers_file_stale = False
+    if args.save_all_registers or args.save_user_registers:
+        registers_file_path = os.path.join(absolute_path, "cpu_registers.txt")
+        registers_file_options = {"save_all_registers": args.save_all_registers, "save_user_registers": args.save_user_registers}
+        registers_file_stale = bool(build_manifest.stale_outputs({"cpu_registers.txt": (registers_file_path, all_cpu_inputs, registers_file_options)}))
+
+    if args.print_all_registers:
+        if (filtered_dirs):
+            dump_all_registers_from_configs(register_maps, absolute_path, user_modules_only=False)
 
-config_files = check_config_files(absolute_path, config_file_names)
-#print(config_files)
-if not any(config_files.values()):
-    raise FileNotFoundError("No Config Files Found")
+    if args.save_all_registers:
+        if (filtered_dirs) and registers_file_stale:
+            dump_all_registers_from_configs(register_maps, absolute_path, user_modules_only=False, save_to_file=True,print_to_console=False)
 
-filtered_dirs = [dir_name for dir_name in config_files if config_files.get(dir_name)]
-#print(filtered_dirs)
+    if args.print_user_registers:
+        if (filtered_dirs):
+            dump_all_registers_from_configs(register_maps, absolute_path, user_modules_only=True)
 
-parsed_configs, submodule_reg_map = process_configs(absolute_path, config_file_names)
-#print(parsed_configs)
-assign_auto_addresses(parsed_configs, submodule_reg_map)
+    if args.save_user_registers:
+        if (filtered_dirs):
+            dump_all_registers_from_configs(register_maps, absolute_path, user_modules_only=True, save_to_file=registers_file_stale, print_to_console=True)
+
+    if registers_file_stale:
+        build_manifest.record([registers_file_path])
+
+    # Each task renders one CPU's file, so the tasks only share the read-only register maps
+    export_tasks = []
+    systemverilog = not args.build and os.path.exists(reference_system_path)
+    for spec in export_specs(args.gen_headers, directory_path, absolute_path, systemverilog):
+        stale_outputs = stale_cpu_outputs(spec.file_suffix, spec.manifest_options, spec.extra_inputs, spec.together)
+        export_tasks.extend(spec_export_tasks(spec, register_maps, stale_outputs))
+
+    run_export_tasks(export_tasks, args.jobs)
+    for label, cpu_names, function, kwargs, output_paths in export_tasks:
+        build_manifest.record(output_paths)
+
+    if not args.build:
+        if os.path.exists(reference_system_path):
+            if (filtered_dirs):
+                build_manifest.save()
+        else:
+            raise FileNotFoundError(f"{reference_system_path} not found. Are you using a release build?")
+
+    return build_manifest, register_maps
+
+cpu_dependencies = {}
+parsed_configs, submodule_reg_map = load_configs(absolute_path, cache_dir, args.jobs, cpu_dependencies)
 #print(parsed_configs)
 
-if args.print_all_registers:
-    if (filtered_dirs):
-        dump_all_registers_from_configs(parsed_configs, submodule_reg_map, absolute_path, user_modules_only=False)
-
-if args.save_all_registers:
-    if (filtered_dirs):
-        dump_all_registers_from_configs(parsed_configs, submodule_reg_map, absolute_path, user_modules_only=False, save_to_file=True,print_to_console=False)
-
-if args.print_user_registers:
-    if (filtered_dirs):
-        dump_all_registers_from_configs(parsed_configs, submodule_reg_map, absolute_path, user_modules_only=True)
-
-if args.save_user_registers:
-    if (filtered_dirs):
-        dump_all_registers_from_configs(parsed_configs, submodule_reg_map, absolute_path, user_modules_only=True, save_to_file=True, print_to_console=True)
-
-zig_header = False
-if args.gen_headers:
-    new_python_header = False
-    new_c_header = False
-    verilog_muxes = False
-    verilog_regs = False
-    strip_verilog = False
-    for header in args.gen_headers:
-        match header:
-            case "strip-verilog": #Strips prefix of generated packages and modules
-                strip_verilog = True
-            case "new-python":
-                new_python_header = True
-            case "new-c":
-                new_c_header = True
-            case "zig":
-                zig_header = True
-            case "verilog-muxes":
-                verilog_muxes = True
-            case "verilog-regs":
-                verilog_regs = True
-    
-    if (filtered_dirs):
-        export_c_headers(parsed_configs=parsed_configs, submodule_reg_map=submodule_reg_map, 
-                         directory_path=directory_path, reg_width_bytes=4, user_modules_only=False, new_c_header=new_c_header)
-        export_python_headers(parsed_configs=parsed_configs, submodule_reg_map=submodule_reg_map, 
-                              directory_path=directory_path, reg_width_bytes=4, user_modules_only=False, new_python_header=new_python_header)
-        if zig_header:
-            export_zig_headers(parsed_configs=parsed_configs, submodule_reg_map=submodule_reg_map, directory_path=directory_path, 
-                               reg_width_bytes=4, user_modules_only=False)
-        if verilog_muxes or verilog_regs:
-            export_verilog_headers(parsed_configs=parsed_configs, submodule_reg_map=submodule_reg_map, directory_path=directory_path, 
-                                   reg_width_bytes=4, user_modules_only=False, verilog_muxes=verilog_muxes, 
-                                   verilog_regs=verilog_regs, strip_verilog=strip_verilog)
+generator_code_fingerprint = generator_fingerprint(globals(), {name: header_exporter_code(name) for name in header_exporters})
+build_manifest, register_maps = export_outputs(parsed_configs, submodule_reg_map, cpu_dependencies)
 
 code_folders = get_code_folders(parsed_configs)
 #print(code_folders)
@@ -136,11 +172,13 @@ if args.build:
                                 os.remove(f"{build_folder}/{cpu_name}_registers.h")
                             print(f"Moved generated header: {absolute_path}/{cpu_name}/{cpu_name}_registers.h -> {build_folder}\n")
                             shutil.move(f"{absolute_path}/{cpu_name}/{cpu_name}_registers.h", build_folder)
+                            build_manifest.record_move(f"{absolute_path}/{cpu_name}/{cpu_name}_registers.h", f"{build_folder}/{cpu_name}_registers.h")
                             if zig_header:
                                 if os.path.exists(f"{build_folder}/{cpu_name}_registers.zig"):
                                     os.remove(f"{build_folder}/{cpu_name}_registers.zig")
                                 print(f"Moved generated header: {absolute_path}/{cpu_name}/{cpu_name}_registers.zig -> {build_folder}\n")
                                 shutil.move(f"{absolute_path}/{cpu_name}/{cpu_name}_registers.zig", build_folder)
+                                build_manifest.record_move(f"{absolute_path}/{cpu_name}/{cpu_name}_registers.zig", f"{build_folder}/{cpu_name}_registers.zig")
                     result = subprocess.run(["bash", f"{build_script}", "--code-folder", build_folder], cwd=parent_directory, capture_output=True, text=True)
                     if result.returncode != 0:
                         print(result.stderr)
@@ -150,21 +188,28 @@ if args.build:
                 except FileNotFoundError:
                     raise FileNotFoundError (f"Build folder not found for {cpu_name}: {build_folder}")
 
-                curr_config_dict = {cpu_name: parsed_configs.get(cpu_name)}
-                save_systemverilog_files(curr_config_dict, submodule_reg_map, absolute_path)
-                update_cpu_modules_file(curr_config_dict, absolute_path, reference_file=f"{parent_directory}/{reference_system_file}")
+                # --build rewrites the SystemVerilog files from the built reference, recorded like the other outputs
+                reference_file = f"{parent_directory}/{reference_system_file}"
+                systemverilog_outputs = {
+                    "package": (os.path.join(absolute_path, cpu_name, f"{cpu_name}_package.sv"), list(cpu_dependencies[cpu_name]), {}),
+                    "top": (os.path.join(absolute_path, cpu_name, f"{cpu_name}_fpga_sys_lite.sv"), list(cpu_dependencies[cpu_name]) + [reference_file], {}),
+                }
+                build_manifest.stale_outputs(systemverilog_outputs)
+                curr_register_map = {cpu_name: register_maps[cpu_name]}
+                save_systemverilog_files(curr_register_map, absolute_path)
+                update_cpu_modules_file(curr_register_map, absolute_path, reference_file=reference_file)
+                build_manifest.record([output_path for output_path, _, _ in systemverilog_outputs.values()])
                 subprocess.run(["bash", "-c", "git clean -fdx"], cwd=parent_directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        build_manifest.save()
     else:
         raise FileNotFoundError(f"{go_up_n_levels(current_directory,3)}/{build_script} not found. Are you using the source repo?")
 
-else:
-    if os.path.exists(f"{go_up_n_levels(current_directory,1)}/{reference_system_file}"):
-        if (filtered_dirs):
-            save_systemverilog_files(parsed_configs, submodule_reg_map, absolute_path)
-            update_cpu_modules_file(parsed_configs, absolute_path, reference_file=reference_system_file)
-    else:
-        raise FileNotFoundError(f"{go_up_n_levels(current_directory,1)}/{reference_system_file} not found. Are you using a release build?")
+if args.profile:
+    save_profile_report(absolute_path)
 
+if args.watch:
+    watch_configs(absolute_path, config_file_names, parsed_configs, submodule_reg_map, cpu_dependencies, export_outputs,
+                  extra_paths=[reference_system_path], cache_dir=cache_dir)
 
 #systemverilog_output = generate_systemverilog(parsed_configs)
 #print(systemverilog_output)
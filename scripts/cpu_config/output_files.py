@@ -0,0 +1,58 @@
+import os
+import json
+import contextlib
+import contextvars
+
+outputs_manifest_file_name = "outputs.manifest.json"
+outputs_manifest_version = 1
+
+# {path: content} of the files written while capture_outputs is active in the current thread, None otherwise
+captured_outputs = contextvars.ContextVar("captured_outputs", default=None)
+
+@contextlib.contextmanager
+def capture_outputs():
+    """
+    Collects the files written by write_output_file into the yielded {path: content} dict instead of writing them.
+    The capture only applies to the current thread, so concurrent generator runs in one process do not mix their files.
+    """
+    outputs = {}
+    token = captured_outputs.set(outputs)
+    try:
+        yield outputs
+    finally:
+        captured_outputs.reset(token)
+
+def report_output(message):
+    """Prints a message about a written file, unless the files are being captured."""
+    if captured_outputs.get() is None:
+        print(message)
+
+def write_output_file(path, content):
+    """
+    Writes a generated file unless it already holds exactly this content, so downstream builds keyed on
+    modification times do not see unchanged outputs as new. Returns True if the file was written.
+    Missing folders are created. Inside capture_outputs the content is only recorded.
+    """
+    outputs = captured_outputs.get()
+    if outputs is not None:
+        outputs[path] = content
+        return True
+    try:
+        with open(path, "r") as f:
+            if f.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+def write_outputs_manifest(directory_path, output_digests):
+    """
+    Writes outputs.manifest.json to directory_path: the sha256 of every generated file, keyed by its path relative to
+    directory_path, so downstream tools can check whether their inputs changed without reading the files.
+    """
+    manifest = {"format": outputs_manifest_version, "outputs": dict(sorted(output_digests.items()))}
+    write_output_file(os.path.join(directory_path, outputs_manifest_file_name), json.dumps(manifest, indent=1) + "\n")
@@ -0,0 +1,12 @@
+/*@ModuleMetadataBegin
+Name : SPI
+Description : SPI Master
+Reg0 :
+    Name : Data
+    Permissions : W
+Reg1 :
+    Name : Status
+    Permissions : R
+Reg2 :
+    Name : Config
+@ModuleMetadataEnd*/
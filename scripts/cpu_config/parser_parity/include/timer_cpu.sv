@@ -0,0 +1,21 @@
+/*@ModuleMetadataBegin
+Name : Timer
+Description : Simple timer \
+with two lines
+Reg0 :
+    Name : Control
+    Description : Timer control
+    Permissions : Read/Write
+    Field0 :
+        Name : Enable
+        Description : Enables the timer \
+        second line
+        Bounds : [0:0]
+    Field1 :
+        Name : Mode
+        Bounds : [{ModeWidth}:1]
+Reg1 :
+    Name : Count
+    Permissions : Read
+@ModuleMetadataEnd*/
+module timer_cpu; endmodule
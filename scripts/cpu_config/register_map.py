@@ -0,0 +1,122 @@
+from cpu_config_helpers import sanitize_identifier
+from registers import reorder_tree
+
+class RegisterMapRegister:
+    """
+    One register slot (RegN) of a module. model is its Register (None when the config does not describe it),
+    name falls back to the RegN key and identifier is the sanitized name (computed on first use).
+    """
+    __slots__ = ("index", "key", "address", "model", "name", "description", "permissions", "_identifier")
+
+    def __init__(self, index, address, model):
+        self.index = index
+        self.key = f"Reg{index}"
+        self.address = address
+        self.model = model
+        self.name = self.key
+        self.description = self.permissions = ""
+        if model is not None:
+            self.name = model.name if model.name is not None else self.key
+            self.description = (model.description or "").strip()
+            self.permissions = (model.permissions or "").strip()
+        self._identifier = None
+
+    @property
+    def identifier(self):
+        if self._identifier is None:
+            self._identifier = sanitize_identifier(self.name)
+        return self._identifier
+
+class RegisterMapModule:
+    """
+    A module or submodule as the exporters see it: its typed Module (model), absolute bounds, register counts and
+    metadata, plus its place in the submodule tree. Fields derived from bounds are None without bounds.
+    short_name drops the parent prefix of a submodule, depth is its nesting level (0 for top-level modules).
+    submodule is its submodule_reg_add_map_tuple and position its index in the CPU's tree-ordered submodule list.
+    """
+    __slots__ = ("name", "section", "model", "enabled", "has_bounds", "start", "end", "reg_count", "subregisters",
+                 "identifier", "short_name", "depth", "display_name", "description",
+                 "submodule", "position", "base_reg_exp", "is_base", "children", "_registers")
+
+    def __init__(self, name, section, model, reg_width_bytes):
+        self.name = name
+        self.section = section
+        self.model = model
+        self.enabled = model.enabled
+        self.has_bounds = model.has_bounds
+        self.start = self.end = self.reg_count = None
+        if self.has_bounds:
+            self.start, self.end = model.start, model.end
+            self.reg_count = ((self.end - self.start) // reg_width_bytes) + 1
+        self.subregisters = model.subregisters if model.subregisters is not None else 0
+        self.identifier = name.upper()
+        self.short_name = name
+        self.depth = 0
+        self.display_name = model.display_name
+        self.description = (model.description or "").strip()
+
+        self.submodule = None
+        self.position = None
+        self.base_reg_exp = ""
+        self.is_base = False
+        self.children = []
+        self._registers = {}
+
+    def register(self, index, reg_width_bytes=4):
+        """Returns the RegisterMapRegister for RegN (cached, as several exporters walk the same registers)."""
+        register = self._registers.get(index)
+        if register is None:
+            address = self.start + index * reg_width_bytes if self.has_bounds else None
+            register = self._registers[index] = RegisterMapRegister(index, address, self.model.regs.get(f"Reg{index}"))
+        return register
+
+class RegisterMap:
+    """
+    The flattened register map of one CPU, built once after address assignment and shared by every exporter.
+    sections holds the modules of each section in config order and by_name indexes them as {section: {name: module}}.
+    submodules holds every submodule in tree order (parents before children, siblings in config order).
+    model is the CPU's CpuConfig.
+    """
+    __slots__ = ("cpu_name", "model", "sections", "by_name", "submodules", "submodule_tuples", "separator")
+
+    def modules(self, section):
+        return self.sections.get(section, [])
+
+def build_register_map(cpu_name, cpu_config, submodules, reg_width_bytes=4):
+    """Builds the RegisterMap of one CPU from its CpuConfig and its tree-ordered submodule_reg_add_map_tuples."""
+    register_map = RegisterMap()
+    register_map.cpu_name = cpu_name
+    register_map.model = cpu_config
+    register_map.sections = {}
+    register_map.by_name = {}
+    for section, section_modules in cpu_config.sections.items():
+        if section not in ["BUILTIN_MODULES", "USER_MODULES"]:
+            continue
+        entries = register_map.sections[section] = []
+        index = register_map.by_name.setdefault(section, {})
+        for name, model in section_modules.items():
+            module = RegisterMapModule(name, section, model, reg_width_bytes)
+            entries.append(module)
+            index[name] = module
+
+    register_map.submodule_tuples = submodules
+    register_map.separator = submodules[0].separator if submodules else None
+    register_map.submodules = []
+    for position, submodule in enumerate(submodules):
+        section = register_map.by_name[submodule.section]
+        module = section[submodule.module_name]
+        module.submodule = submodule
+        module.position = position
+        module.base_reg_exp = submodule.base_reg_exp
+        module.short_name = str(submodule.module_name.split(submodule.separator)[-1])
+        module.depth = submodule.module_name.count(submodule.separator)
+        section[submodule.module_parent].children.append(module)
+        section[submodule.base_module].is_base = True
+        register_map.submodules.append(module)
+    return register_map
+
+def build_register_maps(parsed_configs, submodule_reg_map, reg_width_bytes=4):
+    """Returns {cpu_name: RegisterMap} for {cpu_name: CpuConfig} after assign_auto_addresses."""
+    ordered_submodules = reorder_tree({cpu_name: submodule_reg_map.get(cpu_name, []) for cpu_name in parsed_configs})
+    return {cpu_name: build_register_map(cpu_name, cpu_config, ordered_submodules[cpu_name], reg_width_bytes)
+            for cpu_name, cpu_config in parsed_configs.items()}
@@ -0,0 +1,215 @@
+import sys
+
+def intern_name(text):
+    """Interns names that repeat across modules (register keys, permissions, repeat sources) so they are stored once."""
+    return sys.intern(text) if isinstance(text, str) else text
+
+class Parameter:
+    """A BUILTIN/USER parameter (resolved to an int) or a CONFIG_PARAMETERS entry (kept as text)."""
+    __slots__ = ("name", "value", "bit_width")
+
+    def __init__(self, name, value, bit_width=None):
+        self.name = name
+        self.value = value
+        self.bit_width = bit_width
+
+class Field:
+    """A register bit field. name and description are None when the config does not give them."""
+    __slots__ = ("key", "name", "description", "upper", "lower")
+
+    def __init__(self, key, name, description, upper, lower):
+        self.key = key
+        self.name = name
+        self.description = description
+        self.upper = upper
+        self.lower = lower
+
+class Register:
+    """An explicitly described register (RegN entry). name, description and permissions are None when not given."""
+    __slots__ = ("key", "name", "description", "permissions", "fields")
+
+    def __init__(self, key, name=None, description=None, permissions=None, fields=None):
+        self.key = key
+        self.name = name
+        self.description = description
+        self.permissions = permissions
+        self.fields = fields if fields is not None else {}
+
+class Module:
+    """
+    A module or submodule entry. name is the full '____' qualified name; start/end are the byte bounds once known.
+    register_count is None once the allocator has consumed it, subregisters is None for modules outside a SUBMODULE tree.
+    repeat_count, repeat_of and repeat_expand_regs are None for modules without Repeat information.
+    include_file is the file its Module_Include metadata was read from, None for modules without one.
+    """
+    __slots__ = ("name", "enabled", "auto", "start", "end", "register_count", "subregisters", "submodule_of",
+                 "display_name", "description", "module_filepath", "include_file", "expand_regs",
+                 "repeat_instance", "repeat_count", "repeat_of", "repeat_expand_regs", "regs")
+
+    def __init__(self, name, enabled):
+        self.name = name
+        self.enabled = enabled
+        self.auto = False
+        self.start = None
+        self.end = None
+        self.register_count = None
+        self.subregisters = None
+        self.submodule_of = None
+        self.display_name = None
+        self.description = None
+        self.module_filepath = None
+        self.include_file = None
+        self.expand_regs = False
+        self.repeat_instance = False
+        self.repeat_count = None
+        self.repeat_of = None
+        self.repeat_expand_regs = None
+        self.regs = {}
+
+    @property
+    def has_bounds(self):
+        return self.start is not None and self.end is not None
+
+class CpuConfig:
+    """
+    The resolved configuration of one CPU: {section: {name: Parameter or Module}} in config order,
+    plus the BaseAddress given on any section line.
+    """
+    __slots__ = ("sections", "base_addresses")
+
+    def __init__(self):
+        self.sections = {}
+        self.base_addresses = {}
+
+    def modules(self, section):
+        return self.sections.get(section, {})
+
+def optional_text(value):
+    """The parser uses {} for Field name/description that were not given."""
+    return intern_name(value) if isinstance(value, str) else None
+
+def register_from_dict(key, register_data):
+    fields = {}
+    for field_key, field_data in register_data.get("fields", {}).items():
+        upper, lower = field_data["bounds"]
+        fields[intern_name(field_key)] = Field(intern_name(field_key), optional_text(field_data.get("name")),
+                                               optional_text(field_data.get("description")), upper, lower)
+    return Register(intern_name(key), register_data.get("name"), register_data.get("description"),
+                    intern_name(register_data.get("permissions")), fields)
+
+def module_from_dict(name, module_data, register_trees):
+    """register_trees maps id(regs dict) -> converted regs so Repeat instances keep sharing one register tree."""
+    module = Module(name, module_data.get("flag") == "TRUE")
+    module.auto = module_data.get("auto", False)
+    bounds = module_data.get("bounds")
+    if bounds:
+        module.start, module.end = bounds[0], bounds[1]
+    module.register_count = module_data.get("registers")
+    module.subregisters = module_data.get("subregisters")
+    module.submodule_of = module_data.get("submodule_of")
+
+    metadata = module_data.get("metadata", {})
+    module.display_name = metadata.get("name")
+    module.description = metadata.get("description")
+    module.module_filepath = metadata.get("module_filepath")
+    module.include_file = module_data.get("include_file") or None
+    module.expand_regs = metadata.get("expand_regs") == "TRUE"
+    module.repeat_instance = metadata.get("repeat_instance") == "TRUE"
+
+    if "repeat" in module_data:
+        repeat = module_data["repeat"]
+        module.repeat_count = repeat.get("value")
+        module.repeat_of = intern_name(repeat.get("repeat_of"))
+        module.repeat_expand_regs = repeat.get("expand_regs") == "TRUE"
+
+    regs = module_data.get("regs", {})
+    if id(regs) not in register_trees:
+        register_trees[id(regs)] = {intern_name(key): register_from_dict(key, register_data) for key, register_data in regs.items()}
+    module.regs = register_trees[id(regs)]
+    return module
+
+def cpu_config_from_dict(config_data):
+    """Builds the typed CpuConfig from a resolved config dictionary (as returned by parse_config)."""
+    cpu_config = CpuConfig()
+    register_trees = {}
+    for section, section_data in config_data.items():
+        entries = {}
+        for name, data in section_data.items():
+            if name == "BaseAddress" and not isinstance(data, dict):
+                cpu_config.base_addresses[section] = data
+            elif section in ["BUILTIN_MODULES", "USER_MODULES"]:
+                entries[name] = module_from_dict(name, data, register_trees)
+            else:
+                entries[name] = Parameter(name, data.get("value"), data.get("bit_width"))
+        cpu_config.sections[section] = entries
+    return cpu_config
+
+def register_to_dict(register):
+    register_data = {}
+    for key, value in [("name", register.name), ("description", register.description), ("permissions", register.permissions)]:
+        if value is not None:
+            register_data[key] = value
+    if register.fields:
+        register_data["fields"] = {
+            field.key: {"name": field.name if field.name is not None else {}, "bounds": [field.upper, field.lower],
+                        "description": field.description if field.description is not None else {}}
+            for field in register.fields.values()
+        }
+    return register_data
+
+def module_to_dict(module, register_trees):
+    module_data = {"flag": "TRUE" if module.enabled else "FALSE"}
+    if module.has_bounds:
+        module_data["bounds"] = [module.start, module.end]
+    if module.auto:
+        module_data["auto"] = True
+    if module.register_count is not None:
+        module_data["registers"] = module.register_count
+    if module.subregisters is not None:
+        module_data["subregisters"] = module.subregisters
+
+    metadata = {"expand_regs": "TRUE" if module.expand_regs else "FALSE"}
+    for key, value in [("name", module.display_name), ("description", module.description), ("module_filepath", module.module_filepath)]:
+        if value is not None:
+            metadata[key] = value
+    if module.repeat_instance:
+        metadata["repeat_instance"] = "TRUE"
+    module_data["metadata"] = metadata
+
+    if id(module.regs) not in register_trees:
+        register_trees[id(module.regs)] = {key: register_to_dict(register) for key, register in module.regs.items()}
+    module_data["regs"] = register_trees[id(module.regs)]
+    module_data["include_file"] = module.include_file if module.include_file is not None else {}
+
+    if module.repeat_expand_regs is not None:
+        repeat = {}
+        if module.repeat_count is not None:
+            repeat["value"] = module.repeat_count
+        repeat["expand_regs"] = "TRUE" if module.repeat_expand_regs else "FALSE"
+        if module.repeat_of is not None:
+            repeat["repeat_of"] = module.repeat_of
+        module_data["repeat"] = repeat
+    if module.submodule_of is not None:
+        module_data["submodule_of"] = module.submodule_of
+    return module_data
+
+def cpu_config_to_dict(cpu_config):
+    """
+    Compatibility adapter: renders a CpuConfig in the nested dictionary shape the parser produces,
+    for code that has not moved to the typed model yet. Placeholder {} flags come back as 'FALSE'.
+    """
+    config_data = {}
+    register_trees = {}
+    for section, entries in cpu_config.sections.items():
+        section_data = {}
+        for name, entry in entries.items():
+            if isinstance(entry, Module):
+                section_data[name] = module_to_dict(entry, register_trees)
+            else:
+                section_data[name] = {"value": entry.value}
+                if entry.bit_width:
+                    section_data[name]["bit_width"] = entry.bit_width
+        if section in cpu_config.base_addresses:
+            section_data["BaseAddress"] = cpu_config.base_addresses[section]
+        config_data[section] = section_data
+    return config_data
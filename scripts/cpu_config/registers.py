@@ -1,57 +1,15 @@
-import re
+from sv_expression import compile_expression
+from output_files import write_output_file, report_output
+from address_allocator import AddressIntervals, allocation_options, allocation_option, align_up, natural_size, decode_block
 
 def resolve_expression(expr, parameter_table=None):
-    expr = str(expr).strip()
-
-    # Convert SystemVerilog-style literals (e.g. 16'h4000, 8'd255, 32'b101010)
-    def sv_number_to_python(match):
-        raw = match.group(0)
-        try:
-            if "'" in raw:
-                _, radix_value = raw.split("'")
-                radix = radix_value[0].lower()
-                value = radix_value[1:].replace("_", "")  # Remove underscores
-                if radix == 'h':
-                    return str(int(value, 16))
-                elif radix == 'd':
-                    return str(int(value, 10))
-                elif radix == 'b':
-                    return str(int(value, 2))
-                elif radix == 'o':
-                    return str(int(value, 8))
-        except Exception:
-            raise ValueError(f"Could not parse SV literal: {raw}")
-        return raw  # fallback
-
-    # Replace SV literals before parameter substitution
-    expr = re.sub(r"\d*'[hdbonHDBON][0-9a-fA-F_]+", sv_number_to_python, expr)
-
-    def python_literal_to_int(match):
-        raw = match.group(0)
-        try:
-            return str(int(raw, 0))  # Python auto-detects 0x / 0b / 0o / decimal
-        except Exception:
-            raise ValueError(f"Could not parse numeric literal: {raw}")
-
-    # Regex: match 0x..., 0b..., 0o..., or plain decimal numbers
-    expr = re.sub(r"\b(0[xX][0-9a-fA-F_]+|0[bB][01_]+|0[oO][0-7_]+|\d+)\b", python_literal_to_int, expr)
-
-    # Replace parameters using token-aware substitution
-    if parameter_table:
-        # Longer names first to prevent partial collisions
-        for param in sorted(parameter_table.keys(), key=lambda p: -len(p)):
-            val = str(parameter_table[param])
-            expr = re.sub(rf"\b{re.escape(param)}\b", val, expr)
-
-    if re.search(r"[a-zA-Z_]\w*", expr):
-        return None  # Still contains unresolved variables
-
-    # Evaluate arithmetic expression
-    try:
-        result = eval(expr, {"__builtins__": None}, {})
-        return result
-    except Exception:
-        raise ValueError(f"Could not evaluate expression: {expr}")
+    """
+    Evaluates a SystemVerilog-style expression ('h/'d/'b/'o and 0x/0b/0o literals, arithmetic, shifts and $clog2)
+    against parameter_table. Returns None if it still references a parameter that is not in the table.
+    """
+    if type(expr) is int:
+        return expr
+    return compile_expression(str(expr).strip())(parameter_table)
 
 def reorder_tree(data):
         """
@@ -99,173 +57,292 @@ def reorder_tree(data):
         return result
 
 def build_parameter_table(cpu_config):
-    for _ in cpu_config.items():
-        parameter_table = {}
-
-        # Flatten all parameters
-        all_parameters = {}
-        for param_section in ["BUILTIN_PARAMETERS", "USER_PARAMETERS"]:
-            all_parameters.update(cpu_config.get(param_section, {}))
-
-        unresolved = {name: data.get("value") for name, data in all_parameters.items()}
-        max_attempts = len(unresolved)
-
-        for attempt in range(max_attempts):
-            progress_made = False
-            for name, val in list(unresolved.items()):
+    """
+    Resolves every BUILTIN/USER parameter to an int and returns {name: value}.
+    Parameters are evaluated in dependency order, so each expression is evaluated exactly once.
+    """
+    # Flatten all parameters
+    all_parameters = {}
+    for param_section in ["BUILTIN_PARAMETERS", "USER_PARAMETERS"]:
+        all_parameters.update(cpu_config.get(param_section, {}))
+    expressions = {name: data.get("value") for name, data in all_parameters.items()}
+
+    parameter_table = {}
+    visiting = {} # Parameters on the current dependency path, in order
+    for root in expressions:
+        # Iterative depth-first walk so long parameter chains cannot hit the recursion limit
+        stack = [(root, None)]
+        while stack:
+            name, dependencies = stack.pop()
+            if name in parameter_table:
+                continue
+            val = expressions[name]
+            if dependencies is None:
+                if name in visiting:
+                    path = list(visiting)
+                    chain = path[path.index(name):] + [name]
+                    raise RuntimeError(f"Circular parameter reference: {' -> '.join(chain)}")
+                if type(val) is int:
+                    parameter_table[name] = val
+                    continue
                 try:
-                    result = resolve_expression(val, parameter_table)
-                    if result is not None:
-                        resolved_value = int(result)
-                        parameter_table[name] = resolved_value
-                        unresolved.pop(name)
-                        #print(f"[PASS {attempt+1}] Resolved {name} = {resolved_value}")
-                        progress_made = True
+                    dependencies = compile_expression(str(val).strip()).names
                 except Exception as e:
                     raise RuntimeError(f"Failed to resolve '{name}': {e}") from e
+                for dependency in dependencies:
+                    if dependency not in expressions:
+                        raise RuntimeError(f"Unresolved: {name} = {val} ('{dependency}' is not a parameter)")
+                visiting[name] = True
+                stack.append((name, dependencies))
+                stack.extend((dependency, None) for dependency in sorted(dependencies, reverse=True) if dependency not in parameter_table)
+                continue
 
-            if not progress_made:
-                #print(f"[INFO] No progress made on pass {attempt+1}")
-                break
+            # Every dependency is resolved now
+            visiting.popitem()
+            try:
+                parameter_table[name] = int(resolve_expression(val, parameter_table))
+            except Exception as e:
+                raise RuntimeError(f"Failed to resolve '{name}': {e}") from e
 
-        for name, val in unresolved.items():
-            raise RuntimeError(f"Unresolved: {name} = {val}")
-            
     return parameter_table
 
-def assign_auto_addresses(parsed_configs, submodule_reg_map, alignment=4, reg_width_bytes=4):
+def place_natural_submodules(cpu_config, submodules, spans, alignment=4):
+    """
+    NATURAL strategy: places each submodule (in tree order) after its parent's registers and earlier siblings,
+    on a boundary of its own power-of-two size. Parents are placed before their children, so their bounds are known.
+    """
+    cursors = {} # Next free byte inside each parent
+    for submodule in submodules:
+        section = cpu_config.modules(submodule.section)
+        parent_name = submodule.module_parent
+        if parent_name not in cursors:
+            parent = section[parent_name]
+            cursors[parent_name] = parent.start + alignment*((parent.end - parent.start)//alignment + 1 - parent.subregisters)
+        span = spans[submodule.module_name]
+        block_size = natural_size(span)
+        start_addr = align_up(cursors[parent_name], block_size) if block_size else cursors[parent_name]
+        cursors[parent_name] = start_addr + block_size
+        module = section[submodule.module_name]
+        module.start, module.end = start_addr, start_addr + span - alignment
+        if module.subregisters is not None:
+            module.subregisters = span // alignment - submodule.register_count
+
+def natural_span(own_count, children, spans, alignment=4):
+    """
+    Bytes used by a module laid out for NATURAL allocation: its own registers, then each child (in config order)
+    on a boundary of the child's own power-of-two size. Each child reserves its whole block so it can be decoded by mask.
+    """
+    cursor = own_count * alignment
+    span = cursor
+    for child in children:
+        child_span = spans[child.module_name]
+        block = natural_size(child_span)
+        if block:
+            cursor = align_up(cursor, block)
+        span = max(span, cursor + child_span)
+        cursor += block
+    return span
+
+def allocation_usage(section_usage, global_mask):
+    """
+    Returns {section: usage} for every section with reserved addresses. usage has the address range ("low", "high"),
+    the bytes of registers ("used") and of reserved blocks ("reserved"), "utilization" of the range in percent,
+    the "largest_hole" and the "fragmentation" in percent (the share of free space outside the largest hole).
+    section_usage is {section: [register bytes, reserved bytes, lowest address, highest reserved address]}.
+    """
+    usage = {}
+    for section, (used, reserved, low, high) in section_usage.items():
+        if not reserved:
+            continue
+        holes = [size for _, size in global_mask.free_holes(low, high)]
+        free = sum(holes)
+        largest_hole = max(holes, default=0)
+        usage[section] = {"low": low, "high": high, "used": used, "reserved": reserved, "utilization": 100*used/(high - low + 4),
+                          "largest_hole": largest_hole, "fragmentation": 100 * (1 - largest_hole / free) if free else 0.0}
+    return usage
+
+def print_allocation_report(cpu_name, options, usage, address_width=None):
+    """
+    Prints how well each section is packed (see allocation_usage): its address range, utilization, largest free hole and
+    fragmentation, plus the unused part of NATURAL decode blocks.
+    """
+    print(f"Address allocation report for {cpu_name} ({', '.join(options)}):")
+    for section, section_usage in usage.items():
+        used, reserved, low, high = (section_usage[key] for key in ["used", "reserved", "low", "high"])
+        print(f"    {section}: 0x{low:X}-0x{high:X}, 0x{used:X} bytes of registers ({section_usage['utilization']:.1f}% utilization), "
+              f"largest free hole 0x{section_usage['largest_hole']:X} bytes, {section_usage['fragmentation']:.1f}% fragmentation")
+        if reserved > used:
+            print(f"        0x{reserved - used:X} bytes ({100*(reserved - used)/reserved:.1f}%) of the decode blocks are unused")
+        if address_width is not None and high >= 1 << address_width:
+            print(f"    Warning: {section} ends at 0x{high:X}, beyond the {address_width} bit address_width")
+
+def assign_auto_addresses(parsed_configs, submodule_reg_map, alignment=4, reg_width_bytes=4, usage_report=None):
     """
     Assigns memory addresses to modules with 'auto': True using BaseAddress and overlap avoidance.
-    Handles symbolic expressions and scans forward from BaseAddress using proper masking.
+    Handles symbolic expressions and places each module at the first free address from BaseAddress (see AddressIntervals).
+    With Address_Allocation : NATURAL in CONFIG_PARAMETERS, every AUTO module and submodule is placed on a boundary of
+    its own power-of-two size instead, so it can be decoded with a mask (see decode_mask_match).
+    With Address_Packing : BEST_FIT, the largest modules are placed first, each into the smallest hole it fits in.
+    A report on the packing is printed when either option is set.
+    If a usage_report dict is given it is filled with {cpu_name: allocation_usage} for every CPU.
     """
 
-    def find_free_address(used_ranges, needed_size, start_from=0x0000):
-        used_sorted = sorted(used_ranges, key=lambda r: r[0])
-        addr = (start_from + alignment - 1) & ~(alignment - 1)
+    submodule_reg_map = reorder_tree(submodule_reg_map)
 
-        for start, end in used_sorted:
-            end_addr = addr + needed_size - 1
-            if end_addr < start:
-                return addr
-            if addr <= end:
-                addr = (end + 1 + alignment - 1) & ~(alignment - 1)
-        return addr
+    options = {}
+    natural_spans = {}
+    natural_children = {}
+    for cpu_name, cpu_config in parsed_configs.items():
+        config_parameters = cpu_config.sections.get("CONFIG_PARAMETERS", {})
+        options[cpu_name] = [allocation_option(name, config_parameters[name].value if name in config_parameters else None)
+                             for name in allocation_options]
+        if options[cpu_name][0] == "NATURAL":
+            # Children come after their parent in tree order, so a reversed walk sizes every child before its parent
+            children = natural_children[cpu_name] = {}
+            for submodule in submodule_reg_map.get(cpu_name, []):
+                children.setdefault(submodule.module_parent, []).append(submodule)
+            spans = natural_spans[cpu_name] = {}
+            for submodule in reversed(submodule_reg_map.get(cpu_name, [])):
+                spans[submodule.module_name] = natural_span(submodule.register_count, children.get(submodule.module_name, []), spans, alignment)
 
-    for _, cpu_config in parsed_configs.items():
+    for cpu_name, cpu_config in parsed_configs.items():
+
+        allocation, packing = options[cpu_name]
+        natural = allocation == "NATURAL"
+        section_usage = {}
+        global_mask = AddressIntervals(alignment)  # Tracks all used address ranges globally
 
-        global_mask = []  # Tracks all used address ranges globally
+        def track_usage(usage, used_bytes, start, end):
+            usage[0] += used_bytes
+            usage[1] += end - start + alignment
+            usage[2] = start if usage[2] is None else min(usage[2], start)
+            usage[3] = end if usage[3] is None else max(usage[3], end)
 
         # Step 2: Process sections independently
         for section_name in ["BUILTIN_MODULES", "USER_MODULES"]:
-            section = cpu_config.get(section_name, {})
-            if not isinstance(section, dict):
-                continue
+            section = cpu_config.modules(section_name)
+            usage = section_usage[section_name] = [0, 0, None, None]
 
             # Step 3: Resolve section BaseAddress
-            base_expr = section.get("BaseAddress")
+            base_expr = cpu_config.base_addresses.get(section_name)
             try:
                 section_ptr = (base_expr if base_expr else 0x0000)
                 section_ptr = (section_ptr + alignment - 1) & ~(alignment - 1)
             except Exception:
                 raise RuntimeError(f"Could not resolve BaseAddress for {section_name}")
 
-            # Step 4: Build local address mask for this section
-            def overlaps(new_range, existing_ranges):
-                s, e = new_range
-                return any(not (e < xs or s > xe) for xs, xe in existing_ranges)
-            local_mask = []
+            # Step 4: Add the fixed address ranges of this section
             for mod_name, mod in section.items():
-                if mod_name == "BaseAddress" or not isinstance(mod, dict):
-                    continue
-                if "submodule_of" in mod:
+                if mod.submodule_of is not None:
                     continue
 
-                bounds = mod.get("bounds")
-                enabled = mod.get("flag")
-                if bounds and isinstance(bounds, list) and len(bounds) == 2:
+                if mod.has_bounds:
                     try:
-                        start = bounds[0]
-                        end = bounds[1]
+                        start = mod.start
+                        end = mod.end
                         if start % alignment != 0 or end % alignment != 0:
                             raise ValueError(f"Invalid Address Range for {mod_name}: [{start}:{end}]. Expects {alignment} byte alignment.")
-                        if start is not None and end is not None:
-                            if enabled == "TRUE":
-                                if overlaps((start, end), global_mask):
-                                    print(f"Warning: {mod_name} bounds {start:#04X}-{end:#04X} overlap with existing ranges")
-                                local_mask.append((start, end))
-                                global_mask.append((start, end)) 
-                        else:
-                            raise RuntimeWarning(f"Skipping unresolved bounds for {mod_name}: {bounds}")
+                        if end < start:
+                            raise ValueError(f"Invalid Address Range for {mod_name}: [{start}:{end}]. End is below start.")
+                        if mod.enabled:
+                            used_bytes = end - start + reg_width_bytes
+                            if natural:
+                                # Reserve the whole block the module's decode mask selects
+                                start, block_size = decode_block(start, end + reg_width_bytes)
+                                end = start + block_size - alignment
+                            if global_mask.overlaps(start, end):
+                                print(f"Warning: {mod_name} bounds {start:#04X}-{end:#04X} overlap with existing ranges")
+                            global_mask.add(start, end)
+                            track_usage(usage, used_bytes, start, end)
                     except Exception:
-                        raise RuntimeError(f"Could not resolve bounds for {mod_name}: {bounds}")
+                        raise RuntimeError(f"Could not resolve bounds for {mod_name}: {[mod.start, mod.end]}")
 
-            # Step 5: Assign auto modules
+            # Step 5: Size the auto modules
+            auto_modules = []
             for mod_name, mod in section.items():
-                if mod_name == "BaseAddress" or not isinstance(mod, dict):
-                    continue
-
-                if "submodule_of" in mod:
+                if mod.submodule_of is not None:
                     continue
 
-                if mod.get("flag") == "TRUE" and mod.get("auto", False):
-                    raw_reg_count = mod.pop("registers", 0)
-                    try:
-                        reg_count = raw_reg_count
-                    except Exception:
-                        raise RuntimeError(f"Failed to resolve register count for {mod_name}")
-
-                    mod.pop("auto", None)
+                if mod.enabled and mod.auto:
+                    reg_count = mod.register_count if mod.register_count is not None else 0
+                    mod.register_count = None
+                    mod.auto = False
                     if reg_count < 1:
                         raise ValueError(f"Invalid register count for {mod_name}")
 
-                    needed_size = reg_count * reg_width_bytes
-                    start_addr = find_free_address(global_mask + local_mask, needed_size, section_ptr)
-                    end_addr = start_addr + (reg_count - 1) * reg_width_bytes
-
-                    mod["bounds"] = [start_addr, end_addr]
-
-                    #print(f"\n[DEBUG] Attempting to assign '{mod_name}'")
-                    #print(f"[DEBUG] Raw registers: {raw_reg_count}")
-                    #print(f"[DEBUG] Resolved register count: {reg_count}")
-                    #print(f"[DEBUG] Needed size: {needed_size}")
-                    #print(f"[DEBUG] Starting from section BaseAddress: 0x{section_ptr:X}")
-                    #print(f"[DEBUG] Global mask: {[f'{s:#06X}-{e:#06X}' for s, e in global_mask]}")
-                    #print(f"[DEBUG] Local mask: {[f'{s:#06X}-{e:#06X}' for s, e in local_mask]}")
-
-                    # Track new range
-                    local_mask.append((start_addr, end_addr))
-                    global_mask.append((start_addr, end_addr))
-                    #section_ptr = end_addr + 1
-                    #print(f"[DEBUG] Assigned bounds for '{mod_name}': {mod['bounds']}")
-
-            # Step 6: Clean up BaseAddress
-            section.pop("BaseAddress", None)
-
-    submodule_reg_map = reorder_tree(submodule_reg_map)
-
-    submodule_mask = []
+                    span = reg_count * reg_width_bytes
+                    needed_size = span
+                    if natural:
+                        # The module (with its submodule tree) gets a naturally aligned power-of-two block to itself
+                        if mod_name in natural_children[cpu_name]:
+                            own_count = reg_count - mod.subregisters
+                            span = natural_span(own_count, natural_children[cpu_name][mod_name], natural_spans[cpu_name], alignment)
+                            mod.subregisters = span // alignment - own_count
+                        needed_size = natural_size(span)
+                    auto_modules.append((mod_name, mod, reg_count, span, needed_size))
+
+            # Step 6: Assign auto modules. A submodule tree is placed as one block, its submodules are laid out further below
+            place = global_mask.first_fit
+            if packing == "BEST_FIT":
+                auto_modules.sort(key=lambda entry: -entry[4]) # Largest first, config order among equal sizes
+                place = global_mask.best_fit
+            for mod_name, mod, reg_count, span, needed_size in auto_modules:
+                start_addr = place(needed_size, section_ptr, max(alignment, needed_size) if natural else alignment)
+                end_addr = start_addr + span - reg_width_bytes
+
+                mod.start, mod.end = start_addr, end_addr
+
+                #print(f"\n[DEBUG] Attempting to assign '{mod_name}'")
+                #print(f"[DEBUG] Resolved register count: {reg_count}")
+                #print(f"[DEBUG] Needed size: {needed_size}")
+                #print(f"[DEBUG] Starting from section BaseAddress: 0x{section_ptr:X}")
+                #print(f"[DEBUG] Global mask: {[f'{s:#06X}-{e:#06X}' for s, e in zip(global_mask.starts, global_mask.ends)]}")
+
+                # Track new range
+                global_mask.add(start_addr, start_addr + needed_size - alignment)
+                track_usage(usage, reg_count * reg_width_bytes, start_addr, start_addr + needed_size - alignment)
+                #print(f"[DEBUG] Assigned bounds for '{mod_name}': {[mod.start, mod.end]}")
+
+            # Step 7: Clean up BaseAddress
+            cpu_config.base_addresses.pop(section_name, None)
+
+        cpu_usage = allocation_usage(section_usage, global_mask)
+        if usage_report is not None:
+            usage_report[cpu_name] = cpu_usage
+        if [allocation, packing] != [default_options[0] for default_options in allocation_options.values()]:
+            address_width = cpu_config.sections.get("BUILTIN_PARAMETERS", {}).get("address_width")
+            print_allocation_report(cpu_name, options[cpu_name], cpu_usage, address_width.value if address_width else None)
+
+    submodule_mask = AddressIntervals(alignment)
     current_base_module_start_addr = 0
     current_base_module_end_addr = 0
     current_base_module = ""
     current_base_module_subregister_count = 0
     for cpu, data in submodule_reg_map.items():
+        current_base_module = "" # Each CPU starts its own submodule placement
+        if cpu in natural_spans:
+            place_natural_submodules(parsed_configs[cpu], data, natural_spans[cpu], alignment)
+            continue
         for submodule in data:
+            section = parsed_configs[cpu].modules(submodule.section)
             if current_base_module != submodule.base_module:
                 current_base_module = submodule.base_module
-                submodule_mask = []
-                current_base_module_start_addr = parsed_configs[cpu][submodule.section][submodule.base_module]["bounds"][0]
-                current_base_module_end_addr = parsed_configs[cpu][submodule.section][submodule.base_module]["bounds"][1]
-                current_base_module_subregister_count = parsed_configs[cpu][submodule.section][submodule.base_module]["subregisters"]
+                submodule_mask = AddressIntervals(alignment)
+                base_module = section[submodule.base_module]
+                current_base_module_start_addr = base_module.start
+                current_base_module_end_addr = base_module.end
+                current_base_module_subregister_count = base_module.subregisters
                 current_base_module_start_addr += 4*(int((current_base_module_end_addr-current_base_module_start_addr)//alignment + 1) - (current_base_module_subregister_count))
 
-            start_addr = find_free_address(submodule_mask, max(1, submodule.register_count)*alignment, current_base_module_start_addr)
+            start_addr = submodule_mask.first_fit(max(1, submodule.register_count)*alignment, current_base_module_start_addr, alignment)
             end_addr = start_addr + (submodule.register_count-1)*alignment
-            submodule_mask.append((start_addr, end_addr))
-            if "subregisters" in parsed_configs[cpu][submodule.section][submodule.module_name]:
-                end_addr += parsed_configs[cpu][submodule.section][submodule.module_name]["subregisters"]*alignment
-            parsed_configs[cpu][submodule.section][submodule.module_name]["bounds"] = [start_addr, end_addr]
+            submodule_mask.add(start_addr, end_addr)
+            module = section[submodule.module_name]
+            if module.subregisters is not None:
+                end_addr += module.subregisters*alignment
+            module.start, module.end = start_addr, end_addr
 
-def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path, file_name="cpu_registers.txt", print_to_console=True, save_to_file=False, reg_width_bytes=4, user_modules_only=False):
+def dump_all_registers_from_configs(register_maps, file_path, file_name="cpu_registers.txt", print_to_console=True, save_to_file=False, reg_width_bytes=4, user_modules_only=False):
     """
     Resolves symbolic expressions and dumps register addresses with metadata for all CPUs.
     ASCII-only output with clean indentation and structured formatting.
@@ -274,46 +351,35 @@ def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path
     lines.append("Register Address Map")
     lines.append("====================")
 
-    for cpu_name, cpu_config in parsed_configs.items():
+    for cpu_name, register_map in register_maps.items():
         lines.append("")
         lines.append(f"Instance: {cpu_name}")
 
         section_list = ["USER_MODULES"] if user_modules_only else ["BUILTIN_MODULES", "USER_MODULES"]
 
         for section in section_list:
-            if cpu_config.get(section, {}).items(): # Dont print USER_MODULES section if none are present
+            if register_map.modules(section): # Dont print USER_MODULES section if none are present
                 lines.append("")
                 lines.append(f"    Section: {section}")
 
-            for module_name, module in cpu_config.get(section, {}).items():
+            for module_entry in register_map.modules(section):
+                module_name, module = module_entry.name, module_entry.model
                 module_name_orig = module_name
-                if module_name == "BaseAddress" or not isinstance(module, dict):
-                    continue
-                if module.get("flag") != "TRUE":
+                if not module.enabled:
                     continue
-                if "bounds" not in module:
+                if not module.has_bounds:
                     lines.append(f"    Warning: {module_name} missing bounds")
                     continue
 
-                try:
-                    start_addr = module["bounds"][0]
-                    end_addr = module["bounds"][1]
-                    if "subregisters" in module:
-                        subregisters = module["subregisters"]
-                    else:
-                        subregisters = 0
-                except Exception as e:
-                    lines.append(f"    Error in {module_name}: {e}")
-                    continue
+                start_addr = module.start
+                end_addr = module.end
+                subregisters = module.subregisters if module.subregisters is not None else 0
 
                 reg_count = ((end_addr - start_addr) // reg_width_bytes) + 1
-                if "submodule_of" in module:
-                    for submodule in submodule_reg_map.get(cpu_name):
-                        if submodule.module_name == module_name:
-                            submodule_indent = "    " * submodule.module_name.count(submodule.separator)
-                            module_name = str(module_name.split(submodule.separator)[-1])
-                            base_module_reg_expand = submodule.base_reg_exp
-                            break
+                if module.submodule_of is not None:
+                    submodule_indent = "    " * module_entry.depth
+                    module_name = module_entry.short_name
+                    base_module_reg_expand = module_entry.base_reg_exp
                 else:
                     submodule_indent = ""
                     base_module_reg_expand = ""
@@ -322,13 +388,12 @@ def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path
                     continue
                     
                 # Module metadata
-                mod_meta = module.get("metadata", {})
-                mod_name_str = mod_meta.get("name", module_name)
-                mod_desc_str = mod_meta.get("description", "")
-                mod_reg_expand_str = mod_meta.get("expand_regs", '')
-                mod_repeat_inst = mod_meta.get("repeat_instance", {})
-                mod_repeat_info = module.get("repeat", {"value": {}, "expand_regs": {}, "repeat_of": {}})
-                mod_repeat_str = f" - Repeat Instance of {mod_repeat_info['repeat_of']}" if mod_repeat_inst else ""
+                mod_name_str = module.display_name if module.display_name is not None else module_name
+                mod_desc_str = module.description or ""
+                mod_repeat_inst = module.repeat_instance
+                # Registers are listed unless NOEXPREGS applies to the module or to the Repeat it is an instance of
+                mod_regs_listed = not module.expand_regs and module.repeat_expand_regs is False
+                mod_repeat_str = f" - Repeat Instance of {module.repeat_of}" if mod_repeat_inst else ""
 
                 lines.append("")
                 if submodule_indent:
@@ -336,9 +401,9 @@ def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path
                 else:
                     lines.append(f"{submodule_indent}        -> Module: {mod_name_str} ({module_name}){mod_repeat_str}")
                 lines.append(f"{submodule_indent}            - Bounds: 0x{start_addr:04X} ({start_addr:0d}) to 0x{end_addr:04X} ({end_addr:0d})")
-                if mod_repeat_inst != 'TRUE' or (mod_repeat_info["expand_regs"] == 'FALSE' and mod_reg_expand_str == 'FALSE'):
+                if not mod_repeat_inst or mod_regs_listed:
                     lines.append(f"{submodule_indent}            - Register Count: {reg_count}")
-                if (mod_desc_str and not mod_repeat_inst) or (mod_repeat_info["expand_regs"] == 'FALSE' and mod_reg_expand_str == 'FALSE' and mod_repeat_inst):
+                if (mod_desc_str and not mod_repeat_inst) or (mod_regs_listed and mod_repeat_inst):
                     indent = " " * 12
                     desc_lines = mod_desc_str.split('\n')
                     formatted_desc = f"{submodule_indent}{indent}- Description: {desc_lines[0]}"
@@ -347,14 +412,14 @@ def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path
                     lines.append(formatted_desc)
 
                 # Register metadata
-                if ((mod_reg_expand_str == 'FALSE' and not mod_repeat_inst) or (mod_repeat_info["expand_regs"] == 'FALSE' and mod_reg_expand_str == 'FALSE')):
+                if (not module.expand_regs and not mod_repeat_inst) or mod_regs_listed:
                     for i in range(reg_count-subregisters):
                         reg_addr = start_addr + i * reg_width_bytes
                         reg_key = f"Reg{i}"
-                        reg_info = module.get("regs", {}).get(reg_key, {})
-                        reg_name_str = reg_info.get("name", f"Reg{i}")
-                        reg_desc_str = reg_info.get("description", "")
-                        reg_perm_str = reg_info.get("permissions", "")
+                        reg_info = module.regs.get(reg_key)
+                        reg_name_str = reg_info.name if reg_info and reg_info.name is not None else reg_key
+                        reg_desc_str = reg_info.description if reg_info and reg_info.description is not None else ""
+                        reg_perm_str = reg_info.permissions if reg_info and reg_info.permissions is not None else ""
 
                         lines.append("")
                         lines.append(f"{submodule_indent}            -> {reg_key}: {reg_name_str}")
@@ -369,18 +434,14 @@ def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path
                         if reg_perm_str:
                             lines.append(f"{submodule_indent}                - Permissions: {reg_perm_str}")
 
-                        fields = reg_info.get("fields", {})
+                        fields = reg_info.fields if reg_info else {}
                         for field_key, field_info in fields.items():
-                            fname = field_info.get("name", field_key)
-                            fbounds = field_info.get("bounds", [])
-                            try:
-                                fupper = fbounds[0]
-                                flower = fbounds[1]
-                                if fupper == None or flower == None or fupper < 0 or flower < 0:
-                                    raise SyntaxError(f"Field Bounds for {module_name_orig} is not valid")
-                            except:
+                            fname = field_info.name if field_info.name is not None else {} # Unnamed fields print as {}
+                            fupper = field_info.upper
+                            flower = field_info.lower
+                            if fupper == None or flower == None or fupper < 0 or flower < 0:
                                 raise SyntaxError(f"Field Bounds for {module_name_orig} is not valid")
-                            fdesc = field_info.get("description", "")
+                            fdesc = field_info.description
                             lines.append(f"{submodule_indent}                -> {field_key}: {fname}")
                             lines.append(f"{submodule_indent}                    - Bits: [{fupper}:{flower}]")
                             if fdesc:
@@ -396,6 +457,5 @@ def dump_all_registers_from_configs(parsed_configs, submodule_reg_map, file_path
 
     if save_to_file:
         combined_file_path = file_path+"/"+file_name
-        with open(combined_file_path, "w") as f:
-            f.write(output)
-        print(f"\nRegister map saved to: {combined_file_path}")
\ No newline at end of file
+        write_output_file(combined_file_path, output)
+        report_output(f"\nRegister map saved to: {combined_file_path}")
\ No newline at end of file
@@ -0,0 +1,138 @@
+import re
+import ast
+import operator
+from functools import lru_cache
+
+sv_literal_re = re.compile(r"\d*'[hdbonHDBON][0-9a-fA-F_]+")
+numeric_literal_re = re.compile(r"\b(0[xX][0-9a-fA-F_]+|0[bB][01_]+|0[oO][0-7_]+|\d+)\b")
+expression_word_re = re.compile(r"\$?\w+")
+name_char_re = re.compile(r"[a-zA-Z_]")
+
+def sv_clog2(value):
+    """Ceiling of log2 like SystemVerilog $clog2, with $clog2(0) == $clog2(1) == 0."""
+    return max(int(value) - 1, 0).bit_length()
+
+sv_system_functions = {
+    "$clog2": sv_clog2
+}
+
+expression_binary_operators = {
+    ast.Add      : operator.add,
+    ast.Sub      : operator.sub,
+    ast.Mult     : operator.mul,
+    ast.Div      : operator.truediv,
+    ast.FloorDiv : operator.floordiv,
+    ast.Mod      : operator.mod,
+    ast.Pow      : operator.pow,
+    ast.LShift   : operator.lshift,
+    ast.RShift   : operator.rshift,
+    ast.BitAnd   : operator.and_,
+    ast.BitOr    : operator.or_,
+    ast.BitXor   : operator.xor
+}
+
+expression_unary_operators = {
+    ast.USub   : operator.neg,
+    ast.UAdd   : operator.pos,
+    ast.Invert : operator.invert
+}
+
+def sv_number_to_python(match):
+    """Converts a SystemVerilog literal (e.g. 16'h4000, 8'd255, 32'b101010) to decimal text."""
+    raw = match.group(0)
+    try:
+        if "'" in raw:
+            _, radix_value = raw.split("'")
+            radix = radix_value[0].lower()
+            value = radix_value[1:].replace("_", "")  # Remove underscores
+            if radix == 'h':
+                return str(int(value, 16))
+            elif radix == 'd':
+                return str(int(value, 10))
+            elif radix == 'b':
+                return str(int(value, 2))
+            elif radix == 'o':
+                return str(int(value, 8))
+    except Exception:
+        raise ValueError(f"Could not parse SV literal: {raw}")
+    return raw  # fallback
+
+def python_literal_to_int(match):
+    """Converts a 0x.../0b.../0o.../decimal literal to decimal text."""
+    raw = match.group(0)
+    try:
+        return str(int(raw, 0))  # Python auto-detects 0x / 0b / 0o / decimal
+    except Exception:
+        raise ValueError(f"Could not parse numeric literal: {raw}")
+
+def compile_expression_node(node, placeholders):
+    """Turns a parsed expression node into a function of the parameter table. Only arithmetic is allowed."""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        value = node.value
+        return lambda parameter_table: value
+    if isinstance(node, ast.Name) and node.id in placeholders:
+        name = placeholders[node.id]
+        return lambda parameter_table: parameter_table[name]
+    if isinstance(node, ast.BinOp) and type(node.op) in expression_binary_operators:
+        apply = expression_binary_operators[type(node.op)]
+        left = compile_expression_node(node.left, placeholders)
+        right = compile_expression_node(node.right, placeholders)
+        return lambda parameter_table: apply(left(parameter_table), right(parameter_table))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in expression_unary_operators:
+        apply = expression_unary_operators[type(node.op)]
+        operand = compile_expression_node(node.operand, placeholders)
+        return lambda parameter_table: apply(operand(parameter_table))
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and placeholders.get(node.func.id) in sv_system_functions
+            and len(node.args) == 1 and not node.keywords):
+        function = sv_system_functions[placeholders[node.func.id]]
+        argument = compile_expression_node(node.args[0], placeholders)
+        return lambda parameter_table: function(argument(parameter_table))
+    raise SyntaxError(f"unsupported syntax '{ast.unparse(node)}'")
+
+class CompiledExpression:
+    """
+    An expression parsed once. Evaluating it only looks up the parameters it names,
+    so the cost does not depend on the size of the parameter table.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.names = set()
+        self.error = None
+        placeholders = {}
+
+        # Every word containing a letter is a parameter reference (or a $function); swap them for placeholders before parsing
+        def name_placeholder(match):
+            word = match.group(0)
+            if word[0] != "$" and not name_char_re.search(word):
+                return word
+            if word not in sv_system_functions:
+                self.names.add(word)
+            placeholder = f"_p{len(placeholders)}"
+            placeholders[placeholder] = word
+            return placeholder
+
+        try:
+            tree = ast.parse(expression_word_re.sub(name_placeholder, text), mode="eval")
+            self.evaluate = compile_expression_node(tree.body, placeholders)
+        except SyntaxError as e:
+            self.error = e
+
+    def __call__(self, parameter_table=None):
+        """Returns the value of the expression, or None if it names a parameter missing from parameter_table."""
+        parameter_table = parameter_table or {}
+        for name in self.names:
+            if name not in parameter_table:
+                return None  # Still contains unresolved variables
+        if self.error:
+            raise ValueError(f"Could not evaluate expression: {self.text}")
+        try:
+            return self.evaluate(parameter_table)
+        except Exception:
+            raise ValueError(f"Could not evaluate expression: {self.text}")
+
+@lru_cache(maxsize=None)
+def compile_expression(expr):
+    """Returns the memoized CompiledExpression for an expression string, converting SV and Python literals first."""
+    text = sv_literal_re.sub(sv_number_to_python, expr)
+    text = numeric_literal_re.sub(python_literal_to_int, text)
+    return CompiledExpression(text)
@@ -1,32 +1,32 @@
 import os
 import re
+from address_allocator import allocation_option, decode_mask_match
+from output_files import write_output_file, report_output
 
-def generate_systemverilog(config, submodule_reg_map):
-    """Generates a complete SystemVerilog package including parameters, modules, addresses, and functions."""
+def generate_systemverilog(package_base_name, cpu_config, submodule_reg_map):
+    """Generates a complete SystemVerilog package including parameters, modules, addresses, and functions from a CpuConfig."""
     module_entries = []
     address_entries = []
     parameter_entries = []
 
-    # Automatically get the top-level key (package name)
-    package_base_name = next(iter(config))  # Dynamically selects the first key (e.g., "cpu1")
     package_name = f"{package_base_name}_package"  # Append _package to the name
-    builtin_modules = config[package_base_name].get("BUILTIN_MODULES", {})
-    user_modules = config[package_base_name].get("USER_MODULES", {})
-    builtin_parameters = config[package_base_name].get("BUILTIN_PARAMETERS", {})
-    user_parameters = config[package_base_name].get("USER_PARAMETERS", {})
+    builtin_modules = cpu_config.modules("BUILTIN_MODULES")
+    user_modules = cpu_config.modules("USER_MODULES")
+    builtin_parameters = cpu_config.sections.get("BUILTIN_PARAMETERS", {})
+    user_parameters = cpu_config.sections.get("USER_PARAMETERS", {})
 
     # Combine module lists to ensure commas are placed correctly
     all_modules = {**builtin_modules, **user_modules}
     module_list = [
         module
         for module, data in all_modules.items()
-        if isinstance(data, dict) and data.get("flag") == "TRUE" and not "submodule_of" in data
+        if data.enabled and data.submodule_of is None
     ]
     
     submodule_list = [
         module
         for module, data in all_modules.items()
-        if isinstance(data, dict) and data.get("flag") == "TRUE" and "submodule_of" in data
+        if data.enabled and data.submodule_of is not None
     ]
 
     # Generate module bus enumeration with an extra comma before num_entries
@@ -41,8 +41,8 @@ def generate_systemverilog(config, submodule_reg_map):
     # Generate localparams for BUILTIN_PARAMETERS and USER_PARAMETERS with optional bit-width
     for param_section in [builtin_parameters, user_parameters]:
         for param, details in param_section.items():
-            param_value = details["value"]  # Extract actual parameter value
-            bit_width = details.get("bit_width")  # Extract optional bit-width
+            param_value = details.value  # Extract actual parameter value
+            bit_width = details.bit_width  # Extract optional bit-width
 
             if bit_width:
                 parameter_entries.append(f"    localparam logic [{bit_width}] {param:<30} = {param_value};")
@@ -53,14 +53,27 @@ def generate_systemverilog(config, submodule_reg_map):
     for i, module in enumerate(module_list):
         details = all_modules[module]
         comma = "," if i < len(module_list) - 1 else ""  # Add comma except last entry
-        address_entries.append(f"        add_address({details['bounds'][0]}, {details['bounds'][1]}){comma} // {module}")
+        address_entries.append(f"        add_address({details.start}, {details.end}){comma} // {module}")
+
+    # NATURAL allocation places each module on a boundary of its own power-of-two size, so it can be decoded with a mask
+    module_decode = ""
+    allocation = cpu_config.sections.get("CONFIG_PARAMETERS", {}).get("Address_Allocation")
+    if allocation_option("Address_Allocation", allocation.value if allocation is not None else None) == "NATURAL":
+        address_width = int(builtin_parameters["address_width"].value)
+        hex_digits = (address_width + 3) // 4
+        decode_entries = []
+        for i, module in enumerate(module_list):
+            mask, match = decode_mask_match(all_modules[module].start, all_modules[module].end, address_width)
+            comma = "," if i < len(module_list) - 1 else ""
+            decode_entries.append(f"        add_decode('h{mask:0{hex_digits}X}, 'h{match:0{hex_digits}X}){comma} // {module}")
+        module_decode = generate_decode_functions("\n".join(decode_entries))
 
     module_enum = "\n".join(module_entries)
     module_addresses = "\n".join(address_entries)
     parameters = "\n".join(parameter_entries)
 
     # Identify the last enabled built-in module
-    enabled_modules = [module for module, details in builtin_modules.items() if details["flag"] == "TRUE"]
+    enabled_modules = [module for module, details in builtin_modules.items() if details.enabled]
 
     if enabled_modules:
         last_enabled_module = enabled_modules[-1] + "+1"
@@ -116,7 +129,7 @@ package {package_name};
         begin
             get_address_mux = module_addresses[val*address_width +: address_width];
         end
-    endfunction
+    endfunction{module_decode}
 
     typedef logic [data_width-1:0] data_reg_inputs_t [0:num_entries-1];
 
@@ -235,28 +248,61 @@ endpackage
 
     return systemverilog_code.strip()
 
-def save_systemverilog_files(parsed_configs, submodule_reg_map, base_directory):
-    """Loops through parsed configs and saves corresponding SystemVerilog files."""
-    for package_base_name, config in parsed_configs.items():
+def generate_decode_functions(decode_entries):
+    """Returns the package section with the mask/match decode constants of a NATURAL allocation."""
+    return f"""
+
+    function [(2*address_width)-1:0] add_decode (
+        input logic [address_width-1:0] mask,
+        input logic [address_width-1:0] match
+    );
+        begin
+            add_decode[address_width-1:0] = match;
+            add_decode[2*address_width-1:address_width] = mask;
+        end
+    endfunction
+
+    //Each enumeration gets a decode mask and match value with the mask on the left.
+    //An address selects the module when (address & mask) == match, so only the upper address bits are compared
+    localparam [2*(address_width*num_entries)-1:0] module_decode = {{
+{decode_entries}
+    }};
+
+    function [address_width-1:0] get_decode_mask (
+        input [$clog2(num_entries):0] val
+    );
+        begin
+            get_decode_mask = module_decode[(2*((num_entries-1)-val)+1)*address_width +: address_width];
+        end
+    endfunction
+
+    function [address_width-1:0] get_decode_match (
+        input [$clog2(num_entries):0] val
+    );
+        begin
+            get_decode_match = module_decode[(2*((num_entries-1)-val))*address_width +: address_width];
+        end
+    endfunction"""
+
+def save_systemverilog_files(register_maps, base_directory):
+    """Loops through the register maps ({cpu_name: RegisterMap}) and saves corresponding SystemVerilog files."""
+    for package_base_name, register_map in register_maps.items():
         package_name = f"{package_base_name}_package"  # Append _package to the name
 
-        if not config:  # Skip empty configs
+        if not register_map.model.sections:  # Skip empty configs
             raise RuntimeWarning(f"No data found for {package_base_name}. Skipping.")
 
-        systemverilog_output = generate_systemverilog({package_base_name: config}, submodule_reg_map[package_base_name])
+        systemverilog_output = generate_systemverilog(package_base_name, register_map.model, register_map.submodule_tuples)
 
         # Define the output file path inside the respective package directory
         folder_path = os.path.join(base_directory, package_base_name)  # Folder remains original
         output_file = os.path.join(folder_path, f"{package_name}.sv")  # Append _package to filename
 
-        os.makedirs(folder_path, exist_ok=True)
+        write_output_file(output_file, systemverilog_output)
 
-        with open(output_file, "w") as file:
-            file.write(systemverilog_output)
+        report_output(f"Generated and saved SystemVerilog package for {package_name}: {os.path.abspath(output_file)}")
 
-        print(f"Generated and saved SystemVerilog package for {package_name}: {os.path.abspath(output_file)}")
-
-def update_cpu_modules_file(parsed_configs, base_directory, reference_file="ref_fpga_sys_lite.sv"):
+def update_cpu_modules_file(register_maps, base_directory, reference_file="ref_fpga_sys_lite.sv"):
     """Reads a reference SystemVerilog file, replaces import statements and updates bus logic based on enabled modules."""
     current_directory = os.path.dirname(os.path.abspath(__file__))
     reference_file = os.path.join(current_directory, reference_file)
@@ -269,7 +315,7 @@ def update_cpu_modules_file(parsed_configs, base_directory, reference_file="ref_
     with open(reference_file, "r") as file:
         ref_content = file.read()
 
-    for package_base_name, config in parsed_configs.items():
+    for package_base_name, register_map in register_maps.items():
         modified_package_name = f"{package_base_name}_package"  # Append _package to the name
 
         # Replace import statement with the modified package name
@@ -325,8 +371,8 @@ def update_cpu_modules_file(parsed_configs, base_directory, reference_file="ref_
         updated_content = updated_content.replace(f"package {package_base_name};", f"package {modified_package_name};")
 
         # Identify the last enabled built-in module
-        builtin_modules = config.get("BUILTIN_MODULES", {})
-        enabled_modules = [module for module, details in builtin_modules.items() if details["flag"] == "TRUE"]
+        builtin_modules = register_map.model.modules("BUILTIN_MODULES")
+        enabled_modules = [module for module, details in builtin_modules.items() if details.enabled]
 
         if enabled_modules:
             last_enabled_module = enabled_modules[-1]
@@ -357,7 +403,7 @@ def update_cpu_modules_file(parsed_configs, base_directory, reference_file="ref_
         }
 
         for module, details in builtin_modules.items():
-            if details["flag"] == "FALSE":
+            if not details.enabled:
                 # Lookup the correct module name from the dictionary, fallback to default if missing
                 module_name = package_base_name + "_" + MODULE_NAME_MAPPING.get(module, module)  # If not in mapping, keep original
 
@@ -372,9 +418,6 @@ def update_cpu_modules_file(parsed_configs, base_directory, reference_file="ref_
         folder_path = os.path.join(base_directory, package_base_name)  # Keep original folder name
         output_file = os.path.join(folder_path, f"{package_base_name}_fpga_sys_lite.sv")  # Append _fpga_sys_lite
 
-        os.makedirs(folder_path, exist_ok=True)
-
-        with open(output_file, "w") as file:
-            file.write(updated_content)
+        write_output_file(output_file, updated_content)
 
-        print(f"Saved SystemVerilog Module file: {os.path.abspath(output_file)}")
\ No newline at end of file
+        report_output(f"Saved SystemVerilog Module file: {os.path.abspath(output_file)}")
\ No newline at end of file
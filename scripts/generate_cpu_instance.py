@@ -16,11 +16,15 @@ def run_generated_script():
         sys.path.insert(0, os.path.abspath(generator_dir))
         import combine_gen_cpu_deps
 
-        # Generate and execute code
-        code = combine_gen_cpu_deps.generate_script(write_to_file=False)
+        # Load the compiled bundle (rebuilt only when a generator source file changed) and execute it
+        code, exporter_code = combine_gen_cpu_deps.load_compiled_bundle()
         #fake_file_path = os.path.abspath(__file__)
         #print(fake_file_path)
-        exec(code, {"__name__": "__main__", "__file__": f"{generator_dir}/{top_file_name}"})
+        # Run inside the real __main__ namespace so forked worker processes can look up generator functions by name
+        main_globals = vars(sys.modules["__main__"])
+        main_globals["__file__"] = f"{generator_dir}/{top_file_name}"
+        main_globals["bundled_exporters"] = exporter_code
+        exec(code, main_globals)
 
     finally:
         sys.path.pop(0)